@@ -0,0 +1,58 @@
+#! /usr/bin/env python3
+
+"""
+Compare the compiled template engine of the Parser with the previous engine (one str.replace per variable, followed by
+a regex scan of the output for the remaining variables) on large templates.
+
+Run from the root project directory:
+    python3 benchmarks/parser.py
+"""
+
+import random
+import re
+import string
+import timeit
+
+from harivansh_laravel_docker.helpers import Parser
+
+
+def previous_parse(template, variables, delimiters_creator=lambda variable_name: f"[[{variable_name}]]"):
+    for name, value in variables.items():
+        template = template.replace(delimiters_creator(name), str(value))
+
+    unique_token = "".join(random.choices(f"{string.ascii_uppercase}_", k=64))
+    token_regex = re.compile(
+        r".*" + re.escape(delimiters_creator(unique_token)).replace(unique_token, r"\w[\w_]*") + r".*"
+    )
+
+    if token_regex.match(template) is not None:
+        raise ValueError("There are still unparsed variables in the template.")
+
+    return template
+
+
+def large_template(variable_count, line_count):
+    names = [f"VARIABLE_{index}" for index in range(variable_count)]
+    lines = [f"line {index}: some configuration value = [[{random.choice(names)}]]" for index in range(line_count)]
+
+    return "\n".join(lines), {name: f"value-{name.lower()}" for name in names}
+
+
+if __name__ == "__main__":
+    repetitions = 20
+
+    print(f"{'variables':>10} {'lines':>8} {'previous':>12} {'compiled':>12} {'speed-up':>10}")
+
+    for variable_count, line_count in ((10, 1000), (50, 10000), (200, 50000)):
+        template, variables = large_template(variable_count, line_count)
+
+        assert previous_parse(template, variables) == Parser().add_template_string(template).parse(variables) \
+            .parsed_template_string
+
+        previous = timeit.timeit(lambda: previous_parse(template, variables), number=repetitions) / repetitions
+        compiled = timeit.timeit(
+            lambda: Parser().add_template_string(template).parse(variables), number=repetitions
+        ) / repetitions
+
+        print(f"{variable_count:>10} {line_count:>8} {previous * 1000:>10.2f}ms {compiled * 1000:>10.2f}ms "
+              f"{previous / compiled:>9.1f}x")
@@ -0,0 +1,64 @@
+#! /usr/bin/env python3
+
+"""
+Compare the latency of a (trivial) command run in the php container by the generated run script through the Docker
+Engine API, with the previous path (docker-compose exec).
+
+Run from the root directory of a generated project, with its stack running:
+    python3 /path/to/benchmarks/run_exec_latency.py [ITERATIONS]
+"""
+
+import io
+import statistics
+import sys
+import time
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+from subprocess import DEVNULL, run
+
+
+def load_run_script():
+    loader = SourceFileLoader("run", "run")
+    module = module_from_spec(spec_from_loader("run", loader))
+    loader.exec_module(module)
+
+    return module
+
+
+def measure(function, iterations):
+    durations = []
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    return durations
+
+
+def summary(name, durations):
+    durations = sorted(durations)
+    percentile_95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+
+    return f"{name:<18} median: {statistics.median(durations) * 1000:8.1f}ms    p95: {percentile_95 * 1000:8.1f}ms"
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    run_script = load_run_script()
+    env = run_script.project_environment_variables(".env")
+    engine = run_script.DockerEngine.from_environment()
+    project = run_script.DockerEngine.compose_project(env)
+
+    # The container is resolved (and cached) once, as it would be by a previous call.
+    engine.container(project, "php")
+
+    def engine_api():
+        engine.execute(project, "php", ["true"], user="www-data", tty=False,
+                       stdin=io.BytesIO(), stdout=io.BytesIO(), stderr=io.BytesIO())
+
+    def docker_compose():
+        run(["docker-compose", "exec", "-T", "--user", "www-data", "php", "true"], stdin=DEVNULL, stdout=DEVNULL)
+
+    print(summary("docker-compose", measure(docker_compose, iterations)))
+    print(summary("Engine API", measure(engine_api, iterations)))
@@ -1,9 +1,115 @@
+import argparse
+import sys
+
 from harivansh_scripting_utilities.print import error
 
-from harivansh_laravel_docker.application import Application
+from harivansh_laravel_docker.application import Application, BulkApplication
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        "harivansh_laravel_docker",
+        description="Set up a new Laravel project on docker in the current directory."
+    )
+    parser.add_argument("--composer-cache",
+                        help="The host directory used as the composer cache.")
+    parser.add_argument("--offline",
+                        action="store_true",
+                        help="Install the Laravel application from the composer cache only (without network access).")
+    parser.add_argument("--profile",
+                        choices=("dev", "staging", "production"),
+                        help="The performance profile of the stack (dev by default).")
+    parser.add_argument("--fastcgi",
+                        choices=("tcp", "unix"),
+                        help="The FastCGI transport between nginx and php-fpm (tcp by default, or a unix socket).")
+    parser.add_argument("--http3",
+                        action="store_true",
+                        default=None,
+                        help="Also serve the application over HTTP/3 (QUIC).")
+    parser.add_argument("--runtime",
+                        choices=("fpm", "swoole", "roadrunner"),
+                        help="Serve the application with php-fpm (by default), or Laravel Octane (Swoole, RoadRunner).")
+    parser.add_argument("--redis",
+                        choices=("instances", "databases"),
+                        help="Run a redis instance per role (cache, sessions, queues; by default), or a single one.")
+    parser.add_argument("--pgbouncer",
+                        action="store_true",
+                        default=None,
+                        help="Connect the application to PostgreSQL through a PgBouncer connection pooler.")
+    parser.add_argument("--queue-runner",
+                        choices=("worker", "horizon"),
+                        help="Run the queues with queue:work processes (by default), or horizon (laravel/horizon).")
+    parser.add_argument("--trace",
+                        metavar="FILE",
+                        help="Display the timing spans of the installation, and append them to a JSON lines file.")
+    parser.add_argument("--profile-steps",
+                        metavar="DIRECTORY",
+                        help="Write a cProfile statistics file for each installation step in the directory.")
+    parser.add_argument("--project",
+                        action="append",
+                        default=[],
+                        metavar="NAME[=DOMAIN]",
+                        help="Set up the project non-interactively (may be repeated to set up several projects).")
+    parser.add_argument("--spec",
+                        action="append",
+                        default=[],
+                        metavar="FILE",
+                        help="Set up the projects of a JSON, TOML, or YAML specification file non-interactively.")
+    parser.add_argument("--workers",
+                        type=int,
+                        help="The maximum number of projects set up at the same time (defaults to the CPU count).")
+    arguments = parser.parse_args()
+
+    overrides = {"composer": {"offline": arguments.offline}}
+
+    if arguments.composer_cache is not None:
+        overrides["composer"]["cache"] = arguments.composer_cache
+
+    overrides["tuning"] = {}
+
+    if arguments.profile is not None:
+        overrides["tuning"]["profile"] = arguments.profile
+
+    if arguments.fastcgi is not None:
+        overrides["tuning"]["fastcgi"] = arguments.fastcgi
+
+    if arguments.http3 is not None:
+        overrides["tuning"]["http3"] = arguments.http3
+
+    if arguments.runtime is not None:
+        overrides["tuning"]["runtime"] = arguments.runtime
+
+    overrides["services"] = {}
+
+    if arguments.redis is not None:
+        overrides["services"]["redis"] = {"mode": arguments.redis}
+
+    if arguments.pgbouncer is not None:
+        overrides["services"]["pgbouncer"] = {"enabled": arguments.pgbouncer}
+
+    if arguments.queue_runner is not None:
+        overrides["services"]["queue"] = {"runner": arguments.queue_runner}
+
     try:
-        Application().run()
+        if not arguments.project and not arguments.spec:
+            application = Application(overrides, profile_directory=arguments.profile_steps)
+            application.run()
+
+            if arguments.trace is not None:
+                application.trace(arguments.trace)
+        else:
+            specifications = [
+                BulkApplication.specification(dict(zip(("name", "domain"), project.split("=", 1))), overrides)
+                for project in arguments.project
+            ]
+
+            for path in arguments.spec:
+                specifications += BulkApplication.load(path, overrides)
+
+            application = BulkApplication(specifications, arguments.workers).run()
+
+            print(application.report())
+
+            if not application.succeeded:
+                sys.exit(1)
     except Exception as exception:
         print(error(f"{exception}\n\n"), end="")
@@ -1,11 +1,26 @@
-from subprocess import run
-
-from harivansh_scripting_utilities.helpers import cd
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 from harivansh_laravel_docker.core import (
-    CreateSkeleton, Env, LaravelInstaller, ProjectConfiguration, ProjectEnvironment, Ssl
+    CertificateAuthority, CreateSkeleton, Env, KeyPool, LaravelInstaller, OctaneConfiguration, PhpBaseImage,
+    PhpConfiguration, Prefetcher, PostgresqlConfiguration, ProjectConfiguration, ProjectEnvironment, RedisConfiguration,
+    SnapshotStore, Ssl
 )
-from harivansh_laravel_docker.helpers import log
+from harivansh_laravel_docker.helpers import cache_directory, log, run_traced, Scheduler, tracer
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
 
 
 class Application:
@@ -13,12 +28,55 @@ class Application:
     The main application - responsible for setting up the project.
 
     Attributes:
+        _overrides (dict):
+            The configuration values overriding the default ones.
+
+        _interactive (bool):
+            Whether the user is asked the questions concerning the project.
+
         _configuration (dict):
             The main environment/configuration array of the application.
+
+        _scheduler (Scheduler):
+            The scheduler running the installation steps according to their dependencies.
+            The steps run concurrently, and should therefore not change the current working directory.
+
+        _prefetcher (Prefetcher):
+            The docker images, and composer packages prefetcher running while the project is being configured (if
+            enabled).
+
+        _key_pool (KeyPool):
+            The pool of pre-generated RSA keys (if enabled in the configuration), refilled in the background.
     """
 
-    def __init__(self):
+    def __init__(self, overrides=None, interactive=True, prefetch=True, profile_directory=None):
+        """
+        Class constructor.
+
+        Args:
+            overrides (dict):
+                The configuration values overriding the default ones (see ProjectEnvironment.merge).
+
+            interactive (bool):
+                Whether the user is asked the project name and domain; otherwise they should be in the overrides.
+
+            prefetch (bool):
+                Whether the docker images, and composer packages are prefetched in the background.
+
+            profile_directory (str):
+                The directory in which a cProfile statistics file is written for each installation step (None
+                disables profiling).
+        """
+
+        self._overrides = overrides or {}
+        self._interactive = interactive
         self._configuration = None
+        self._scheduler = Scheduler()
+        self._prefetcher = Prefetcher(ProjectEnvironment().merge(self._overrides).get()) if prefetch else None
+        self._key_pool = None
+
+        # The spans of the installation (see Application.trace) are recorded from now on.
+        tracer.reset(profile_directory)
 
     @log("Setting up a new Laravel project.")
     @log("Please read the project's README file for further information.", position="after")
@@ -26,12 +84,25 @@ class Application:
     def run(self):
         """
         The main method. It is here that the various steps of setting up the project are called.
+        The prefetcher is started first, so that the docker images are pulled while the user answers the questions.
         """
 
-        (self
-         ._pre_install()
-         ._install()
-         ._post_install())
+        if self._prefetcher is not None:
+            self._prefetcher.start()
+
+        try:
+            (self
+             ._pre_install()
+             ._install()
+             ._post_install())
+        except BaseException:
+            if self._prefetcher is not None:
+                self._prefetcher.cancel()
+
+            raise
+        finally:
+            if self._prefetcher is not None:
+                self._prefetcher.join()
 
     def _pre_install(self):
         self._configure()
@@ -39,16 +110,27 @@ class Application:
         return self
 
     def _install(self):
-        self._structure()
-        self._ssl()
-        self._scaffold()
-        self._laravel()
+        (self._scheduler
+         .add("structure", self._structure)
+         .add("ssl", self._ssl, ("structure",))
+         .add("scaffold", self._scaffold, ("structure",))
+         .add("laravel", self._laravel, ("structure",))
+         .add("octane", self._octane, ("laravel",))
+         .add("php", self._php, ("laravel", "octane"))
+         .add("redis", self._redis, ("laravel",))
+         .add("postgresql", self._postgresql, ("structure",))
+         .add("image", self._image)
+         .run())
 
         return self
 
     def _post_install(self):
-        self._git()
-        self._env()
+        (self._scheduler
+         .add("git", self._git, ("ssl", "scaffold", "laravel", "octane", "php", "redis", "postgresql"))
+         .add("env", self._env, ("laravel",))
+         .run())
+
+        self._report()
 
         return self
 
@@ -58,7 +140,7 @@ class Application:
         Ask the user some questions concerning the project to scaffold, and add the answers in the configuration dict.
         """
 
-        self._configuration = ProjectEnvironment().initialize().get()
+        self._configuration = ProjectEnvironment().merge(self._overrides).initialize(self._interactive).get()
 
     @log("Creating the project structure.")
     def _structure(self):
@@ -73,12 +155,13 @@ class Application:
                         "conf.d": {},
                         "ssl": {}
                     },
-                    "php": {
-                        "custom-php.ini": ""
-                    },
+                    "php": {},
+                    "redis": {},
+                    "postgresql": {},
                 },
                 "dockerfiles": {
-                    "php": {}
+                    "php": {},
+                    "php-base": {}
                 },
                 "application": {}
             }
@@ -90,16 +173,38 @@ class Application:
         Generate TLS / SSL certificates.
         """
 
-        with cd(self._configuration["project"]["name"]):
-            with cd("configuration"):
-                with cd("nginx"):
-                    with cd("ssl"):
-                        key_path = f"{self._configuration['ssl']['key_name']}"
-                        certificate_path = f"{self._configuration['ssl']['certificate_name']}"
+        ssl_directory = os.path.join(self._configuration["project"]["name"], "configuration", "nginx", "ssl")
+        key_path = os.path.join(ssl_directory, self._configuration["ssl"]["key_name"])
+        certificate_path = os.path.join(ssl_directory, self._configuration["ssl"]["certificate_name"])
 
-                        (Ssl(self._configuration["project"]["domain"])
-                         .generate()
-                         .write(key_path, certificate_path))
+        ssl_configuration = self._configuration["ssl"]
+
+        if ssl_configuration["key_type"] == "rsa" and ssl_configuration["key_pool_size"] > 0:
+            self._key_pool = KeyPool(
+                cache_directory("keys", f"rsa-{ssl_configuration['key_size']}"),
+                ssl_configuration["key_size"],
+                ssl_configuration["key_pool_size"]
+            )
+
+        authority = None
+
+        if ssl_configuration["authority"]:
+            authority = CertificateAuthority(os.path.join(cache_directory(), "authority")).load()
+
+            print(f"The certificate is signed by the local certificate authority at: {authority.certificate_path}\n")
+
+        (Ssl(self._configuration["project"]["domain"],
+             key_size=ssl_configuration["key_size"],
+             validity=ssl_configuration["validity"],
+             key_type=ssl_configuration["key_type"],
+             key_pool=self._key_pool,
+             authority=authority,
+             alternative_names=(f"pgadmin.{self._configuration['project']['domain']}",))
+         .generate()
+         .write(key_path, certificate_path))
+
+        if self._key_pool is not None:
+            self._key_pool.refill()
 
     @log("Scaffolding the project configuration files.")
     def _scaffold(self):
@@ -113,11 +218,71 @@ class Application:
     def _laravel(self):
         """
         Pull a fresh laravel application.
+        The composer cache is warmed by the prefetcher beforehand, so the pull waits for it to avoid downloading the
+        same packages twice.
+        """
+
+        if self._prefetcher is not None:
+            self._prefetcher.join("composer")
+
+        installer = LaravelInstaller(self._configuration).pull(
+            os.path.join(self._configuration["project"]["name"], "application")
+        )
+
+        print(f"\n{installer.report()}\n")
+
+    @log("Installing the application server.")
+    def _octane(self):
+        """
+        Add the Laravel Octane packages to the application, if it is served by Octane (instead of php-fpm).
+        The php configuration is generated afterwards, so that the application is measured with its Octane packages.
+        """
+
+        OctaneConfiguration(self._configuration).setup()
+
+    @log("Generating the php configuration files.")
+    def _php(self):
+        """
+        Create the php configuration files (custom-php.ini, and preload.php), which are sized from the Laravel
+        application.
+        """
+
+        PhpConfiguration(self._configuration).setup()
+
+    @log("Generating the redis configuration files.")
+    def _redis(self):
         """
+        Create the redis configuration files, and add the redis connections of the cache, and the sessions to the
+        Laravel application.
+        """
+
+        RedisConfiguration(self._configuration).setup()
+
+    @log("Generating the postgresql configuration files.")
+    def _postgresql(self):
+        """
+        Create the PostgreSQL (and PgBouncer, if it is enabled) configuration files.
+        """
+
+        PostgresqlConfiguration(self._configuration).setup()
+
+    @log("Building the php base image.")
+    def _image(self):
+        """
+        Build the php base image shared by the projects of the host, unless it already exists.
+        The prefetcher may already be building it in the background, in which case its build is awaited.
+        """
+
+        if self._prefetcher is not None:
+            self._prefetcher.join("build php-base")
 
-        with cd(self._configuration["project"]["name"]):
-            with cd("application"):
-                LaravelInstaller(self._configuration).pull()
+        image = PhpBaseImage(runtime=self._configuration["tuning"]["runtime"])
+
+        if self._configuration["composer"]["offline"] and not image.exists():
+            print("The php base image cannot be built offline; run './run build:base' in the project once online.\n")
+            return
+
+        print(f"\n{image.build().report()}\n")
 
     @log("Initializing a new git repository for the project.")
     def _git(self):
@@ -132,9 +297,8 @@ class Application:
             ["git", "checkout", "-b", "development"]
         ]
 
-        with cd(self._configuration["project"]["name"]):
-            for git_command in git_commands:
-                run(git_command, check=True)
+        for git_command in git_commands:
+            run_traced(git_command, cwd=self._configuration["project"]["name"], check=True)
 
     @log("Editing the application's environment file.")
     def _env(self):
@@ -145,7 +309,300 @@ class Application:
         project_name = self._configuration["project"]["name"]
         environment_variables = self._configuration["application"]["environment"]
 
-        with cd(project_name):
-            with cd("application"):
-                with cd(project_name):
-                    Env(".env").replace(environment_variables)
+        Env(os.path.join(project_name, "application", project_name, ".env")).replace(environment_variables)
+
+    def trace(self, path):
+        """
+        Display the spans of the installation (its steps, their nested calls, and their commands), and append them
+        to a JSON lines file.
+
+        Args:
+            path (str): The JSON lines file.
+
+        Returns:
+            self
+        """
+
+        print(f"{tracer.report()}\n")
+
+        with open(path, "a") as file:
+            file.write(tracer.json_lines(project=self._configuration["project"]["name"]))
+
+        return self
+
+    @log("Installation timings (in seconds since the start of the installation).", suffix="\n")
+    def _report(self):
+        """
+        Display the time taken by each installation step, and the critical path leading to it.
+        """
+
+        print(f"{self._scheduler.report()}\n")
+
+
+class BulkApplication:
+    """
+    This class sets up several projects non-interactively, and in parallel (across a process pool), from their
+    specifications.
+
+    Attributes:
+        _specifications ([dict]):
+            The configuration overrides of each project (see ProjectEnvironment.merge).
+            e.g.: [{ "project": { "name": "One", "domain": "one.local" }, "composer": { "offline": True } }]
+
+        _max_workers (int):
+            The maximum number of projects to set up at the same time.
+
+        _logs_directory (str):
+            The directory in which the output of each project's installation is logged.
+
+        results ([(str, str, float)]):
+            The name, status, and duration (in seconds) of each project's installation.
+    """
+
+    def __init__(self, specifications, max_workers=None, logs_directory="scaffolding-logs"):
+        self._specifications = specifications
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._logs_directory = logs_directory
+        self.results = []
+
+    @staticmethod
+    def load(path, defaults=None):
+        """
+        Load the project specifications from a JSON, TOML, or YAML file.
+        The file either contains a list of projects, or a mapping with the "projects" list and the "defaults" applied
+        to every project. The "name" and "domain" of each project are its project name and domain, while any other key
+        is a configuration override.
+
+        e.g.: { "defaults": { "ssl": { "key_type": "ecdsa-p256" } },
+                "projects": [{ "name": "One", "domain": "one.local" }, { "name": "Two" }] }
+
+        Args:
+            path (str): The path to the specifications file.
+            defaults (dict): The configuration overrides applied before the file's (e.g.: from the command line).
+
+        Raises:
+            ValueError: If the file cannot be loaded, or is ill-formed.
+
+        Returns:
+            [dict]: The configuration overrides of each project.
+        """
+
+        extension = os.path.splitext(path)[1].lower()
+
+        with open(path, "rb") as file:
+            content = file.read()
+
+        if extension == ".json":
+            specifications = json.loads(content)
+        elif extension == ".toml":
+            if tomllib is None:
+                raise ValueError("TOML specification files require python 3.11 or later.")
+
+            specifications = tomllib.loads(content.decode())
+        elif extension in (".yml", ".yaml"):
+            if yaml is None:
+                raise ValueError("YAML specification files require the PyYAML package.")
+
+            specifications = yaml.safe_load(content)
+        else:
+            raise ValueError("The specification file should be a .json, .toml, .yml, or .yaml file.")
+
+        if isinstance(specifications, list):
+            specifications = {"projects": specifications}
+
+        if not isinstance(specifications, dict) or not isinstance(specifications.get("projects"), list):
+            raise ValueError(f"The specification file {path} does not contain a list of projects.")
+
+        return [
+            BulkApplication.specification(
+                project, BulkApplication._combine(defaults or {}, specifications.get("defaults", {}))
+            )
+            for project in specifications["projects"]
+        ]
+
+    @staticmethod
+    def specification(project, defaults=None):
+        """
+        Create the configuration overrides of a project from its specification.
+
+        Args:
+            project (dict): The project specification; e.g.: { "name": "One", "domain": "one.local" }
+            defaults (dict): The configuration overrides applied before the project's.
+
+        Returns:
+            dict: The configuration overrides.
+        """
+
+        if not isinstance(project, dict):
+            raise ValueError("Each project specification should be a mapping.")
+
+        overrides = {key: value for key, value in project.items() if key not in ("name", "domain")}
+        overrides["project"] = {**overrides.get("project", {}), "name": project.get("name")}
+
+        if project.get("domain") is not None:
+            overrides["project"]["domain"] = project["domain"]
+        elif isinstance(project.get("name"), str):
+            # Each project gets its own domain by default, instead of sharing the interactive default one.
+            overrides["project"]["domain"] = f"{project['name'].lower()}.local"
+
+        return BulkApplication._combine(defaults or {}, overrides)
+
+    @staticmethod
+    def _combine(defaults, overrides):
+        """
+        Recursively combine two configuration overrides dictionaries, the latter taking precedence.
+
+        Args:
+            defaults (dict): The default configuration overrides.
+            overrides (dict): The configuration overrides.
+
+        Returns:
+            dict: The combined configuration overrides.
+        """
+
+        combined = dict(defaults)
+
+        for key, value in overrides.items():
+            if isinstance(value, dict) and isinstance(combined.get(key), dict):
+                combined[key] = BulkApplication._combine(combined[key], value)
+            else:
+                combined[key] = value
+
+        return combined
+
+    def run(self):
+        """
+        Validate every project specification, and then set up the projects in parallel.
+        If the Laravel application will not be materialized from a snapshot, the first project is set up on its own,
+        so that the following ones can use its snapshot.
+
+        Raises:
+            ValueError: If any of the specifications is invalid (no project is set up then).
+
+        Returns:
+            self
+        """
+
+        configurations = [BulkApplication._validate(specification) for specification in self._specifications]
+        names = [configuration["project"]["name"] for configuration in configurations]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+
+        if duplicates:
+            raise ValueError(f"The following projects are specified more than once: {', '.join(duplicates)}.")
+
+        os.makedirs(self._logs_directory, exist_ok=True)
+
+        prefetcher = Prefetcher(configurations[0]).start() if configurations else None
+        specifications = list(self._specifications)
+
+        try:
+            laravel = configurations[0]["laravel"] if configurations else {}
+
+            if specifications and not (laravel["snapshots"] and SnapshotStore(cache_directory("snapshots")).latest(
+                    laravel["version"], laravel["snapshot_max_age"])):
+                prefetcher.join("composer")
+
+                self.results.append(BulkApplication._install(specifications.pop(0), self._logs_directory))
+
+            # The projects set up in parallel reuse the php base image instead of building it at the same time.
+            if prefetcher is not None:
+                prefetcher.join("build php-base")
+
+            with ProcessPoolExecutor(max_workers=self._max_workers) as executor:
+                self.results += executor.map(
+                    BulkApplication._install, specifications, [self._logs_directory] * len(specifications)
+                )
+        except BaseException:
+            if prefetcher is not None:
+                prefetcher.cancel()
+
+            raise
+        finally:
+            if prefetcher is not None:
+                prefetcher.join()
+
+        return self
+
+    def report(self):
+        """
+        Create a table of the projects' statuses, and installation durations.
+
+        Returns:
+            str: The projects table.
+        """
+
+        rows = [("Project", "Status", "Duration")]
+        rows += [(name, status, f"{duration:.2f}s") for name, status, duration in self.results]
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+
+        return "\n".join(
+            "    ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows
+        )
+
+    @property
+    def succeeded(self):
+        """
+        Returns:
+            bool: Whether every project was set up successfully.
+        """
+
+        return all(status == "installed" for name, status, duration in self.results)
+
+    @staticmethod
+    def _validate(specification):
+        """
+        Validate a project specification.
+
+        Args:
+            specification (dict): The configuration overrides of the project.
+
+        Returns:
+            dict: The project configuration.
+        """
+
+        return ProjectEnvironment().merge(specification).initialize(interactive=False).get()
+
+    @staticmethod
+    def _install(specification, logs_directory):
+        """
+        Set up a project non-interactively (in a worker process), logging its output to a file.
+
+        Args:
+            specification (dict): The configuration overrides of the project.
+            logs_directory (str): The directory in which the installation's output is logged.
+
+        Returns:
+            (str, str, float): The project's name, installation status, and installation duration (in seconds).
+        """
+
+        configuration = BulkApplication._validate(specification)
+        name = configuration["project"]["name"]
+        start = time.monotonic()
+
+        # The output of the subprocesses (docker, git) is also logged, by redirecting the standard file descriptors.
+        with open(os.path.join(logs_directory, f"{name}.log"), "w") as log_file:
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+            standard_descriptors = (os.dup(1), os.dup(2))
+
+            os.dup2(log_file.fileno(), 1)
+            os.dup2(log_file.fileno(), 2)
+
+            try:
+                with contextlib.redirect_stdout(log_file), contextlib.redirect_stderr(log_file):
+                    Application(specification, interactive=False, prefetch=False).run()
+
+                status = "installed"
+            except Exception as exception:
+                status = f"failed: {exception}"
+            finally:
+                log_file.flush()
+
+                os.dup2(standard_descriptors[0], 1)
+                os.dup2(standard_descriptors[1], 2)
+
+                for descriptor in standard_descriptors:
+                    os.close(descriptor)
+
+        return name, status, time.monotonic() - start
@@ -1,20 +1,34 @@
-import fileinput
+import base64
+import errno
+import fcntl
+import glob
+import hashlib
+import json
 import os
 import re
+import shlex
+import shutil
 import stat
+import sys
+import threading
+import time
+import uuid
 from collections.abc import Mapping
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from subprocess import run
+from subprocess import DEVNULL, PIPE, Popen, run, STDOUT, SubprocessError
 
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
 from harivansh_scripting_utilities.helpers import cd
 
-from harivansh_laravel_docker.helpers import Parser, Question, Validation
+from harivansh_laravel_docker import dotenv
+from harivansh_laravel_docker.helpers import cache_directory, Parser, Question, Renderer, run_traced, Validation
+from harivansh_laravel_docker.tuning import Profile
 
 
 class ProjectEnvironment:
@@ -37,7 +51,18 @@ class ProjectEnvironment:
             # TLS/SSL configuration values.
             "ssl": {
                 "key_name": "key.pem",
-                "certificate_name": "certificate.pem"
+                "certificate_name": "certificate.pem",
+                # The type of the key; one of ["rsa", "ecdsa-p256", "ecdsa-p384", "ed25519"].
+                # N.B.: Most browsers do not support ed25519 certificates yet.
+                "key_type": "rsa",
+                "key_size": 4096,
+                # The number of pre-generated RSA keys kept in the user's cache directory (0 disables the pool).
+                "key_pool_size": 0,
+                # Whether the certificate is signed by the local certificate authority (cached in the user's cache
+                # directory) instead of being self-signed.
+                "authority": True,
+                # The number of days for which the certificate is valid.
+                "validity": 90
             },
 
             # Docker-compose general environment values.
@@ -46,6 +71,40 @@ class ProjectEnvironment:
                 "gid": os.getegid()
             },
 
+            # Composer configuration values.
+            "composer": {
+                # The host directory mounted as the composer cache in the composer containers.
+                "cache": os.environ.get(
+                    "COMPOSER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "composer")
+                ),
+                # Whether the packages should only be installed from the composer cache (without any network access).
+                "offline": False
+            },
+
+            # Laravel installation values.
+            "laravel": {
+                # The version constraint of the laravel/laravel package (None for the latest version).
+                "version": None,
+                # Whether the application is materialized from a local snapshot of a previous installation.
+                "snapshots": True,
+                # The number of days after which a snapshot is not reused anymore.
+                "snapshot_max_age": 7
+            },
+
+            # Performance tuning values.
+            "tuning": {
+                # The performance profile of the stack; one of ["dev", "staging", "production"].
+                "profile": "dev",
+                # The FastCGI transport between nginx and php-fpm; one of ["tcp", "unix"] (a socket on a shared volume).
+                "fastcgi": "tcp",
+                # The memory used by a php-fpm worker, in megabytes (None to measure it on the Laravel application).
+                "php_worker_memory": None,
+                # Whether nginx also serves the application over HTTP/3 (QUIC).
+                "http3": False,
+                # The server of the php service; one of ["fpm" (php-fpm), "swoole", "roadrunner" (Laravel Octane)].
+                "runtime": "fpm"
+            },
+
             # Docker-compose service environment values.
             "services": {
                 "pgadmin": {
@@ -54,6 +113,22 @@ class ProjectEnvironment:
                 },
                 "selenium": {
                     "port": 4444
+                },
+                "redis": {
+                    # The cache, sessions, and queues are either in separate, differently tuned "instances", or in
+                    # separate "databases" of a single instance.
+                    "mode": "instances"
+                },
+                "pgbouncer": {
+                    # Whether the application connects to PostgreSQL through a PgBouncer connection pooler.
+                    "enabled": False
+                },
+                "queue": {
+                    # The queue workers; one of ["worker" (queue:work processes), "horizon" (requires laravel/horizon)].
+                    "runner": "worker",
+                    # The queues, and their weights ("name:weight"), by which the worker processes of a replica are
+                    # shared (e.g.: ["default:2", "emails"]).
+                    "queues": ["default"]
                 }
             },
 
@@ -66,38 +141,106 @@ class ProjectEnvironment:
                     "APP_URL": None,
 
                     "DB_CONNECTION": "pgsql",
-                    "DB_HOST": "postgresql",
-                    "DB_PORT": 5432,
+                    # The database host, and port depend on the connection pooler (see PostgresqlConfiguration).
+                    "DB_HOST": None,
+                    "DB_PORT": None,
                     "DB_DATABASE": "application",
                     "DB_USERNAME": "username",
                     "DB_PASSWORD": "password",
 
                     "CACHE_DRIVER": "redis",
+                    "CACHE_STORE": "redis",
                     "SESSION_DRIVER": "redis",
                     "QUEUE_CONNECTION": "redis",
 
-                    "REDIS_HOST": "redis",
-                    "REDIS_PORT": 6379
+                    # The redis connections of the cache, and the sessions are added to the application's
+                    # config/database.php file; the queues use the default connection.
+                    "REDIS_CACHE_CONNECTION": "redis-cache",
+                    "SESSION_CONNECTION": "redis-session",
+
+                    # The redis hosts, and databases depend on the redis mode (see RedisConfiguration.environment).
+                    "REDIS_HOST": None,
+                    "REDIS_PORT": 6379,
+                    "REDIS_DB": None,
+                    "REDIS_CACHE_HOST": None,
+                    "REDIS_CACHE_DB": None,
+                    "REDIS_SESSION_HOST": None,
+                    "REDIS_SESSION_DB": None
                 }
             }
         }
 
-    def initialize(self):
+    def initialize(self, interactive=True):
         """
         Initialize the configuration dictionary.
         This is done by asking the user a few questions concerning the configuration options of the project.
+        In non-interactive mode, the project name and domain (e.g.: merged from a specification) are validated instead.
+        The queue service is validated in both modes.
+
+        Args:
+            interactive (bool):
+                Whether the user should be asked the questions.
+
+        Raises:
+            ValueError: If the project name, domain (in non-interactive mode), or queue service is invalid.
 
         Returns:
             self
         """
 
-        self._configuration["project"]["name"] = self._query_project_name()
-        self._configuration["project"]["domain"] = self._query_domain_name()
+        if interactive:
+            self._configuration["project"]["name"] = self._query_project_name()
+            self._configuration["project"]["domain"] = self._query_domain_name()
+
+        self._validate()
 
         self._configuration["application"]["environment"]["APP_NAME"] = self._configuration["project"]["name"]
         self._configuration["application"]["environment"][
             "APP_URL"] = f"https://{self._configuration['project']['domain']}"
 
+        environment = {
+            **RedisConfiguration.environment(self._configuration["services"]["redis"]["mode"]),
+            **PostgresqlConfiguration.environment(self._configuration["services"]["pgbouncer"]["enabled"]),
+            **OctaneConfiguration.environment(self._configuration["tuning"]["runtime"]),
+        }
+
+        for name, value in environment.items():
+            if self._configuration["application"]["environment"].get(name) is None:
+                self._configuration["application"]["environment"][name] = value
+
+        return self
+
+    def merge(self, overrides):
+        """
+        Override some of the configuration values (e.g.: with the command line options).
+
+        Args:
+            overrides (Mapping):
+                A (nested) mapping of the configuration values to override.
+                e.g.: { "composer": { "offline": True } }
+
+        Raises:
+            ValueError: If one of the overrides is not a configuration value.
+
+        Returns:
+            self
+        """
+
+        def merge(configuration, overrides, path):
+            if not isinstance(overrides, Mapping):
+                raise ValueError("The configuration overrides should be a Mapping.")
+
+            for key, value in overrides.items():
+                if key not in configuration:
+                    raise ValueError(f"There is no '{'.'.join(path + (key,))}' configuration value.")
+
+                if isinstance(configuration[key], Mapping) and isinstance(value, Mapping):
+                    merge(configuration[key], value, path + (key,))
+                else:
+                    configuration[key] = value
+
+        merge(self._configuration, overrides, ())
+
         return self
 
     def get(self):
@@ -110,6 +253,33 @@ class ProjectEnvironment:
 
         return self._configuration
 
+    def _validate(self):
+        """
+        Validate the project name and domain with the same rules as the questions, and the queue service.
+
+        Raises:
+            ValueError: If the project name, domain, or queue service is invalid.
+        """
+
+        name = self._configuration["project"]["name"]
+        domain = self._configuration["project"]["domain"]
+        queue = self._configuration["services"]["queue"]
+
+        try:
+            if not isinstance(name, str):
+                raise ValueError("The project name is missing.")
+
+            Validation.is_pascalcase(name)
+            Validation.directory_exists(name)
+            Validation.is_url(domain)
+
+            if queue["runner"] not in ("worker", "horizon"):
+                raise ValueError("The queue runner should be one of: worker, horizon.")
+
+            ProjectConfiguration.queue_weights(queue["queues"])
+        except ValueError as exception:
+            raise ValueError(f"[{name}] {exception}")
+
     def _query_project_name(self):
         return str(Question(
             "Project name",
@@ -219,259 +389,2193 @@ class ProjectConfiguration:
     def setup(self):
         """
         Set up the configuration files.
+        The files are created relative to the current directory, which is not changed in the process.
         """
 
-        with cd(self._configuration["project"]["name"]):
-            with cd("configuration"):
-                with cd("nginx"):
-                    with cd("conf.d"):
-                        # default.conf
-                        (Parser().read_template(Parser.template_path("configuration/nginx/default.conf"))
-                         .parse({
-                            "PROJECT_DOMAIN": self._configuration["project"]["domain"],
-                            "SSL_KEY_NAME": self._configuration["ssl"]["key_name"],
-                            "SSL_CERTIFICATE_NAME": self._configuration["ssl"]["certificate_name"]
-                         })
-                         .output("default.conf"))
-
-                        # utils.conf
-                        (Parser().read_template(Parser.template_path("configuration/nginx/utils.conf"))
-                         .parse({
-                            "PROJECT_DOMAIN": self._configuration["project"]["domain"]
-                         })
-                         .output("utils.conf"))
-
-            with cd("dockerfiles"):
-                with cd("php"):
-                    # PHP Dockerfile
-                    (Parser().read_template(Parser.template_path("dockerfiles/php/Dockerfile"))
-                     .parse()
-                     .output("Dockerfile"))
-
-                    # entrypoint.sh
-                    (Parser().read_template(Parser.template_path("dockerfiles/php/entrypoint.sh"))
-                     .parse()
-                     .output("entrypoint.sh"))
-
-                    os.chmod("entrypoint.sh", os.stat("entrypoint.sh").st_mode | stat.S_IEXEC)
-
-            # docker-compose.yml
-            (Parser().read_template(Parser.template_path("docker-compose.yml"))
-             .parse()
-             .output("docker-compose.yml"))
-
-            environment_variables = {
-                "PROJECT_NAME": self._configuration["project"]["name"],
-                "PROJECT_DOMAIN": self._configuration["project"]["domain"],
-                "USER_ID": self._configuration["environment"]["uid"],
-                "GROUP_ID": self._configuration["environment"]["gid"],
-                "PGADMIN_EMAIL": self._configuration["services"]["pgadmin"]["email"],
-                "PGADMIN_PASSWORD": self._configuration["services"]["pgadmin"]["password"],
-                "SELENIUM_PORT": self._configuration["services"]["selenium"]["port"],
-                "SSL_KEY_NAME": self._configuration["ssl"]["key_name"],
-                "SSL_CERTIFICATE_NAME": self._configuration["ssl"]["certificate_name"],
-                "DB_NAME": self._configuration["application"]["environment"]["DB_DATABASE"],
-                "DB_USERNAME": self._configuration["application"]["environment"]["DB_USERNAME"],
-                "DB_PASSWORD": self._configuration["application"]["environment"]["DB_PASSWORD"],
-            }
+        Renderer().render(self.manifest()).write()
+
+    @staticmethod
+    def compose_profiles(configuration):
+        """
+        Get the compose profiles enabled by the configuration (the redis services, and the optional pgbouncer).
+
+        Args:
+            configuration (dict): The configuration of the project.
+
+        Returns:
+            [str]: The compose profiles.
+        """
+
+        return (
+            [RedisConfiguration.compose_profile(configuration["services"]["redis"]["mode"])]
+            + (["pgbouncer"] if configuration["services"]["pgbouncer"]["enabled"] else [])
+        )
+
+    @staticmethod
+    def queue_weights(queues):
+        """
+        Parse the queues of the queue service, and their weights.
+
+        Args:
+            queues ([str]): The queues, and their (optional) weights; e.g.: ["default:2", "emails"].
+
+        Raises:
+            ValueError: If there is no queue, if a queue has no name, or if a weight is not a positive integer.
+
+        Returns:
+            dict: The weights of the queues (1 by default), keyed by their names.
+        """
 
+        weights = {}
+
+        for name, _, weight in (str(entry).partition(":") for entry in queues):
+            if not name.strip():
+                raise ValueError(f"The queues should have a name (e.g.: default:{weight or 1}).")
+
+            if not re.fullmatch(r"\d*", weight) or (weight and int(weight) < 1):
+                raise ValueError(f"The weight of the {name} queue should be a positive integer (e.g.: {name}:2).")
+
+            weights[name] = int(weight or 1)
+
+        if not weights:
+            raise ValueError("The queue service should have at least one queue.")
+
+        return weights
+
+    @staticmethod
+    def dotenv_module():
+        """
+        Get the source code of the .env engine, which is embedded in the generated "run" script.
+
+        Returns:
+            str: The source code of the harivansh_laravel_docker.dotenv module.
+        """
+
+        with open(dotenv.__file__) as module:
+            return module.read()
+
+    def manifest(self):
+        """
+        Describe the configuration files of the project.
+
+        Returns:
+            [dict]: The template, destination path, variables, and mode (before the umask) of each file.
+        """
+
+        def path(*components):
+            return os.path.join(self._configuration["project"]["name"], *components)
+
+        profile = Profile(self._configuration["tuning"]["profile"])
+        # The php-fpm pool is sized again (from the measured worker memory) when the php configuration is generated.
+        fpm_pool = profile.fpm_pool(
+            self._configuration["tuning"]["php_worker_memory"] or PhpConfiguration.DEFAULT_WORKER_MEMORY
+        )
+        nginx = profile.nginx(fpm_pool["max_children"])
+        queue = self._configuration["services"]["queue"]
+        queue_workers = profile.queue_workers(ProjectConfiguration.queue_weights(queue["queues"]))
+
+        http3 = self._configuration["tuning"]["http3"]
+        runtime = OctaneConfiguration.validate(self._configuration["tuning"]["runtime"])
+        octane = profile.octane(
+            self._configuration["tuning"]["php_worker_memory"] or PhpConfiguration.DEFAULT_WORKER_MEMORY
+        )
+
+        nginx_variables = {
+            "PROJECT_DOMAIN": self._configuration["project"]["domain"],
+            "SSL_KEY_NAME": self._configuration["ssl"]["key_name"],
+            "SSL_CERTIFICATE_NAME": self._configuration["ssl"]["certificate_name"],
+            "FASTCGI_PASS": PhpConfiguration.fastcgi_address(self._configuration, "nginx"),
+            "OCTANE_PASS": f"php:{OctaneConfiguration.PORT}",
+            "UPSTREAM_KEEPALIVE": nginx["upstream_keepalive"] if runtime == "fpm" else octane["upstream_keepalive"],
+            "FASTCGI_CACHE": nginx["fastcgi_cache"],
+            "FASTCGI_CACHE_VALID": nginx["fastcgi_cache_valid"],
+            "HASHED_ASSETS_EXPIRES": nginx["hashed_assets_expires"],
+            "STATIC_ASSETS_EXPIRES": nginx["static_assets_expires"],
+            "STORAGE_EXPIRES": nginx["storage_expires"],
+            "HSTS_MAX_AGE": nginx["hsts_max_age"],
+            "HTTP3_LISTEN": "listen 443 quic reuseport;" if http3 else "# HTTP/3 is off (see the --http3 option).",
+            "ALT_SVC": 'h3=":443"; ma=86400' if http3 else "",
+        }
+
+        nginx_server_variables = {
+            "PROFILE": profile.name,
+            "HOST_CPUS": profile.host.cpus,
+            "WORKER_PROCESSES": nginx["worker_processes"],
+            "WORKER_RLIMIT_NOFILE": nginx["worker_rlimit_nofile"],
+            "WORKER_CONNECTIONS": nginx["worker_connections"],
+            "GZIP": nginx["gzip"],
+            "OPEN_FILE_CACHE": nginx["open_file_cache"],
+            "SSL_SESSION_CACHE": nginx["ssl_session_cache"],
+            "SSL_SESSION_TIMEOUT": nginx["ssl_session_timeout"],
+        }
+
+        environment_variables = {
+            "PROJECT_NAME": self._configuration["project"]["name"],
+            "PROJECT_DOMAIN": self._configuration["project"]["domain"],
+            "USER_ID": self._configuration["environment"]["uid"],
+            "GROUP_ID": self._configuration["environment"]["gid"],
+            "PGADMIN_EMAIL": self._configuration["services"]["pgadmin"]["email"],
+            "PGADMIN_PASSWORD": self._configuration["services"]["pgadmin"]["password"],
+            "SELENIUM_PORT": self._configuration["services"]["selenium"]["port"],
+            "SSL_KEY_NAME": self._configuration["ssl"]["key_name"],
+            "SSL_CERTIFICATE_NAME": self._configuration["ssl"]["certificate_name"],
+            "DB_NAME": self._configuration["application"]["environment"]["DB_DATABASE"],
+            "DB_USERNAME": self._configuration["application"]["environment"]["DB_USERNAME"],
+            "DB_PASSWORD": self._configuration["application"]["environment"]["DB_PASSWORD"],
+            "PHP_INI_TYPE": profile["php_ini"],
+            "PHP_BASE_IMAGE": PhpBaseImage(runtime=runtime).tag(),
+            "PHP_RUNTIME": runtime,
+            "QUEUE_RUNNER": queue["runner"],
+            "QUEUE_WORKER_REPLICAS": queue_workers["replicas"],
+            "QUEUE_WORKER_MEMORY_LIMIT": f"{queue_workers['memory_limit']}m",
+            "COMPOSE_PROFILES": ",".join(ProjectConfiguration.compose_profiles(self._configuration)),
+        }
+
+        readme_variables = {
+            "PROJECT_NAME": self._configuration["project"]["name"],
+            "PROJECT_DOMAIN": self._configuration["project"]["domain"],
+            "APP_URL": self._configuration["application"]["environment"]["APP_URL"],
+            "SELENIUM_PORT": self._configuration["services"]["selenium"]["port"]
+        }
+
+        return [
+            {
+                "template": "configuration/nginx/nginx.conf",
+                "destination": path("configuration", "nginx", "nginx.conf"),
+                "variables": nginx_server_variables
+            },
+            {
+                # nginx proxies HTTP to the Octane server, instead of FastCGI to php-fpm.
+                "template": f"configuration/nginx/{'default' if runtime == 'fpm' else 'octane'}.conf",
+                "destination": path("configuration", "nginx", "conf.d", "default.conf"),
+                "variables": nginx_variables
+            },
+            {
+                "template": "configuration/nginx/utils.conf",
+                "destination": path("configuration", "nginx", "conf.d", "utils.conf"),
+                "variables": nginx_variables
+            },
+            {
+                "template": "dockerfiles/php-base/Dockerfile",
+                "destination": path("dockerfiles", "php-base", "Dockerfile")
+            },
+            {
+                "template": "dockerfiles/php/Dockerfile",
+                "destination": path("dockerfiles", "php", "Dockerfile")
+            },
+            {
+                "template": "dockerfiles/php/entrypoint.sh",
+                "destination": path("dockerfiles", "php", "entrypoint.sh"),
+                "mode": 0o755
+            },
+            {
+                "template": "dockerfiles/php/server.sh",
+                "destination": path("dockerfiles", "php", "server.sh"),
+                "variables": {
+                    "PROFILE": profile.name,
+                    "HOST_CPUS": profile.host.cpus,
+                    "WATCH": int(octane["watch"]),
+                    "OPTIONS": " ".join(
+                        ["--host=0.0.0.0", f"--port={OctaneConfiguration.PORT}", f"--workers={octane['workers']}"]
+                        + ([f"--task-workers={octane['task_workers']}"] if runtime == "swoole" else [])
+                        + [f"--max-requests={octane['max_requests']}"]
+                    ),
+                },
+                "mode": 0o755
+            },
+            {
+                "template": "dockerfiles/php/healthcheck.sh",
+                "destination": path("dockerfiles", "php", "healthcheck.sh"),
+                "variables": {
+                    "FASTCGI_CONNECT": PhpConfiguration.fastcgi_address(self._configuration, "healthcheck"),
+                    "OCTANE_PORT": OctaneConfiguration.PORT,
+                },
+                "mode": 0o755
+            },
+            {
+                "template": "dockerfiles/php/worker.sh",
+                "destination": path("dockerfiles", "php", "worker.sh"),
+                "variables": {
+                    "PROFILE": profile.name,
+                    "HOST_CPUS": profile.host.cpus,
+                    "MAX_JOBS": queue_workers["max_jobs"],
+                    "MAX_TIME": queue_workers["max_time"],
+                    "MEMORY": queue_workers["memory"],
+                    "WORKERS": "\n".join(
+                        f"work {shlex.quote(name)} &"
+                        for name, processes in queue_workers["processes"].items() for _ in range(processes)
+                    ),
+                },
+                "mode": 0o755
+            },
+            {
+                "template": "docker-compose.yml",
+                "destination": path("docker-compose.yml")
+            },
             # .env (for docker-compose)
-            (Parser().read_template(Parser.template_path("project.env"))
-             .parse(environment_variables)
-             .output(".env"))
-
-            # .env.example
-            (Parser().read_template(Parser.template_path("project.env"))
-             .parse({name: "" for name in environment_variables})
-             .output(".env.example"))
-
-            # run.py
-            (Parser().read_template(Parser.template_path("run.py"))
-             .parse()
-             .output("run"))
-
-            os.chmod("run", os.stat("run").st_mode | stat.S_IEXEC)
-
-            # .gitignore
-            (Parser().read_template(Parser.template_path("project.gitignore"))
-             .parse()
-             .output(".gitignore"))
-
-            # LICENSE
-            (Parser().read_template(Parser.template_path("LICENSE"))
-             .parse()
-             .output("LICENSE"))
-
-            # README.md
-            (Parser().read_template(Parser.template_path("README.md"))
-             .parse({
-                "PROJECT_NAME": self._configuration["project"]["name"],
-                "PROJECT_DOMAIN": self._configuration["project"]["domain"],
-                "APP_URL": self._configuration["application"]["environment"]["APP_URL"],
-                "SELENIUM_PORT": self._configuration["services"]["selenium"]["port"]
-             })
-             .output("README.md"))
+            {
+                "template": "project.env",
+                "destination": path(".env"),
+                "variables": environment_variables
+            },
+            {
+                "template": "project.env",
+                "destination": path(".env.example"),
+                "variables": {name: "" for name in environment_variables}
+            },
+            {
+                "template": "run.py",
+                "destination": path("run"),
+                "variables": {"DOTENV_MODULE": ProjectConfiguration.dotenv_module()},
+                "mode": 0o755
+            },
+            {
+                "template": "project.gitignore",
+                "destination": path(".gitignore")
+            },
+            {
+                "template": "LICENSE",
+                "destination": path("LICENSE")
+            },
+            {
+                "template": "README.md",
+                "destination": path("README.md"),
+                "variables": readme_variables
+            }
+        ]
 
 
-class LaravelInstaller:
+class PhpConfiguration:
     """
-    This class is responsible for pulling a fresh Laravel instance into the current project.
+    This class is responsible for the php configuration files of the project (custom-php.ini, and preload.php), which
+    are tuned for the performance profile of the stack, and sized from the Laravel application.
 
     Attributes:
+        PhpConfiguration.PRELOADED_COMPONENTS ((str,)):
+            The components of the Laravel framework used by most requests, which are preloaded in the opcache.
+
+        PhpConfiguration.EXCLUDED_DIRECTORIES ((str,)):
+            The directories of the preloaded components which are not preloaded.
+
         _configuration (dict):
             The configuration / environment variables of the project.
     """
 
+    PRELOADED_COMPONENTS = (
+        "Auth", "Cache", "Config", "Container", "Contracts", "Cookie", "Database", "Encryption", "Events",
+        "Filesystem", "Foundation", "Hashing", "Http", "Log", "Pipeline", "Routing", "Session", "Support",
+        "Validation", "View"
+    )
+
+    EXCLUDED_DIRECTORIES = ("Console", "Testing", "stubs")
+
+    FASTCGI_SOCKET = "/var/run/php-fpm/php-fpm.sock"
+
+    # The memory used by a php-fpm worker besides the memory used by the application (in megabytes), and the
+    # estimated memory of a worker if it cannot be measured.
+    FPM_BASE_MEMORY = 12
+    DEFAULT_WORKER_MEMORY = 48
+
     def __init__(self, configuration):
         self._configuration = configuration
 
-    def pull(self):
+    def setup(self):
         """
-        Pull a fresh Laravel application.
+        Set up the php configuration files (the Laravel application should already be installed).
         """
 
-        run([
-            "docker", "run",
-            "--rm",
-            "--interactive",
-            "--tty",
-            "--user", f"{self._configuration['environment']['uid']}:{self._configuration['environment']['gid']}",
-            "--mount", f"type=bind,source={os.getcwd()},target=/application",
-            "--workdir", "/application",
-            "composer", "create-project",
-            "--prefer-dist",
-            "--ignore-platform-reqs",
-            "laravel/laravel", self._configuration["project"]["name"]
-        ],
-            check=True
-        )
+        name = self._configuration["project"]["name"]
+        worker_memory = (self._configuration["tuning"]["php_worker_memory"]
+                         or self.worker_memory(os.path.join(name, "application", name)))
 
+        print(f"The php-fpm workers are estimated to use {worker_memory}MB of memory each.")
 
-class Env:
-    """
-    This class is responsible for the changes made to the application's (laravel) .env file.
+        Renderer().render(self.manifest(worker_memory)).write()
 
-    Attributes:
-        _env_path (str):
-            The path to the application's (laravel) .env file.
-    """
+    def manifest(self, worker_memory=DEFAULT_WORKER_MEMORY):
+        """
+        Describe the php configuration files of the project.
 
-    def __init__(self, env_path):
+        Args:
+            worker_memory (int):
+                The memory used by a php-fpm worker (in megabytes).
+
+        Returns:
+            [dict]: The template, destination path, and variables of each file.
         """
-        Class constructor.
+
+        name = self._configuration["project"]["name"]
+        application_directory = os.path.join(name, "application", name)
+        profile = Profile(self._configuration["tuning"]["profile"])
+        php_files = PhpConfiguration.php_files(application_directory)
+        opcache = profile.opcache(php_files)
+        pool = profile.fpm_pool(worker_memory)
+
+        return [
+            {
+                "template": "configuration/php/custom-php.ini",
+                "destination": os.path.join(name, "configuration", "php", "custom-php.ini"),
+                "variables": {
+                    "PROFILE": profile.name,
+                    "PHP_INI_TYPE": profile["php_ini"],
+                    "PHP_FILES": php_files,
+                    "OPCACHE_ENABLE_CLI": int(self._configuration["tuning"]["runtime"] != "fpm"),
+                    "OPCACHE_MEMORY_CONSUMPTION": opcache["memory_consumption"],
+                    "OPCACHE_INTERNED_STRINGS_BUFFER": profile["opcache_interned_strings_buffer"],
+                    "OPCACHE_MAX_ACCELERATED_FILES": opcache["max_accelerated_files"],
+                    "OPCACHE_VALIDATE_TIMESTAMPS": profile["opcache_validate_timestamps"],
+                    "OPCACHE_REVALIDATE_FREQ": profile["opcache_revalidate_freq"],
+                    "OPCACHE_PRELOAD": "/home/www-data/preload.php" if profile["opcache_preload"] else "",
+                    "OPCACHE_JIT": profile["opcache_jit"],
+                    "OPCACHE_JIT_BUFFER_SIZE": profile["opcache_jit_buffer_size"],
+                    "REALPATH_CACHE_SIZE": profile["realpath_cache_size"],
+                    "REALPATH_CACHE_TTL": profile["realpath_cache_ttl"],
+                }
+            },
+            {
+                "template": "configuration/php/preload.php",
+                "destination": os.path.join(name, "configuration", "php", "preload.php"),
+                "variables": {
+                    "PRELOAD_FILES": "\n".join(
+                        f"    '{file}'," for file in PhpConfiguration.preload_files(application_directory)
+                    )
+                }
+            },
+            {
+                "template": "configuration/php/www.conf",
+                "destination": os.path.join(name, "configuration", "php", "www.conf"),
+                "variables": {
+                    "PROFILE": profile.name,
+                    "HOST_CPUS": profile.host.cpus,
+                    "HOST_MEMORY": profile.host.memory // 1024 ** 2,
+                    "WORKER_MEMORY": worker_memory,
+                    "LISTEN": PhpConfiguration.fastcgi_address(self._configuration, "php"),
+                    "PM": pool["pm"],
+                    "PM_MAX_CHILDREN": pool["max_children"],
+                    "PM_START_SERVERS": pool["start_servers"],
+                    "PM_MIN_SPARE_SERVERS": pool["min_spare_servers"],
+                    "PM_MAX_SPARE_SERVERS": pool["max_spare_servers"],
+                    "PM_MAX_REQUESTS": pool["max_requests"],
+                    "REQUEST_TERMINATE_TIMEOUT": pool["request_terminate_timeout"],
+                }
+            },
+        ]
+
+    @staticmethod
+    def fastcgi_address(configuration, service):
+        """
+        Get the FastCGI address of php-fpm, as seen by one of the services.
 
         Args:
-            env_path (str):
-                The file path to the application's (laravel) .env file.
+            configuration (dict): The configuration of the project.
+            service (str): The service; "php" (the listen address), "nginx" (the fastcgi_pass address), or
+                "healthcheck" (the address of the php service's healthcheck, in its own container).
+
+        Raises:
+            ValueError: If the FastCGI transport is neither "tcp", nor "unix".
+
+        Returns:
+            str: The FastCGI address.
         """
 
-        self._env_path = env_path
+        transport = configuration["tuning"]["fastcgi"]
 
-    def replace(self, replacement):
+        if transport == "unix":
+            if service == "nginx":
+                return f"unix:{PhpConfiguration.FASTCGI_SOCKET}"
+
+            return PhpConfiguration.FASTCGI_SOCKET
+
+        if transport == "tcp":
+            return {"php": "9000", "nginx": "php:9000"}.get(service, "127.0.0.1:9000")
+
+        raise ValueError("The FastCGI transport should be either 'tcp', or 'unix'.")
+
+    def worker_memory(self, application_directory):
         """
-        Replace the environment values with the ones provided.
+        Measure the memory used by a php-fpm worker, by handling a request to the Laravel application in a php
+        (composer) container.
 
         Args:
-            replacement (dict):
-                The values to replace the current environment with.
+            application_directory (str): The directory of the Laravel application.
+
+        Returns:
+            int: The memory used by a worker (in megabytes); PhpConfiguration.DEFAULT_WORKER_MEMORY if it cannot be
+                 measured.
         """
 
-        if not isinstance(replacement, Mapping):
-            raise ValueError("The replacement argument should be a Mapping.")
+        code = (
+            "require 'vendor/autoload.php';"
+            "$app = require 'bootstrap/app.php';"
+            "$kernel = $app->make(Illuminate\\Contracts\\Http\\Kernel::class);"
+            "try { $kernel->handle(Illuminate\\Http\\Request::create('/')); } catch (Throwable $exception) {}"
+            "echo memory_get_peak_usage(true);"
+        )
 
-        with fileinput.input(self._env_path, inplace=True) as env:
-            env_regex = re.compile(r"^(?P<key>\w+)=(?P<value>[\S]+)?\s*(?P<remaining>#.*)?$")
+        try:
+            process = run([
+                "docker", "run",
+                "--rm",
+                "--user", f"{self._configuration['environment']['uid']}:{self._configuration['environment']['gid']}",
+                "--mount", f"type=bind,source={os.path.abspath(application_directory)},target=/application",
+                "--workdir", "/application",
+                "composer",
+                "php", "-d", "memory_limit=-1", "-r", code
+            ], capture_output=True, text=True, timeout=120)
 
-            for line in env:
-                line = line.strip()
-                matches = env_regex.match(line)
+            peak_memory = int(process.stdout.strip().splitlines()[-1])
+        except (OSError, SubprocessError, ValueError, IndexError):
+            return PhpConfiguration.DEFAULT_WORKER_MEMORY
 
-                if matches is not None:
-                    matches = matches.groupdict()
-                    line = f"{matches['key']}={replacement[matches['key']] if matches['key'] in replacement else matches['value']}"
+        return -(-peak_memory // 1024 ** 2) + PhpConfiguration.FPM_BASE_MEMORY
 
-                    if matches['remaining']:
-                        line = f"{line}{' ' * 4}{matches['remaining']}"
+    @staticmethod
+    def php_files(application_directory):
+        """
+        Count the php files of an application (including its vendor files).
+
+        Args:
+            application_directory (str): The directory of the Laravel application.
 
-                print(line)
+        Returns:
+            int: The number of php files.
+        """
 
+        count = 0
 
-class Ssl:
+        for root, directories, files in os.walk(application_directory):
+            directories[:] = [directory for directory in directories if directory != "node_modules"]
+            count += sum(1 for file in files if file.endswith(".php"))
+
+        return count
+
+    @staticmethod
+    def preload_files(application_directory):
+        """
+        List the files of the Laravel framework to preload.
+
+        Args:
+            application_directory (str): The directory of the Laravel application.
+
+        Returns:
+            [str]: The paths of the files, relative to the application directory.
+        """
+
+        framework_directory = os.path.join("vendor", "laravel", "framework", "src", "Illuminate")
+        preload_files = []
+
+        for component in PhpConfiguration.PRELOADED_COMPONENTS:
+            component_directory = os.path.join(application_directory, framework_directory, component)
+
+            for root, directories, files in os.walk(component_directory):
+                directories[:] = [
+                    directory for directory in directories if directory not in PhpConfiguration.EXCLUDED_DIRECTORIES
+                ]
+                preload_files += [
+                    os.path.relpath(os.path.join(root, file), application_directory)
+                    for file in files if file.endswith(".php") and file != "helpers.php"
+                ]
+
+        return sorted(preload_files)
+
+
+class RedisConfiguration:
     """
-    This class is responsible for creating a x509 TLS/SSL certificate and the associated key.
+    This class is responsible for the redis instances of the project: their configuration files (tuned for their role,
+    and sized for the performance profile), and the redis connections of the Laravel application.
 
     Attributes:
-        _hostname (str):
-            The hostname of the machine on which the certificates will be hosted.
+        RedisConfiguration.MODES (dict):
+            The redis roles (see Profile.REDIS_ROLES), and their compose services, for each redis mode.
 
-        _key_size (int):
-            The size of the SSL key.
+        RedisConfiguration.CONNECTIONS (str):
+            The redis connections added to the application's config/database.php file.
 
-        _validity (int):
-            The number number of days (since creation) for which the certificate
-            will remain valid.
+        _configuration (dict):
+            The configuration / environment variables of the project.
+    """
 
-        _key (bytes):
-            The TLS key content.
+    MODES = {
+        "instances": {"cache": "redis-cache", "session": "redis-session", "queue": "redis-queue"},
+        "databases": {"shared": "redis"},
+    }
+
+    CONNECTIONS = """
+        'redis-cache' => [
+            'url' => env('REDIS_CACHE_URL'),
+            'host' => env('REDIS_CACHE_HOST', env('REDIS_HOST', '127.0.0.1')),
+            'username' => env('REDIS_USERNAME'),
+            'password' => env('REDIS_PASSWORD'),
+            'port' => env('REDIS_PORT', '6379'),
+            'database' => env('REDIS_CACHE_DB', '1'),
+        ],
 
-        _certificate (bytes):
-            The TLS certificate content.
-    """
+        'redis-session' => [
+            'url' => env('REDIS_SESSION_URL'),
+            'host' => env('REDIS_SESSION_HOST', env('REDIS_HOST', '127.0.0.1')),
+            'username' => env('REDIS_USERNAME'),
+            'password' => env('REDIS_PASSWORD'),
+            'port' => env('REDIS_PORT', '6379'),
+            'database' => env('REDIS_SESSION_DB', '2'),
+        ],
+"""
 
-    def __init__(self, hostname, key_size=4096, validity=365):
-        self._hostname = hostname
-        self._key_size = key_size
-        self._validity = validity
-        self._key = None
-        self._certificate = None
+    def __init__(self, configuration):
+        self._configuration = configuration
 
-    def generate(self):
+    def setup(self):
+        """
+        Set up the redis configuration files, and add the redis connections to the Laravel application (which should
+        already be installed).
         """
-        Generate the TLS/SSL key and certificate.
 
-        Return:
-            self
+        name = self._configuration["project"]["name"]
+
+        Renderer().render(self.manifest()).write()
+
+        if not RedisConfiguration.add_connections(os.path.join(name, "application", name, "config", "database.php")):
+            print("The redis connections could not be added to the application's config/database.php file.")
+
+    def manifest(self):
         """
+        Describe the redis configuration files of the project (one per redis instance).
 
-        key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=self._key_size,
-            backend=default_backend(),
-        )
+        Raises:
+            ValueError: If the redis mode does not exist.
 
-        name = x509.Name([
-            x509.NameAttribute(x509.NameOID.COMMON_NAME, self._hostname)
-        ])
+        Returns:
+            [dict]: The template, destination path, and variables of each file.
+        """
 
-        san = x509.SubjectAlternativeName([
-            x509.DNSName(self._hostname)
-        ])
+        mode = self._configuration["services"]["redis"]["mode"]
+
+        if mode not in RedisConfiguration.MODES:
+            raise ValueError(f"The redis mode should be one of: {', '.join(RedisConfiguration.MODES)}.")
+
+        profile = Profile(self._configuration["tuning"]["profile"])
+        manifest = []
+
+        for role, service in RedisConfiguration.MODES[mode].items():
+            redis = profile.redis(role)
+
+            manifest.append({
+                "template": "configuration/redis/redis.conf",
+                "destination": os.path.join(self._configuration["project"]["name"], "configuration", "redis",
+                                            f"{service}.conf"),
+                "variables": {
+                    "ROLE": role,
+                    "PROFILE": profile.name,
+                    "MAXMEMORY": redis["maxmemory"],
+                    "MAXMEMORY_POLICY": redis["maxmemory_policy"],
+                    "APPENDONLY": redis["appendonly"],
+                    "APPENDFSYNC": redis["appendfsync"],
+                    "SAVE": redis["save"],
+                }
+            })
 
-        basic_constraints = x509.BasicConstraints(ca=True, path_length=0)
-        now = datetime.utcnow()
+        return manifest
 
-        cert = (
-            x509.CertificateBuilder()
-                .subject_name(name)
-                .issuer_name(name)
-                .public_key(key.public_key())
-                .serial_number(1000)
-                .not_valid_before(now)
-                .not_valid_after(now + timedelta(days=self._validity))
-                .add_extension(basic_constraints, False)
-                .add_extension(san, False)
-                .sign(key, hashes.SHA256(), default_backend())
-        )
+    @staticmethod
+    def environment(mode):
+        """
+        Get the redis hosts, and databases of the Laravel application for a redis mode.
 
-        self._certificate = cert.public_bytes(encoding=serialization.Encoding.PEM)
-        self._key = key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
-            encryption_algorithm=serialization.NoEncryption()
-        )
+        Args:
+            mode (str): The redis mode.
+
+        Raises:
+            ValueError: If the redis mode does not exist.
+
+        Returns:
+            dict: The application's environment variables.
+        """
+
+        if mode == "instances":
+            # The default connection (used by the queues, and the cache locks) is the durable instance.
+            return {
+                "REDIS_HOST": "redis-queue", "REDIS_DB": 0,
+                "REDIS_CACHE_HOST": "redis-cache", "REDIS_CACHE_DB": 0,
+                "REDIS_SESSION_HOST": "redis-session", "REDIS_SESSION_DB": 0,
+            }
+
+        if mode == "databases":
+            return {
+                "REDIS_HOST": "redis", "REDIS_DB": 0,
+                "REDIS_CACHE_HOST": "redis", "REDIS_CACHE_DB": 1,
+                "REDIS_SESSION_HOST": "redis", "REDIS_SESSION_DB": 2,
+            }
+
+        raise ValueError(f"The redis mode should be one of: {', '.join(RedisConfiguration.MODES)}.")
+
+    @staticmethod
+    def compose_profile(mode):
+        """
+        Get the compose profile of the redis services of a redis mode.
+
+        Args:
+            mode (str): The redis mode.
+
+        Returns:
+            str: The compose profile.
+        """
+
+        return f"redis-{mode}"
+
+    @staticmethod
+    def add_connections(path):
+        """
+        Add the redis connections of the cache, and the sessions to a Laravel config/database.php file.
+
+        Args:
+            path (str): The path to the config/database.php file.
+
+        Returns:
+            bool: True if the connections are in the file, False if they could not be added.
+        """
+
+        try:
+            with open(path) as file:
+                content = file.read()
+        except FileNotFoundError:
+            return False
+
+        if "'redis-cache' =>" in content:
+            return True
+
+        # The connections are added at the beginning of the "redis" array.
+        content, count = re.subn(
+            r"('redis'\s*=>\s*\[\n)", lambda matches: matches.group(1) + RedisConfiguration.CONNECTIONS, content, count=1
+        )
+
+        if count == 0:
+            return False
+
+        with open(path, "w") as file:
+            file.write(content)
+
+        return True
+
+
+class PostgresqlConfiguration:
+    """
+    This class is responsible for the PostgreSQL configuration file of the project (sized from the host, and the
+    performance profile), and for the configuration of its optional PgBouncer connection pooler.
+
+    Attributes:
+        PostgresqlConfiguration.PGBOUNCER_PORT (int):
+            The port on which PgBouncer accepts the connections.
+
+        _configuration (dict):
+            The configuration / environment variables of the project.
+    """
+
+    PGBOUNCER_PORT = 6432
+
+    def __init__(self, configuration):
+        self._configuration = configuration
+
+    def setup(self):
+        """
+        Set up the PostgreSQL (and PgBouncer) configuration files.
+        """
+
+        Renderer().render(self.manifest()).write()
+
+    def manifest(self):
+        """
+        Describe the PostgreSQL configuration files of the project (the PgBouncer ones only if it is enabled).
+
+        Returns:
+            [dict]: The template, destination path, and variables of each file.
+        """
+
+        def path(*components):
+            return os.path.join(self._configuration["project"]["name"], "configuration", "postgresql", *components)
+
+        profile = Profile(self._configuration["tuning"]["profile"])
+        postgresql = profile.postgresql()
+        environment = self._configuration["application"]["environment"]
+
+        manifest = [
+            {
+                "template": "configuration/postgresql/postgresql.conf",
+                "destination": path("postgresql.conf"),
+                "variables": {
+                    "PROFILE": profile.name,
+                    "HOST_CPUS": profile.host.cpus,
+                    "HOST_MEMORY": profile.host.memory // 1024 ** 2,
+                    "MAX_CONNECTIONS": postgresql["max_connections"],
+                    "SHARED_BUFFERS": postgresql["shared_buffers"],
+                    "EFFECTIVE_CACHE_SIZE": postgresql["effective_cache_size"],
+                    "MAINTENANCE_WORK_MEM": postgresql["maintenance_work_mem"],
+                    "WORK_MEM": postgresql["work_mem"],
+                    "WAL_BUFFERS": postgresql["wal_buffers"],
+                    "MIN_WAL_SIZE": postgresql["min_wal_size"],
+                    "MAX_WAL_SIZE": postgresql["max_wal_size"],
+                    "SYNCHRONOUS_COMMIT": postgresql["synchronous_commit"],
+                    "MAX_WORKER_PROCESSES": postgresql["max_worker_processes"],
+                    "MAX_PARALLEL_WORKERS": postgresql["max_parallel_workers"],
+                    "MAX_PARALLEL_WORKERS_PER_GATHER": postgresql["max_parallel_workers_per_gather"],
+                    "MAX_PARALLEL_MAINTENANCE_WORKERS": postgresql["max_parallel_maintenance_workers"],
+                }
+            }
+        ]
+
+        if self._configuration["services"]["pgbouncer"]["enabled"]:
+            manifest += [
+                {
+                    "template": "configuration/postgresql/pgbouncer.ini",
+                    "destination": path("pgbouncer.ini"),
+                    "variables": {
+                        "PROFILE": profile.name,
+                        "MAX_CLIENT_CONN": postgresql["pgbouncer_max_client_conn"],
+                        "DEFAULT_POOL_SIZE": postgresql["pgbouncer_default_pool_size"],
+                        "MIN_POOL_SIZE": postgresql["pgbouncer_default_pool_size"] // 4,
+                        "DB_USERNAME": environment["DB_USERNAME"],
+                    }
+                },
+                {
+                    # The double quotes of the credentials are doubled in PgBouncer's auth file.
+                    "template": "configuration/postgresql/userlist.txt",
+                    "destination": path("userlist.txt"),
+                    "variables": {
+                        "DB_USERNAME": environment["DB_USERNAME"].replace('"', '""'),
+                        "DB_PASSWORD": environment["DB_PASSWORD"].replace('"', '""'),
+                    }
+                }
+            ]
+
+        return manifest
+
+    @staticmethod
+    def environment(pgbouncer):
+        """
+        Get the database host, and port of the Laravel application.
+
+        Args:
+            pgbouncer (bool): Whether the application connects through PgBouncer.
+
+        Returns:
+            dict: The application's environment variables.
+        """
+
+        if pgbouncer:
+            return {"DB_HOST": "pgbouncer", "DB_PORT": PostgresqlConfiguration.PGBOUNCER_PORT}
+
+        return {"DB_HOST": "postgresql", "DB_PORT": 5432}
+
+
+class OctaneConfiguration:
+    """
+    This class is responsible for the Laravel Octane application server (on Swoole, or RoadRunner), which replaces
+    php-fpm as the server of the php service when it is selected: the Octane packages of the Laravel application, and
+    its environment.
+
+    Attributes:
+        OctaneConfiguration.RUNTIMES (dict):
+            The composer packages required by each php runtime ("fpm" is php-fpm, without Octane).
+
+        OctaneConfiguration.PORT (int):
+            The port on which the Octane server accepts the (HTTP) connections.
+
+        _configuration (dict):
+            The configuration / environment variables of the project.
+    """
+
+    RUNTIMES = {
+        "fpm": (),
+        "swoole": ("laravel/octane",),
+        "roadrunner": ("laravel/octane", "spiral/roadrunner-cli", "spiral/roadrunner-http"),
+    }
+
+    PORT = 8000
+
+    def __init__(self, configuration):
+        self._configuration = configuration
+
+    def setup(self):
+        """
+        Add the Octane packages to the Laravel application (which should already be installed), unless php-fpm is
+        used. The swoole extension, and the RoadRunner binary are in the php base image.
+        """
+
+        runtime = OctaneConfiguration.validate(self._configuration["tuning"]["runtime"])
+
+        if runtime == "fpm":
+            print("The application is served by php-fpm.")
+            return
+
+        name = self._configuration["project"]["name"]
+
+        run_traced(self.command(os.path.join(name, "application", name)), check=True)
+
+    def command(self, directory):
+        """
+        Create the command requiring the Octane packages of the runtime in a composer container.
+        In offline mode, the packages are only installed from the composer cache.
+
+        Args:
+            directory (str): The directory of the Laravel application.
+
+        Returns:
+            [str]: The docker run command.
+        """
+
+        offline_options = ["--env", "COMPOSER_DISABLE_NETWORK=1"] if self._configuration["composer"]["offline"] else []
+
+        return [
+            "docker", "run",
+            "--rm",
+            "--user", f"{self._configuration['environment']['uid']}:{self._configuration['environment']['gid']}",
+            "--mount", f"type=bind,source={os.path.abspath(directory)},target=/application",
+            *LaravelInstaller.cache_options(self._configuration),
+            *offline_options,
+            "--workdir", "/application",
+            "composer", "require",
+            # The composer image has neither the swoole, nor the sockets extension.
+            "--ignore-platform-reqs",
+            "--no-progress",
+            *OctaneConfiguration.RUNTIMES[self._configuration["tuning"]["runtime"]]
+        ]
+
+    @staticmethod
+    def validate(runtime):
+        """
+        Validate a php runtime.
+
+        Args:
+            runtime (str): The php runtime.
+
+        Raises:
+            ValueError: If the runtime does not exist.
+
+        Returns:
+            str: The php runtime.
+        """
+
+        if runtime not in OctaneConfiguration.RUNTIMES:
+            raise ValueError(f"The php runtime should be one of: {', '.join(OctaneConfiguration.RUNTIMES)}.")
+
+        return runtime
+
+    @staticmethod
+    def environment(runtime):
+        """
+        Get the Octane server of the Laravel application.
+
+        Args:
+            runtime (str): The php runtime.
+
+        Returns:
+            dict: The application's environment variables (none for php-fpm).
+        """
+
+        if OctaneConfiguration.validate(runtime) == "fpm":
+            return {}
+
+        return {"OCTANE_SERVER": runtime}
+
+
+class PhpBaseImage:
+    """
+    This class is responsible for the php base image (php-fpm, its extensions, and composer), which is shared by every
+    project of the host. The image is tagged with a content hash of its inputs, so that it is only built once, and is
+    rebuilt whenever its Dockerfile (or the php-fpm image tag, or the php runtime) changes.
+
+    Attributes:
+        PhpBaseImage.REPOSITORY (str):
+            The repository of the base image.
+
+        PhpBaseImage.TEMPLATE (str):
+            The Dockerfile template of the base image.
+
+        _php_fpm_image_tag (str):
+            The tag of the official php-fpm image on which the base image is built.
+
+        _runtime (str):
+            The php runtime (see OctaneConfiguration.RUNTIMES) whose extension, or binary the base image includes.
+
+        steps ((int, int)):
+            The number of build steps which were cached, and the total number of build steps of the last build; None
+            if the image was reused.
+    """
+
+    REPOSITORY = "harivansh-laravel-docker/php-base"
+
+    TEMPLATE = "dockerfiles/php-base/Dockerfile"
+
+    def __init__(self, php_fpm_image_tag=None, runtime="fpm"):
+        """
+        Class constructor.
+
+        Args:
+            php_fpm_image_tag (str):
+                The tag of the official php-fpm image (defaults to the one of the project.env template).
+
+            runtime (str):
+                The php runtime (see OctaneConfiguration.RUNTIMES).
+        """
+
+        if php_fpm_image_tag is None:
+            with open(Parser.template_path("project.env")) as env:
+                php_fpm_image_tag = re.search(r"^PHP_FPM_IMAGE_TAG=(\S+)$", env.read(), re.MULTILINE).group(1)
+
+        self._php_fpm_image_tag = php_fpm_image_tag
+        self._runtime = runtime
+        self.steps = None
+
+    def tag(self):
+        """
+        Get the content-addressed tag of the base image.
+
+        Returns:
+            str: The image name, and tag.
+        """
+
+        digest = hashlib.sha256(f"{self._php_fpm_image_tag}:{self._runtime}".encode())
+
+        with open(Parser.template_path(PhpBaseImage.TEMPLATE), "rb") as dockerfile:
+            digest.update(dockerfile.read())
+
+        return f"{PhpBaseImage.REPOSITORY}:{digest.hexdigest()[:16]}"
+
+    def exists(self):
+        """
+        Check whether the base image has already been built on the host.
+
+        Returns:
+            bool: True if the image exists, False otherwise (or if docker is not available).
+        """
+
+        try:
+            return run(["docker", "image", "inspect", self.tag()], stdout=DEVNULL, stderr=DEVNULL).returncode == 0
+        except OSError:
+            return False
+
+    def command(self):
+        """
+        Get the command building the base image with BuildKit (which the cache mounts of the Dockerfile require).
+
+        Returns:
+            [str]: The build command.
+        """
+
+        return [
+            "env", "DOCKER_BUILDKIT=1",
+            "docker", "build",
+            "--progress", "plain",
+            "--build-arg", f"PHP_FPM_IMAGE_TAG={self._php_fpm_image_tag}",
+            "--build-arg", f"PHP_RUNTIME={self._runtime}",
+            "--tag", self.tag(),
+            os.path.dirname(Parser.template_path(PhpBaseImage.TEMPLATE))
+        ]
+
+    def build(self):
+        """
+        Build the base image, unless it already exists.
+
+        Raises:
+            CalledProcessError: If the image cannot be built.
+
+        Returns:
+            self
+        """
+
+        if self.exists():
+            self.steps = None
+            return self
+
+        process = run(self.command(), stdout=PIPE, stderr=STDOUT, universal_newlines=True)
+
+        if process.returncode != 0:
+            print(process.stdout)
+
+        process.check_returncode()
+
+        self.steps = PhpBaseImage.cache_usage(process.stdout)
+
+        return self
+
+    @staticmethod
+    def cache_usage(output):
+        """
+        Count the cached steps of a BuildKit build from its (plain) progress output.
+        e.g.: "#5 [2/6] RUN apt-get update", ..., "#5 CACHED"
+
+        Args:
+            output (str): The progress output of the build.
+
+        Returns:
+            (int, int): The number of cached steps, and the total number of steps.
+        """
+
+        steps = set(re.findall(r"^#(\d+) \[[^\]]*\d+/\d+\]", output, re.MULTILINE))
+        cached = set(re.findall(r"^#(\d+) CACHED$", output, re.MULTILINE))
+
+        return len(steps & cached), len(steps)
+
+    def report(self):
+        """
+        Describe the cache usage of the last build.
+
+        Returns:
+            str: The build cache report.
+        """
+
+        if self.steps is None:
+            return f"The php base image {self.tag()} was reused."
+
+        return f"The php base image {self.tag()} was built: {self.steps[0]}/{self.steps[1]} steps were cached."
+
+
+class LaravelInstaller:
+    """
+    This class is responsible for pulling a fresh Laravel instance into the current project.
+
+    Attributes:
+        _configuration (dict):
+            The configuration / environment variables of the project.
+
+        cache_hits ((int, int)):
+            The number, and total size (in bytes) of the composer cache files used by the last pull.
+
+        cache_misses ((int, int)):
+            The number, and total size (in bytes) of the files added to the composer cache by the last pull.
+
+        snapshot ((str, str, float)):
+            The key of the snapshot from which the last pull was materialized, the materialization method used, and its
+            duration (in seconds); None if the application was installed by composer.
+    """
+
+    def __init__(self, configuration):
+        self._configuration = configuration
+        self.cache_hits = (0, 0)
+        self.cache_misses = (0, 0)
+        self.snapshot = None
+
+    def pull(self, directory="."):
+        """
+        Pull a fresh Laravel application.
+        If snapshots are enabled, the application is materialized from a recent snapshot if there is one; otherwise it
+        is installed by composer, and then captured in the snapshot store.
+        In offline mode, the packages are only installed from the composer cache.
+
+        Args:
+            directory (str):
+                The directory in which the Laravel application will be created.
+
+        Returns:
+            self
+        """
+
+        project_name = self._configuration["project"]["name"]
+        laravel = self._configuration["laravel"]
+        store = SnapshotStore(cache_directory("snapshots")) if laravel["snapshots"] else None
+        key = store.latest(laravel["version"], laravel["snapshot_max_age"]) if store is not None else None
+
+        if key is not None:
+            start = time.monotonic()
+            method = store.materialize(key, os.path.join(directory, project_name))
+
+            Env(os.path.join(directory, project_name, ".env")).replace({
+                "APP_NAME": project_name,
+                "APP_KEY": f"base64:{base64.b64encode(os.urandom(32)).decode()}"
+            })
+
+            self.snapshot = (key, method, time.monotonic() - start)
+
+            return self
+
+        offline_options = ["--env", "COMPOSER_DISABLE_NETWORK=1"] if self._configuration["composer"]["offline"] else []
+        version = [laravel["version"]] if laravel["version"] else []
+        cache_before = self._cache_snapshot()
+
+        # A TTY is only allocated when the installation is run from a terminal (i.e.: not in bulk mode).
+        tty_options = ["--interactive", "--tty"] if sys.stdin.isatty() and sys.stdout.isatty() else []
+
+        run_traced([
+            "docker", "run",
+            "--rm",
+            *tty_options,
+            "--user", f"{self._configuration['environment']['uid']}:{self._configuration['environment']['gid']}",
+            "--mount", f"type=bind,source={os.path.abspath(directory)},target=/application",
+            *LaravelInstaller.cache_options(self._configuration),
+            *offline_options,
+            "--workdir", "/application",
+            "composer", "create-project",
+            "--prefer-dist",
+            "--ignore-platform-reqs",
+            "laravel/laravel", project_name, *version
+        ],
+            check=True
+        )
+
+        self._compare_cache(cache_before, self._cache_snapshot())
+
+        if store is not None:
+            store.capture(os.path.join(directory, project_name), laravel["version"])
+
+        return self
+
+    def report(self):
+        """
+        Describe the composer cache (or snapshot) usage of the last pull.
+
+        Returns:
+            str: The composer cache report.
+        """
+
+        def megabytes(size):
+            return f"{size / 1024 / 1024:.1f} MB"
+
+        if self.snapshot is not None:
+            return (f"Laravel snapshot {self.snapshot[0]} materialized with {self.snapshot[1]} "
+                    f"in {self.snapshot[2]:.2f}s.")
+
+        return (f"Composer cache: {self.cache_hits[0]} hits ({megabytes(self.cache_hits[1])}), "
+                f"{self.cache_misses[0]} misses ({megabytes(self.cache_misses[1])}).")
+
+    def _cache_snapshot(self):
+        """
+        List the files of the composer cache's files (dist archives) directory.
+
+        Returns:
+            dict: A mapping of the file paths to their (size, access time in nanoseconds).
+        """
+
+        snapshot = {}
+
+        for root, directories, files in os.walk(os.path.join(self._configuration["composer"]["cache"], "files")):
+            for name in files:
+                path = os.path.join(root, name)
+                status = os.stat(path)
+                snapshot[path] = (status.st_size, status.st_atime_ns)
+
+        return snapshot
+
+    def _compare_cache(self, before, after):
+        """
+        Compute the cache hits and misses from two snapshots of the composer cache.
+        Composer explicitly updates the access time of the cache files it uses, while the misses are the files which
+        it adds to the cache.
+
+        Args:
+            before (dict): The snapshot of the cache before the pull.
+            after (dict): The snapshot of the cache after the pull.
+        """
+
+        hits = [size for path, (size, access_time) in after.items()
+                if path in before and access_time > before[path][1]]
+        misses = [size for path, (size, access_time) in after.items() if path not in before]
+
+        self.cache_hits = (len(hits), sum(hits))
+        self.cache_misses = (len(misses), sum(misses))
+
+    @staticmethod
+    def cache_options(configuration):
+        """
+        Create the docker options mounting the host composer cache directory in a composer container.
+        The cache directory is created if it does not exist, so that it is not created by the docker daemon (as root).
+
+        Args:
+            configuration (dict):
+                The configuration / environment variables of the project.
+
+        Returns:
+            [str]: The docker run options.
+        """
+
+        cache_directory = os.path.abspath(configuration["composer"]["cache"])
+
+        os.makedirs(cache_directory, exist_ok=True)
+
+        return [
+            "--mount", f"type=bind,source={cache_directory},target=/composer-cache",
+            "--env", "COMPOSER_CACHE_DIR=/composer-cache"
+        ]
+
+
+class SnapshotStore:
+    """
+    This class is responsible for a local store of Laravel application snapshots, keyed by the Laravel framework
+    version and the hash of the composer.lock file. New applications are materialized from these snapshots instead of
+    being installed by composer.
+
+    The files are materialized with reflinks (copy-on-write clones) when the filesystem supports them. Otherwise, the
+    vendor files are hardlinked (the snapshot files are read-only, so that they cannot be changed in place through a
+    project), and the remaining files are copied in parallel.
+
+    Attributes:
+        SnapshotStore.LINKED_DIRECTORIES ((str,)):
+            The application directories which can be hardlinked, since they are not edited in place.
+
+        _directory (str):
+            The directory in which the snapshots are stored.
+
+        _max_workers (int):
+            The maximum number of files to copy at the same time.
+
+        _disabled_methods (set):
+            The materialization methods which are not supported by the filesystem(s).
+    """
+
+    LINKED_DIRECTORIES = ("vendor",)
+
+    def __init__(self, directory, max_workers=16):
+        self._directory = directory
+        self._max_workers = max_workers
+        self._disabled_methods = set()
+
+    @staticmethod
+    def key(application_directory):
+        """
+        Compute the key of an application from its composer.lock file.
+
+        Args:
+            application_directory (str): The path to the Laravel application.
+
+        Returns:
+            str: The key; e.g.: "v8.83.27-0123456789ab"
+        """
+
+        with open(os.path.join(application_directory, "composer.lock"), "rb") as lock:
+            content = lock.read()
+
+        version = next(
+            (package["version"] for package in json.loads(content)["packages"]
+             if package["name"] == "laravel/framework"),
+            "unknown"
+        )
+
+        return f"{version}-{hashlib.sha256(content).hexdigest()[:12]}"
+
+    def latest(self, version=None, max_age=None):
+        """
+        Get the key of the latest snapshot captured for a version constraint.
+
+        Args:
+            version (str): The laravel/laravel version constraint (None for the latest version).
+            max_age (int): The number of days after which the snapshot is not returned.
+
+        Returns:
+            str: The snapshot key, or None if there is no (recent enough) snapshot.
+        """
+
+        pointer = self._pointer_path(version)
+
+        try:
+            with open(pointer) as file:
+                key = file.read().strip()
+
+            age = time.time() - os.stat(pointer).st_mtime
+        except FileNotFoundError:
+            return None
+
+        if max_age is not None and age > max_age * 24 * 60 * 60:
+            return None
+
+        return key if os.path.isdir(os.path.join(self._directory, key)) else None
+
+    def capture(self, application_directory, version=None):
+        """
+        Capture an application in the store, and mark it as the latest snapshot of the version constraint.
+
+        Args:
+            application_directory (str): The path to the Laravel application.
+            version (str): The laravel/laravel version constraint used to install the application.
+
+        Returns:
+            str: The snapshot key.
+        """
+
+        key = SnapshotStore.key(application_directory)
+        snapshot_directory = os.path.join(self._directory, key)
+
+        if not os.path.isdir(snapshot_directory):
+            temporary_directory = os.path.join(self._directory, f".{uuid.uuid4().hex}.tmp")
+
+            self._copy_tree(application_directory, temporary_directory, ("reflink", "copy"), writable=False)
+
+            try:
+                os.rename(temporary_directory, snapshot_directory)
+            except OSError:
+                # The same snapshot was captured by another installation in the meantime.
+                self._remove_tree(temporary_directory)
+
+        temporary_pointer = f"{self._pointer_path(version)}.{uuid.uuid4().hex}.tmp"
+
+        with open(temporary_pointer, "w") as pointer:
+            pointer.write(key)
+
+        os.replace(temporary_pointer, self._pointer_path(version))
+
+        return key
+
+    def materialize(self, key, destination):
+        """
+        Create an application from a snapshot.
+
+        Args:
+            key (str): The snapshot key.
+            destination (str): The path of the application to create; it should not exist.
+
+        Returns:
+            str: The materialization method used ("reflink", "hardlink" or "copy").
+        """
+
+        return self._copy_tree(os.path.join(self._directory, key), destination, ("reflink", "hardlink", "copy"))
+
+    def _pointer_path(self, version):
+        name = re.sub(r"[^\w.-]", "_", version) if version else "any"
+
+        return os.path.join(self._directory, f"latest-{name}")
+
+    def _copy_tree(self, source, destination, methods, writable=True):
+        """
+        Copy a directory tree. The directories are created first, and the files are then copied in parallel.
+
+        Args:
+            source (str): The directory to copy.
+            destination (str): The directory to create.
+            methods ((str,)): The copy methods to try (in order) for the files of the linked directories.
+            writable (bool): Whether the copied files are writable (by their owner) or read-only.
+
+        Returns:
+            str: The "fastest" method used.
+        """
+
+        files = []
+
+        for root, directories, names in os.walk(source):
+            relative_root = os.path.relpath(root, source)
+            linked = relative_root.split(os.sep)[0] in SnapshotStore.LINKED_DIRECTORIES
+
+            os.makedirs(os.path.join(destination, relative_root), exist_ok=relative_root != ".")
+
+            for name in directories + names:
+                path = os.path.join(root, name)
+
+                if os.path.islink(path):
+                    os.symlink(os.readlink(path), os.path.join(destination, relative_root, name))
+                elif name in names:
+                    files.append((path, os.path.join(destination, relative_root, name),
+                                  methods if linked else tuple(method for method in methods if method != "hardlink")))
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            used_methods = set(executor.map(lambda file: self._copy_file(*file, writable), files))
+
+        return next((method for method in methods if method in used_methods), methods[-1])
+
+    def _copy_file(self, source, destination, methods, writable):
+        """
+        Copy a file with the first supported method.
+
+        Returns:
+            str: The method used.
+        """
+
+        for method in methods:
+            if method in self._disabled_methods:
+                continue
+
+            try:
+                if method == "reflink":
+                    SnapshotStore._reflink(source, destination)
+                elif method == "hardlink":
+                    os.link(source, destination)
+                else:
+                    shutil.copy2(source, destination)
+            except OSError as exception:
+                if exception.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.EPERM,
+                                           errno.EMLINK, errno.ENOSYS):
+                    raise
+
+                self._disabled_methods.add(method)
+                continue
+
+            if method != "hardlink":
+                mode = stat.S_IMODE(os.stat(source).st_mode)
+                os.chmod(destination, mode | stat.S_IWUSR if writable else mode & ~0o222)
+
+            return method
+
+        raise ValueError(f"The file {source} could not be copied.")
+
+    @staticmethod
+    def _reflink(source, destination):
+        """
+        Clone a file (copy-on-write) through the Linux FICLONE ioctl.
+        """
+
+        ficlone = 0x40049409
+
+        with open(source, "rb") as source_file:
+            with open(destination, "wb") as destination_file:
+                try:
+                    fcntl.ioctl(destination_file.fileno(), ficlone, source_file.fileno())
+                except OSError:
+                    destination_file.close()
+                    os.unlink(destination)
+
+                    raise
+
+    @staticmethod
+    def _remove_tree(directory):
+        """
+        Remove a directory tree containing read-only files.
+        """
+
+        for root, directories, names in os.walk(directory):
+            os.chmod(root, 0o700)
+
+        shutil.rmtree(directory)
+
+
+class Prefetcher:
+    """
+    This class is responsible for pulling the docker images used by the project, building the php image, and warming
+    the composer cache in the background (e.g.: while the user is answering the questions about the project).
+
+    Attributes:
+        Prefetcher.ADDITIONAL_IMAGES ((str,)):
+            The images used by the installer, which are not defined in the docker-compose.yml template.
+
+        _configuration (dict):
+            The configuration / environment variables of the project.
+
+        _max_workers (int):
+            The maximum number of commands to run at the same time.
+
+        _cancelled (threading.Event):
+            Set when the prefetching is cancelled.
+
+        _processes (set):
+            The currently running processes.
+
+        _futures (dict):
+            A mapping of the task names to their futures.
+
+        failures (dict):
+            A mapping of the failed task names to their error (the exit code, and the last line of the error output,
+            or the exception).
+
+        _reported (set):
+            The names of the failed tasks already reported to the user.
+    """
+
+    ADDITIONAL_IMAGES = ("composer",)
+
+    def __init__(self, configuration, max_workers=8):
+        self._configuration = configuration
+        self._max_workers = max_workers
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._futures = {}
+        self.failures = {}
+        self._reported = set()
+
+    @staticmethod
+    def images(profiles=()):
+        """
+        Get the images of the services of the docker-compose.yml template which are started with the compose profiles
+        (the services without profiles are always started), with their tags resolved from the project.env template.
+
+        Args:
+            profiles ((str,)): The enabled compose profiles.
+
+        Returns:
+            [str]: The unique image names, in order of appearance.
+        """
+
+        with open(Parser.template_path("project.env")) as env:
+            tags = dict(re.findall(r"^(\w+)=([^\s\[]+)$", env.read(), re.MULTILINE))
+
+        with open(Parser.template_path("docker-compose.yml")) as compose:
+            services = compose.read().split("\nservices:\n", 1)[1].split("\n\n\nnetworks:\n", 1)[0]
+
+        images = []
+
+        for service in re.split(r"^  (?=\S)", services, flags=re.MULTILINE):
+            image = re.search(r"^    image:\s*(\S+)\s*$", service, re.MULTILINE)
+            service_profiles = re.search(r"^    profiles:\s*\[(.*)\]\s*$", service, re.MULTILINE)
+
+            if image is None:
+                continue
+
+            if service_profiles is None or set(re.findall(r'"([^"]+)"', service_profiles.group(1))) & set(profiles):
+                images.append(image.group(1))
+
+        images = [
+            re.sub(r"\$\{(\w+)\}", lambda match: tags.get(match.group(1), "latest"), image)
+            for image in images + list(Prefetcher.ADDITIONAL_IMAGES)
+        ]
+
+        return list(dict.fromkeys(images))
+
+    def tasks(self):
+        """
+        Get the commands to run in the background (none in offline mode).
+        The composer cache is not warmed if the Laravel application will be materialized from a snapshot.
+
+        Returns:
+            dict: A mapping of the task names to their commands.
+        """
+
+        # Every task requires network access.
+        if self._configuration["composer"]["offline"]:
+            return {}
+
+        user = f"{self._configuration['environment']['uid']}:{self._configuration['environment']['gid']}"
+        tasks = {
+            f"pull {image}": ["docker", "pull", "--quiet", image]
+            for image in Prefetcher.images(ProjectConfiguration.compose_profiles(self._configuration))
+        }
+
+        # The shared php base image is built once per host; docker-compose only builds the project's thin layers.
+        base_image = PhpBaseImage(runtime=self._configuration["tuning"]["runtime"])
+
+        if not base_image.exists():
+            tasks["build php-base"] = base_image.command()
+
+        laravel = self._configuration["laravel"]
+
+        if laravel["snapshots"] and SnapshotStore(cache_directory("snapshots")).latest(laravel["version"],
+                                                                                      laravel["snapshot_max_age"]):
+            return tasks
+
+        # The Laravel skeleton, and its dependencies are downloaded to the composer cache; the project is discarded.
+        tasks["composer"] = [
+            "docker", "run",
+            "--rm",
+            "--user", user,
+            *LaravelInstaller.cache_options(self._configuration),
+            "composer", "create-project",
+            "--prefer-dist",
+            "--ignore-platform-reqs",
+            "--no-scripts",
+            "--no-progress",
+            "--quiet",
+            "laravel/laravel", "/tmp/laravel", *([laravel["version"]] if laravel["version"] else [])
+        ]
+
+        return tasks
+
+    def start(self):
+        """
+        Start running the tasks in the background.
+
+        Returns:
+            self
+        """
+
+        executor = ThreadPoolExecutor(max_workers=self._max_workers)
+
+        for name, command in self.tasks().items():
+            self._futures[name] = executor.submit(self._execute, name, command)
+
+        executor.shutdown(wait=False)
+
+        return self
+
+    def join(self, *names):
+        """
+        Wait for the specified tasks (or all of them if none are specified) to complete; their failures are reported
+        (the installation does the work of a failed task again, e.g.: it downloads the packages).
+
+        Args:
+            names (str): The names of the tasks to wait for.
+
+        Returns:
+            self
+        """
+
+        wait([future for name, future in self._futures.items() if not names or name in names])
+
+        with self._lock:
+            failures = {
+                name: error for name, error in self.failures.items()
+                if (not names or name in names) and name not in self._reported
+            }
+            self._reported.update(failures)
+
+        for name, error in failures.items():
+            print(f"The background task '{name}' failed ({error}); it is done again by the installation.")
+
+        return self
+
+    def cancel(self):
+        """
+        Cancel the pending tasks, and terminate the running ones.
+
+        Returns:
+            self
+        """
+
+        self._cancelled.set()
+
+        for future in self._futures.values():
+            future.cancel()
+
+        with self._lock:
+            for process in self._processes:
+                process.terminate()
+
+        return self
+
+    def _execute(self, name, command):
+        """
+        Run a task's command, discarding its output so that it does not interfere with the user's session.
+
+        Args:
+            name (str): The name of the task.
+            command ([str]): The command to run.
+        """
+
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+
+            try:
+                process = Popen(command, stdin=DEVNULL, stdout=DEVNULL, stderr=PIPE, universal_newlines=True)
+            except OSError as exception:
+                self.failures[name] = exception
+                return
+
+            self._processes.add(process)
+
+        _, error_output = process.communicate()
+
+        with self._lock:
+            self._processes.discard(process)
+
+            if process.returncode != 0 and not self._cancelled.is_set():
+                last_line = next((line.strip() for line in reversed(error_output.splitlines()) if line.strip()), "")
+                self.failures[name] = f"exit code {process.returncode}" + (f": {last_line}" if last_line else "")
+
+
+class Env:
+    """
+    This class is responsible for the changes made to the application's (laravel) .env file.
+
+    Attributes:
+        _env_path (str):
+            The path to the application's (laravel) .env file.
+    """
+
+    def __init__(self, env_path):
+        """
+        Class constructor.
+
+        Args:
+            env_path (str):
+                The file path to the application's (laravel) .env file.
+        """
+
+        self._env_path = env_path
+
+    def replace(self, replacement):
+        """
+        Replace the environment values with the ones provided.
+
+        Args:
+            replacement (dict):
+                The values to replace the current environment with.
+                The values which are not in the current environment are appended to it.
+        """
+
+        if not isinstance(replacement, Mapping):
+            raise ValueError("The replacement argument should be a Mapping.")
+
+        dotenv.write(self._env_path, dotenv.merge(dotenv.read(self._env_path), replacement))
+
+
+class KeyPool:
+    """
+    This class is responsible for a directory of pre-generated RSA keys, so that the (slow) key generation is not done
+    while a project is being set up.
+    The keys are generated in the background by detached processes, which outlive the installation (so that it does not
+    wait for them), and each key is only ever handed out once.
+
+    Attributes:
+        KeyPool.STALE_AFTER (int):
+            The age (in seconds) after which a key being generated is considered abandoned (e.g.: its process was
+            killed).
+
+        _directory (str):
+            The directory in which the keys are stored.
+
+        _key_size (int):
+            The size of the RSA keys.
+
+        _size (int):
+            The number of keys to keep in the pool.
+
+        _processes ([Popen]):
+            The processes generating the keys in the background.
+    """
+
+    STALE_AFTER = 600
+
+    def __init__(self, directory, key_size=4096, size=4):
+        self._directory = directory
+        self._key_size = key_size
+        self._size = size
+        self._processes = []
+
+    def pop(self):
+        """
+        Take a key from the pool, or generate one if the pool is empty.
+
+        Returns:
+            RSAPrivateKey: The private key.
+        """
+
+        for path in sorted(glob.glob(os.path.join(self._directory, "*.pem"))):
+            claimed_path = f"{path}.{os.getpid()}.{threading.get_ident()}.claimed"
+
+            # The rename is atomic; if it fails, the key was claimed by another process.
+            try:
+                os.rename(path, claimed_path)
+            except OSError:
+                continue
+
+            with open(claimed_path, "rb") as key:
+                content = key.read()
+
+            os.unlink(claimed_path)
+
+            return serialization.load_pem_private_key(content, password=None, backend=default_backend())
+
+        return rsa.generate_private_key(public_exponent=65537, key_size=self._key_size, backend=default_backend())
+
+    def refill(self):
+        """
+        Generate the missing keys of the pool in background processes, which are not waited for; the keys being
+        generated (e.g.: by a previous installation) are not generated again.
+
+        Returns:
+            self
+        """
+
+        generating = 0
+
+        for path in glob.glob(os.path.join(self._directory, ".*.tmp")):
+            try:
+                if time.time() - os.stat(path).st_mtime < KeyPool.STALE_AFTER:
+                    generating += 1
+                else:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+        missing = self._size - len(glob.glob(os.path.join(self._directory, "*.pem"))) - generating
+        package_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        environment = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(filter(None, (package_directory, os.environ.get("PYTHONPATH"))))
+        }
+
+        for _ in range(max(0, missing)):
+            self._processes.append(Popen(
+                [
+                    sys.executable, "-c",
+                    "import sys; from harivansh_laravel_docker.core import KeyPool; "
+                    "KeyPool._generate(sys.argv[1], int(sys.argv[2]))",
+                    os.path.abspath(self._directory), str(self._key_size)
+                ],
+                stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL, env=environment,
+                # The processes are in their own session, so that they are not interrupted with the installation.
+                start_new_session=True
+            ))
+
+        return self
+
+    def join(self):
+        """
+        Wait for the keys being generated in the background by this pool (the installation does not).
+
+        Returns:
+            self
+        """
+
+        for process in self._processes:
+            process.wait()
+
+        return self
+
+    @staticmethod
+    def _generate(directory, key_size):
+        """
+        Generate a key, and atomically add it to the pool directory.
+
+        Args:
+            directory (str): The pool directory.
+            key_size (int): The size of the RSA key.
+        """
+
+        name = uuid.uuid4().hex
+        temporary_path = os.path.join(directory, f".{name}.tmp")
+
+        # The temporary file is created first, so that the key being generated is counted by the refills.
+        try:
+            with open(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as file:
+                key = rsa.generate_private_key(public_exponent=65537, key_size=key_size, backend=default_backend())
+                file.write(key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.TraditionalOpenSSL,
+                    encryption_algorithm=serialization.NoEncryption()
+                ))
+
+            os.replace(temporary_path, os.path.join(directory, f"{name}.pem"))
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.unlink(temporary_path)
+
+            raise
+
+
+class CertificateAuthority:
+    """
+    This class is responsible for the local certificate authority signing the projects' TLS/SSL certificates.
+    It is created once (in the user's cache directory), so that only its root certificate needs to be trusted.
+
+    Attributes:
+        CertificateAuthority.KEY_NAME (str):
+            The name of the authority's key file.
+
+        CertificateAuthority.CERTIFICATE_NAME (str):
+            The name of the authority's certificate file.
+
+        _directory (str):
+            The directory in which the authority's key and certificate are stored.
+
+        _validity (int):
+            The number of days (since creation) for which the authority's certificate will remain valid.
+
+        _key (EllipticCurvePrivateKey):
+            The authority's private key.
+
+        _certificate (x509.Certificate):
+            The authority's certificate.
+    """
+
+    KEY_NAME = "key.pem"
+    CERTIFICATE_NAME = "certificate.pem"
+
+    def __init__(self, directory, validity=3650):
+        self._directory = directory
+        self._validity = validity
+        self._key = None
+        self._certificate = None
+
+    @property
+    def certificate_path(self):
+        return os.path.join(self._directory, CertificateAuthority.CERTIFICATE_NAME)
+
+    def load(self):
+        """
+        Load the authority from its directory, creating it first if it does not exist.
+        The authority is created in a temporary directory which is then atomically renamed, so that concurrent
+        installations all end up using the same authority.
+
+        Returns:
+            self
+        """
+
+        if not os.path.isfile(self.certificate_path):
+            self._create()
+
+        with open(os.path.join(self._directory, CertificateAuthority.KEY_NAME), "rb") as key:
+            self._key = serialization.load_pem_private_key(key.read(), password=None, backend=default_backend())
+
+        with open(self.certificate_path, "rb") as certificate:
+            self._certificate = x509.load_pem_x509_certificate(certificate.read(), default_backend())
+
+        return self
+
+    def sign(self, builder):
+        """
+        Sign a certificate with the authority's key.
+
+        Args:
+            builder (x509.CertificateBuilder):
+                The certificate to sign, without its issuer.
+
+        Returns:
+            x509.Certificate: The signed certificate.
+        """
+
+        return (builder
+                .issuer_name(self._certificate.subject)
+                .add_extension(
+                    x509.AuthorityKeyIdentifier.from_issuer_public_key(self._key.public_key()), False
+                )
+                .sign(self._key, hashes.SHA256(), default_backend()))
+
+    def _create(self):
+        """
+        Create the authority's key and self-signed certificate.
+        """
+
+        key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+        name = x509.Name([
+            x509.NameAttribute(x509.NameOID.ORGANIZATION_NAME, "Laravel Docker"),
+            x509.NameAttribute(x509.NameOID.COMMON_NAME, f"Laravel Docker Local CA ({os.uname().nodename})")
+        ])
+        now = datetime.now(timezone.utc)
+
+        certificate = (
+            x509.CertificateBuilder()
+                .subject_name(name)
+                .issuer_name(name)
+                .public_key(key.public_key())
+                .serial_number(x509.random_serial_number())
+                .not_valid_before(now - timedelta(days=1))
+                .not_valid_after(now + timedelta(days=self._validity))
+                .add_extension(x509.BasicConstraints(ca=True, path_length=0), True)
+                .add_extension(x509.KeyUsage(
+                    digital_signature=False, content_commitment=False, key_encipherment=False,
+                    data_encipherment=False, key_agreement=False, key_cert_sign=True, crl_sign=True,
+                    encipher_only=False, decipher_only=False
+                ), True)
+                .add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), False)
+                .sign(key, hashes.SHA256(), default_backend())
+        )
+
+        parent_directory = os.path.dirname(os.path.abspath(self._directory))
+        temporary_directory = os.path.join(parent_directory, f".{uuid.uuid4().hex}.tmp")
+
+        os.makedirs(temporary_directory, mode=0o700)
+
+        with open(os.open(os.path.join(temporary_directory, CertificateAuthority.KEY_NAME),
+                          os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as file:
+            file.write(key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            ))
+
+        with open(os.path.join(temporary_directory, CertificateAuthority.CERTIFICATE_NAME), "wb") as file:
+            file.write(certificate.public_bytes(encoding=serialization.Encoding.PEM))
+
+        try:
+            os.rename(temporary_directory, self._directory)
+        except OSError:
+            # Another installation created the authority in the meantime.
+            for name in os.listdir(temporary_directory):
+                os.unlink(os.path.join(temporary_directory, name))
+
+            os.rmdir(temporary_directory)
+
+
+class Ssl:
+    """
+    This class is responsible for creating a x509 TLS/SSL certificate and the associated key.
+    The certificate is signed by the certificate authority provided, or self-signed if there is none.
+
+    Attributes:
+        Ssl.KEY_TYPES ((str,)):
+            The supported key types.
+
+        _hostname (str):
+            The hostname of the machine on which the certificates will be hosted.
+
+        _key_size (int):
+            The size of the SSL key (for RSA keys only).
+
+        _validity (int):
+            The number number of days (since creation) for which the certificate
+            will remain valid.
+
+        _key (bytes):
+            The TLS key content.
+
+        _certificate (bytes):
+            The TLS certificate content.
+
+        _key_type (str):
+            The type of the key (see Ssl.KEY_TYPES).
+
+        _key_pool (KeyPool):
+            The pool from which the RSA keys are taken (if any).
+
+        _authority (CertificateAuthority):
+            The (loaded) certificate authority signing the certificate (if any).
+
+        _alternative_names ((str,)):
+            The additional hostnames for which the certificate is valid.
+    """
+
+    KEY_TYPES = ("rsa", "ecdsa-p256", "ecdsa-p384", "ed25519")
+
+    def __init__(self, hostname, key_size=4096, validity=365, key_type="rsa", key_pool=None, authority=None,
+                 alternative_names=()):
+        if key_type not in Ssl.KEY_TYPES:
+            raise ValueError(f"The key type should be one of: {', '.join(Ssl.KEY_TYPES)}.")
+
+        self._hostname = hostname
+        self._key_size = key_size
+        self._validity = validity
+        self._key = None
+        self._certificate = None
+        self._key_type = key_type
+        self._key_pool = key_pool
+        self._authority = authority
+        self._alternative_names = tuple(alternative_names)
+
+    def generate(self):
+        """
+        Generate the TLS/SSL key and certificate.
+
+        Return:
+            self
+        """
+
+        key = self._generate_key()
+
+        self._key = key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            # The traditional OpenSSL format does not support ed25519 keys.
+            format=(serialization.PrivateFormat.PKCS8 if isinstance(key, ed25519.Ed25519PrivateKey)
+                    else serialization.PrivateFormat.TraditionalOpenSSL),
+            encryption_algorithm=serialization.NoEncryption()
+        )
+
+        self._certificate = self._sign(key).public_bytes(encoding=serialization.Encoding.PEM)
+
+        return self
+
+    def read(self, key_path="key.pem", certificate_path="certificate.pem"):
+        """
+        Read an existing key and certificate.
+
+        Args:
+            key_path (str): The path where the key is stored.
+            certificate_path (str): The path where the certificate is stored.
+
+        Return:
+            self
+        """
+
+        with open(key_path, "rb") as key:
+            self._key = key.read()
+
+        with open(certificate_path, "rb") as certificate:
+            self._certificate = certificate.read()
+
+        return self
+
+    def expires_within(self, days):
+        """
+        Check whether the current certificate expires within the given number of days.
+
+        Args:
+            days (int): The number of days.
+
+        Returns:
+            bool
+        """
+
+        certificate = x509.load_pem_x509_certificate(self._certificate, default_backend())
+
+        return certificate.not_valid_after_utc <= datetime.now(timezone.utc) + timedelta(days=days)
+
+    def renew(self):
+        """
+        Issue a new certificate for the current key.
+
+        Return:
+            self
+        """
+
+        key = serialization.load_pem_private_key(self._key, password=None, backend=default_backend())
+
+        self._certificate = self._sign(key).public_bytes(encoding=serialization.Encoding.PEM)
 
         return self
 
+    def _sign(self, key):
+        """
+        Create the certificate of the provided key.
+
+        Args:
+            key: The private key.
+
+        Returns:
+            x509.Certificate: The signed certificate.
+        """
+
+        name = x509.Name([
+            x509.NameAttribute(x509.NameOID.COMMON_NAME, self._hostname)
+        ])
+
+        san = x509.SubjectAlternativeName([
+            x509.DNSName(hostname) for hostname in (self._hostname,) + self._alternative_names
+        ])
+
+        now = datetime.now(timezone.utc)
+
+        builder = (
+            x509.CertificateBuilder()
+                .subject_name(name)
+                .public_key(key.public_key())
+                .serial_number(x509.random_serial_number())
+                .not_valid_before(now - timedelta(minutes=5))
+                .not_valid_after(now + timedelta(days=self._validity))
+                .add_extension(san, False)
+        )
+
+        if self._authority is None:
+            return (builder
+                    .issuer_name(name)
+                    .add_extension(x509.BasicConstraints(ca=True, path_length=0), False)
+                    .sign(key, Ssl._signature_hash(key), default_backend()))
+
+        return self._authority.sign(
+            builder
+                .add_extension(x509.BasicConstraints(ca=False, path_length=None), True)
+                .add_extension(x509.ExtendedKeyUsage([x509.ExtendedKeyUsageOID.SERVER_AUTH]), False)
+        )
+
+    def _generate_key(self):
+        """
+        Generate a private key of the configured type.
+
+        Returns:
+            The private key.
+        """
+
+        if self._key_type == "ecdsa-p256":
+            return ec.generate_private_key(ec.SECP256R1(), default_backend())
+        elif self._key_type == "ecdsa-p384":
+            return ec.generate_private_key(ec.SECP384R1(), default_backend())
+        elif self._key_type == "ed25519":
+            return ed25519.Ed25519PrivateKey.generate()
+        elif self._key_pool is not None:
+            return self._key_pool.pop()
+        else:
+            return rsa.generate_private_key(public_exponent=65537, key_size=self._key_size, backend=default_backend())
+
+    @staticmethod
+    def _signature_hash(key):
+        """
+        Get the hash algorithm used by a key to sign a certificate (ed25519 keys do not take any).
+
+        Args:
+            key: The private key signing the certificate.
+
+        Returns:
+            HashAlgorithm: The hash algorithm.
+        """
+
+        if isinstance(key, ed25519.Ed25519PrivateKey):
+            return None
+        elif isinstance(key, ec.EllipticCurvePrivateKey) and key.curve.key_size >= 384:
+            return hashes.SHA384()
+        else:
+            return hashes.SHA256()
+
     def write(self, key_path="key.pem", certificate_path="certificate.pem"):
         """
         Write the generated certificates to a binary file.
@@ -0,0 +1,268 @@
+"""
+A dependency-free .env file engine.
+
+The file is read once, and split into entries by a single-pass tokenizer which keeps the comments, the quoting, the
+"export" prefixes, and the ordering of the variables, so that a file can be rewritten without losing any of them.
+This module only uses the standard library, as it is also embedded in the generated "run" script.
+"""
+
+import os
+import re
+import tempfile
+from collections import namedtuple
+
+# A line (or several lines, for the multi-line double-quoted values) of a .env file.
+#   kind: "variable", "comment", "blank", or "raw" (an unrecognised line, kept as is).
+#   key, value: the variable's name, and (unquoted) value.
+#   text: the variable's value as written in the file (with its quotes), or the whole line as written for the comments
+#     and the unknown lines (nothing for the blank ones).
+#   export: whether the variable has an "export" prefix.
+#   comment: the variable's inline comment (with its "#" character).
+Entry = namedtuple("Entry", ("kind", "key", "value", "text", "export", "comment"))
+
+_VARIABLE_REGEX = re.compile(r"^(?P<export>export\s+)?(?P<key>[A-Za-z_][A-Za-z0-9_.]*)\s*=\s*(?P<remaining>.*)$", re.S)
+_UNQUOTED_REGEX = re.compile(r"^(?P<value>.*?)(?:(?:^|\s+)(?P<comment>#.*))?$", re.S)
+_QUOTED_REGEX = {
+    '"': re.compile(r'^"(?P<value>(?:[^"\\]|\\.)*)"\s*(?P<comment>#.*)?$', re.S),
+    "'": re.compile(r"^'(?P<value>[^']*)'\s*(?P<comment>#.*)?$", re.S),
+}
+# A double quote which is not escaped (by an odd number of backslashes).
+_CLOSING_QUOTE_REGEX = re.compile(r'(?<!\\)(?:\\\\)*"')
+_ESCAPE_REGEX = re.compile(r"\\(.)", re.S)
+_UNESCAPES = {"n": "\n", "r": "\r", "t": "\t"}
+_QUOTING_REGEX = re.compile(r"[\s#\"'\\]")
+
+
+def tokenize(content):
+    """
+    Split the content of a .env file into its entries (one pass over the lines).
+
+    Args:
+        content (str): The content of the .env file.
+
+    Returns:
+        [Entry]: The entries of the .env file, in order.
+    """
+
+    entries = []
+    lines = content.splitlines()
+    index = 0
+
+    while index < len(lines):
+        # The comments and the unknown lines are kept as they are written (e.g.: with their indentation).
+        text = lines[index]
+        line = text.strip()
+        index += 1
+
+        if not line:
+            entries.append(Entry("blank", None, None, "", False, None))
+            continue
+
+        if line.startswith("#"):
+            entries.append(Entry("comment", None, None, text, False, None))
+            continue
+
+        matches = _VARIABLE_REGEX.match(line)
+
+        if matches is None:
+            entries.append(Entry("raw", None, None, text, False, None))
+            continue
+
+        # A double-quoted value may span several lines, up to the first one closing its quote (an unterminated one is
+        # only the current line).
+        remaining = matches.group("remaining")
+
+        if remaining.startswith('"') and _CLOSING_QUOTE_REGEX.search(remaining, 1) is None:
+            end = next((end for end in range(index, len(lines)) if _CLOSING_QUOTE_REGEX.search(lines[end])), None)
+
+            if end is not None:
+                candidate = "\n".join([line] + [following.rstrip() for following in lines[index:end + 1]])
+                multiline_matches = _VARIABLE_REGEX.match(candidate)
+
+                if _QUOTED_REGEX['"'].match(multiline_matches.group("remaining")) is not None:
+                    line, matches, index = candidate, multiline_matches, end + 1
+
+        remaining = matches.group("remaining")
+        quote = remaining[:1]
+        value_matches = (_QUOTED_REGEX[quote] if quote in _QUOTED_REGEX else _UNQUOTED_REGEX).match(remaining)
+
+        if value_matches is None:
+            entries.append(Entry("raw", None, None, text, False, None))
+            continue
+
+        value = value_matches.group("value")
+        comment = value_matches.group("comment")
+        text = remaining[:value_matches.start("comment")].rstrip() if comment else remaining
+
+        if quote == '"':
+            value = _ESCAPE_REGEX.sub(lambda escape: _UNESCAPES.get(escape.group(1), escape.group(1)), value)
+
+        entries.append(Entry("variable", matches.group("key"), value, text, bool(matches.group("export")), comment))
+
+    return entries
+
+
+def parse(content):
+    """
+    Parse the variables of a .env file.
+
+    Args:
+        content (str): The content of the .env file.
+
+    Returns:
+        dict: The (unquoted) values of the variables, keyed by their names.
+    """
+
+    return {entry.key: entry.value for entry in tokenize(content) if entry.kind == "variable"}
+
+
+def quote(value):
+    """
+    Format a value for a .env file; it is only double-quoted if it has to be.
+
+    Args:
+        value (str): The value to format.
+
+    Returns:
+        str: The formatted value.
+    """
+
+    value = str(value)
+
+    if _QUOTING_REGEX.search(value) is None:
+        return value
+
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+
+    return f'"{escaped}"'
+
+
+def render(entries):
+    """
+    Create the content of a .env file from its entries.
+
+    Args:
+        entries ([Entry]): The entries of the .env file.
+
+    Returns:
+        str: The content of the .env file.
+    """
+
+    lines = []
+
+    for entry in entries:
+        if entry.kind != "variable":
+            lines.append(entry.text)
+            continue
+
+        line = f"{'export ' if entry.export else ''}{entry.key}={entry.text}"
+
+        if entry.comment:
+            line = f"{line}{' ' * 4}{entry.comment}"
+
+        lines.append(line)
+
+    return "".join(f"{line}\n" for line in lines)
+
+
+def merge(content, values):
+    """
+    Replace the variables of a .env file with the values provided; the missing variables are appended to the file.
+
+    Args:
+        content (str): The content of the .env file.
+        values (dict): The new values of the variables.
+
+    Returns:
+        str: The content of the updated .env file.
+    """
+
+    entries = []
+    replaced = set()
+
+    for entry in tokenize(content):
+        if entry.kind == "variable" and entry.key in values:
+            entry = entry._replace(value=str(values[entry.key]), text=quote(values[entry.key]))
+            replaced.add(entry.key)
+
+        entries.append(entry)
+
+    entries += [
+        Entry("variable", key, str(value), quote(value), False, None)
+        for key, value in values.items() if key not in replaced
+    ]
+
+    return render(entries)
+
+
+def diff(old, new):
+    """
+    Compare two sets of variables.
+
+    Args:
+        old (dict): The previous variables (e.g.: parsed from a .env file).
+        new (dict): The current variables.
+
+    Returns:
+        dict: The "added", "removed", and "changed" (old value, new value) variables.
+    """
+
+    return {
+        "added": {key: value for key, value in new.items() if key not in old},
+        "removed": {key: value for key, value in old.items() if key not in new},
+        "changed": {key: (old[key], value) for key, value in new.items() if key in old and old[key] != value},
+    }
+
+
+def read(path):
+    """
+    Read a .env file at once.
+
+    Args:
+        path (str): The path to the .env file.
+
+    Returns:
+        str: The content of the .env file.
+    """
+
+    with open(path) as file:
+        return file.read()
+
+
+def write(path, content):
+    """
+    Write a .env file atomically (i.e.: a reader sees either the previous content, or the new one).
+    The content is written to a temporary file in the same directory, synced, and then renamed over the file.
+
+    Args:
+        path (str): The path to the .env file.
+        content (str): The content of the .env file.
+    """
+
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=directory)
+
+    try:
+        with os.fdopen(descriptor, "w") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+
+        try:
+            os.chmod(temporary_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(temporary_path, 0o644)
+
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+        raise
+
+    directory_descriptor = os.open(directory, os.O_RDONLY)
+
+    try:
+        os.fsync(directory_descriptor)
+    finally:
+        os.close(directory_descriptor)
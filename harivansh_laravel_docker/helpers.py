@@ -1,9 +1,18 @@
+import contextlib
+import cProfile
+import functools
+import itertools
+import json
 import os
-import random
+import platform
 import re
 import readline
-import string
+import threading
+import time
+import uuid
 from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from subprocess import CalledProcessError, CompletedProcess, Popen
 
 from harivansh_scripting_utilities.print import success, info, warning, error
 
@@ -127,10 +136,16 @@ class Parser:
     """
     This is the parser responsible for processing the project configuration templates provided.
 
+    The templates are compiled once (by a single regex scan) into a list of alternating literal strings and variable
+    names, which is then rendered with a single join. Both the template files and the compiled templates are cached.
+
     Attributes:
         Parser.TEMPLATES_DIRECTORY_PATH (str):
             The absolute path to the templates directory.
 
+        Parser._templates (dict):
+            A cache of the template files' contents, keyed by their absolute path and modification time.
+
     Properties:
         _raw_template_string (str)
         parsed_template_string (str)
@@ -138,6 +153,8 @@ class Parser:
 
     TEMPLATES_DIRECTORY_PATH = f"{os.path.dirname(os.path.abspath(__file__))}/templates"
 
+    _templates = {}
+
     def __init__(self):
         self._raw_template_string = None
         self.parsed_template_string = None
@@ -154,14 +171,20 @@ class Parser:
     def read_template(self, template_path):
         """
         Set the raw template string from the template file specified.
+        The file is only read again if it was modified since it was last read.
 
         Args:
             template_path (str):
                 The path to the template file.
         """
 
-        with open(template_path) as template:
-            self._raw_template_string = template.read()
+        key = (os.path.abspath(template_path), os.stat(template_path).st_mtime_ns)
+
+        if key not in Parser._templates:
+            with open(template_path) as template:
+                Parser._templates[key] = template.read()
+
+        self._raw_template_string = Parser._templates[key]
 
         return self
 
@@ -189,6 +212,9 @@ class Parser:
 
             delimiters_creator (callable):
                 The function through which the variable keys are passed to return a token (see above for description).
+
+        Raises:
+            ValueError: If some of the template's variables are not provided (they are all listed).
         """
 
         if not isinstance(variables, Mapping):
@@ -197,23 +223,57 @@ class Parser:
         if not callable(delimiters_creator):
             raise ValueError("The delimiters_creator argument should be a callable.")
 
-        parsed_template = self._raw_template_string
+        tokens = Parser.compile(self._raw_template_string, Parser.token_pattern(delimiters_creator, variables))
+        missing_variables = sorted(set(tokens[1::2]) - set(variables))
 
-        for name, value in variables.items():
-            parsed_template = parsed_template.replace(delimiters_creator(name), str(value))
+        if missing_variables:
+            raise ValueError(f"There are still unparsed variables in the template: {', '.join(missing_variables)}.")
 
-        unique_token = "".join(random.choices(f"{string.ascii_uppercase}_", k=64))
-        # The following regex is created according to the delimiters_creator passed to this method.
-        token_regex = re.compile(
-            r".*" + re.escape(delimiters_creator(unique_token)).replace(unique_token, r"\w[\w_]*") + r".*"
+        self.parsed_template_string = "".join(
+            str(variables[token]) if index % 2 else token for index, token in enumerate(tokens)
         )
 
-        if token_regex.match(parsed_template) is not None:
-            raise ValueError("There are still unparsed variables in the template.")
+        return self
 
-        self.parsed_template_string = parsed_template
+    @staticmethod
+    def token_pattern(delimiters_creator, variable_names=()):
+        """
+        Create the regex pattern matching the variables' tokens created by the delimiters_creator.
+        The variable names are captured by the pattern's only group: the provided names are matched as they are, and
+        any other (word) name is matched too.
 
-        return self
+        Args:
+            delimiters_creator (callable): The function creating a variable's token from its name.
+            variable_names ((str,)): The names of the provided variables.
+
+        Returns:
+            str: The regex pattern.
+        """
+
+        placeholder = "PARSER_VARIABLE_NAME"
+        prefix, _, suffix = delimiters_creator(placeholder).partition(placeholder)
+        # The longest names are tried first, and the other names are still captured, to be reported as missing.
+        names = [re.escape(name) for name in sorted(variable_names, key=lambda name: (-len(name), name))]
+        names.append(r"\w[\w_]*")
+
+        return re.escape(prefix) + "(" + "|".join(names) + ")" + re.escape(suffix)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def compile(template_string, token_pattern):
+        """
+        Compile a template into a list of alternating literal strings and variable names.
+        e.g.: "Hello [[NAME]]!" => ["Hello ", "NAME", "!"]
+
+        Args:
+            template_string (str): The template to compile.
+            token_pattern (str): The regex pattern matching the variables' tokens (see Parser.token_pattern).
+
+        Returns:
+            (str,): The compiled template.
+        """
+
+        return tuple(re.split(token_pattern, template_string))
 
     def output(self, filepath):
         """
@@ -231,9 +291,485 @@ class Parser:
             file.write(self.parsed_template_string)
 
 
+class Renderer:
+    """
+    This class renders a set of templates in memory, and then writes them all in one pass.
+    Nothing is written if any of the templates cannot be rendered.
+
+    Attributes:
+        _max_workers (int):
+            The maximum number of files to write at the same time.
+
+        _files ([(str, str, int)]):
+            The path, content, and mode of each rendered file.
+    """
+
+    def __init__(self, max_workers=4):
+        self._max_workers = max_workers
+        self._files = []
+
+    def render(self, manifest):
+        """
+        Render the templates described in the manifest.
+
+        Args:
+            manifest ([dict]):
+                The description of each file to render.
+                e.g.: [{
+                    "template": "configuration/nginx/default.conf",  <---- The path within the templates directory
+                    "destination": "One/configuration/nginx/conf.d/default.conf",
+                    "variables": { "PROJECT_DOMAIN": "one.local" },  <---- Optional (defaults to {})
+                    "mode": 0o644                                    <---- Optional (defaults to 0o644)
+                }]
+
+        Returns:
+            self
+        """
+
+        for file in manifest:
+            parsed_template_string = (Parser()
+                                      .read_template(Parser.template_path(file["template"]))
+                                      .parse(file.get("variables", {}))
+                                      .parsed_template_string)
+
+            self._files.append((file["destination"], parsed_template_string, file.get("mode", 0o644)))
+
+        return self
+
+    def write(self):
+        """
+        Write the rendered files, in parallel if more than one worker is allowed.
+
+        Raises:
+            ValueError: If one of the files already exists.
+
+        Returns:
+            self
+        """
+
+        if self._max_workers > 1:
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                list(executor.map(lambda file: Renderer._write(*file), self._files))
+        else:
+            for file in self._files:
+                Renderer._write(*file)
+
+        return self
+
+    @staticmethod
+    def _write(path, content, mode):
+        """
+        Create a file with its final mode (subject to the umask) in a single open call, failing if it already exists.
+        """
+
+        try:
+            descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+        except FileExistsError:
+            raise ValueError(f"Another file with the same name already exists: {path}.")
+
+        with open(descriptor, "w") as file:
+            file.write(content)
+
+
+class Scheduler:
+    """
+    This class runs a set of interdependent steps concurrently, each step starting as soon as all of its dependencies
+    have completed.
+
+    Attributes:
+        _steps (dict):
+            A mapping of the step names to their callables and dependencies.
+            e.g.: { "ssl": (callable, ("structure",)) }
+
+        _max_workers (int):
+            The maximum number of steps to run at the same time.
+
+        timings (dict):
+            A mapping of the completed step names to their timings (in seconds).
+            e.g.: { "ssl": { "start": 0.01, "end": 3.2, "duration": 3.19, "critical_path": 3.21 } }
+    """
+
+    def __init__(self, max_workers=4):
+        self._steps = {}
+        self._max_workers = max_workers
+        self._epoch = None
+        self.timings = {}
+
+    def add(self, name, step, dependencies=()):
+        """
+        Declare a step in the dependency graph.
+
+        Args:
+            name (str):
+                The unique name of the step.
+
+            step (callable):
+                The callable to run. It is called without any argument.
+
+            dependencies ((str,)):
+                The names of the steps which should complete before this one starts.
+        """
+
+        if name in self._steps:
+            raise ValueError(f"The step '{name}' has already been declared.")
+
+        if not callable(step):
+            raise ValueError(f"The step '{name}' is not a callable.")
+
+        self._steps[name] = (step, tuple(dependencies))
+
+        return self
+
+    def run(self):
+        """
+        Run all the declared steps which have not been run yet.
+        Steps declared in a previous run are considered as completed dependencies.
+
+        Raises:
+            ValueError: If the dependency graph is invalid.
+            Exception: The first exception raised by a step. The remaining steps are not started.
+        """
+
+        self._validate()
+
+        if self._epoch is None:
+            self._epoch = time.monotonic()
+
+        pending = {name: set(dependencies) - set(self.timings)
+                   for name, (step, dependencies) in self._steps.items() if name not in self.timings}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            while pending or running:
+                for name in [name for name, dependencies in pending.items() if not dependencies]:
+                    del pending[name]
+                    running[executor.submit(self._time, name)] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)
+                    exception = future.exception()
+
+                    if exception is not None:
+                        wait(running)
+
+                        raise exception
+
+                    for dependencies in pending.values():
+                        dependencies.discard(name)
+
+        return self
+
+    def report(self):
+        """
+        Create a table of the completed steps' timings, ordered by their start time.
+
+        Returns:
+            str: The timings table.
+        """
+
+        rows = [("Step", "Start", "Duration", "Critical path")]
+        rows += [(name, f"{timing['start']:.2f}s", f"{timing['duration']:.2f}s", f"{timing['critical_path']:.2f}s")
+                 for name, timing in sorted(self.timings.items(), key=lambda item: item[1]["start"])]
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+
+        return "\n".join(
+            "    ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows
+        )
+
+    def _time(self, name):
+        """
+        Run a step, and record its timings.
+        The critical path time of a step is its own duration added to the longest critical path of its dependencies.
+
+        Args:
+            name (str): The name of the step to run.
+        """
+
+        step, dependencies = self._steps[name]
+        start = time.monotonic() - self._epoch
+
+        step()
+
+        end = time.monotonic() - self._epoch
+
+        self.timings[name] = {
+            "start": start,
+            "end": end,
+            "duration": end - start,
+            "critical_path": end - start + max(
+                (self.timings[dependency]["critical_path"] for dependency in dependencies), default=0
+            )
+        }
+
+    def _validate(self):
+        """
+        Validate the dependency graph.
+
+        Raises:
+            ValueError: If a step depends on an undeclared step, or if the graph contains a cycle.
+        """
+
+        for name, (step, dependencies) in self._steps.items():
+            for dependency in dependencies:
+                if dependency not in self._steps:
+                    raise ValueError(f"The step '{name}' depends on the undeclared step '{dependency}'.")
+
+        visited = set()
+
+        def visit(name, path):
+            if name in path:
+                raise ValueError(f"The steps {' -> '.join(path + (name,))} form a cycle.")
+
+            if name not in visited:
+                for dependency in self._steps[name][1]:
+                    visit(dependency, path + (name,))
+
+                visited.add(name)
+
+        for name in self._steps:
+            visit(name, ())
+
+
+class Tracer:
+    """
+    This class records the spans of an installation: a monotonic start, and stop time (and CPU time) of each call
+    wrapped by the log decorator, and of each command run by run_traced. The spans of a thread are nested: a span
+    started while another one is open in the same thread is its child.
+
+    The outermost span of each thread (i.e.: each installation step, as they run on the scheduler's threads) can also
+    be profiled, in which case a cProfile statistics file is written for it.
+
+    Attributes:
+        spans ([dict]):
+            The completed spans, in the order in which they were completed.
+            e.g.: { "id": 2, "parent": 1, "depth": 1, "name": "Application._ssl", "kind": "function",
+                    "thread": "ThreadPoolExecutor-0_0", "start": 0.01, "end": 3.2, "wall": 3.19, "cpu": 0.42 }
+
+        run_id (str):
+            The identifier of the traced run (shared by its JSON lines).
+
+        profile_directory (str):
+            The directory in which the statistics file of each profiled span is written (None disables profiling).
+
+        _epoch (float):
+            The monotonic time at which the tracer was reset.
+
+        _started_at (float):
+            The (wall clock) time at which the tracer was reset.
+
+        _ids (itertools.count):
+            The generator of the span identifiers.
+
+        _local (threading.local):
+            The stack of the open spans of each thread.
+
+        _lock (threading.Lock):
+            The lock guarding the completed spans.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, profile_directory=None):
+        """
+        Discard the recorded spans, and start a new run.
+
+        Args:
+            profile_directory (str):
+                The directory in which the statistics file of each step is written (None disables profiling).
+
+        Returns:
+            self
+        """
+
+        with self._lock:
+            self.spans = []
+            self.run_id = uuid.uuid4().hex
+            self.profile_directory = profile_directory
+            self._epoch = time.monotonic()
+            self._started_at = time.time()
+            self._ids = itertools.count(1)
+            self._local = threading.local()
+
+        if profile_directory is not None:
+            os.makedirs(profile_directory, exist_ok=True)
+
+        return self
+
+    @contextlib.contextmanager
+    def span(self, name, kind="function"):
+        """
+        Record a span around a block of code.
+        The CPU time of a function span is the CPU time of its thread; the one of a subprocess span is set by the
+        caller (see run_traced).
+
+        Args:
+            name (str):
+                The name of the span.
+
+            kind (str):
+                The kind of the span ("function", or "subprocess").
+
+        Yields:
+            dict: The span, which may be completed by the caller.
+        """
+
+        stack = self._local.__dict__.setdefault("stack", [])
+        span = {
+            "id": next(self._ids),
+            "parent": stack[-1]["id"] if stack else None,
+            "depth": len(stack),
+            "name": name,
+            "kind": kind,
+            "thread": threading.current_thread().name,
+        }
+        profiler = None
+
+        # A thread can only have one active profiler (the nested spans are part of their outermost span's profile).
+        if self.profile_directory is not None and not stack and kind == "function":
+            profiler = cProfile.Profile()
+
+        stack.append(span)
+        cpu_start = time.thread_time()
+        span["start"] = time.monotonic() - self._epoch
+
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12 (sys.monitoring) only allows a single active profiler per interpreter.
+                profiler = None
+
+        try:
+            yield span
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(os.path.join(self.profile_directory, f"{name}.{span['id']}.pstats"))
+
+            span["end"] = time.monotonic() - self._epoch
+            span["wall"] = span["end"] - span["start"]
+            span.setdefault("cpu", time.thread_time() - cpu_start)
+            stack.pop()
+
+            with self._lock:
+                self.spans.append(span)
+
+    def report(self):
+        """
+        Create a table of the completed spans, ordered by their start time; the nested spans are indented.
+
+        Returns:
+            str: The spans table.
+        """
+
+        rows = [("Span", "Start", "Wall", "CPU")]
+        rows += [(f"{'  ' * span['depth']}{span['name']}", f"{span['start']:.2f}s", f"{span['wall']:.2f}s",
+                  f"{span['cpu']:.2f}s")
+                 for span in sorted(self.spans, key=lambda span: (span["start"], span["depth"]))]
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+
+        return "\n".join(
+            "    ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows
+        )
+
+    def json_lines(self, **fields):
+        """
+        Serialize the completed spans as JSON lines (one object per span), to be collected across hosts.
+
+        Args:
+            fields:
+                Additional fields of every line (e.g.: the project name).
+
+        Returns:
+            str: The JSON lines.
+        """
+
+        context = {"run": self.run_id, "host": platform.node(), "started_at": self._started_at, **fields}
+
+        return "".join(
+            f"{json.dumps({**context, **span}, sort_keys=True)}\n"
+            for span in sorted(self.spans, key=lambda span: span["id"])
+        )
+
+
+# The tracer of the current process, to which the log decorator, and run_traced record their spans.
+tracer = Tracer()
+
+
+def run_traced(command, check=False, **kwargs):
+    """
+    Run a command (like subprocess.run, without capturing its output), and record its wall, and CPU time in a span.
+    The CPU time is the one of the child process only (e.g.: the docker client for "docker run", not the container).
+
+    Args:
+        command ([str]):
+            The command to run.
+
+        check (bool):
+            Whether an exception is raised if the command fails.
+
+        kwargs:
+            The other arguments of subprocess.Popen.
+
+    Raises:
+        CalledProcessError: If the command fails, and check is True.
+
+    Returns:
+        CompletedProcess: The completed process.
+    """
+
+    with tracer.span(" ".join(command[:2]), kind="subprocess") as span:
+        process = Popen(command, **kwargs)
+
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        except BaseException:
+            process.kill()
+            process.wait()
+
+            raise
+
+        # The process was reaped by os.wait4, so that its resource usage is known; Popen is told its exit status.
+        process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        span["cpu"] = usage.ru_utime + usage.ru_stime
+
+    if check and process.returncode != 0:
+        raise CalledProcessError(process.returncode, command)
+
+    return CompletedProcess(command, process.returncode)
+
+
+def cache_directory(*components):
+    """
+    Get (and create if needed) a directory in the user's cache directory dedicated to this package.
+
+    Args:
+        components (str):
+            The path components of the directory, relative to the package's cache directory.
+
+    Returns:
+        str: The absolute path to the directory.
+    """
+
+    directory = os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+        "harivansh-laravel-docker",
+        *components
+    )
+
+    os.makedirs(directory, exist_ok=True)
+
+    return directory
+
+
 def log(message, type="info", position="before", prefix="\n", suffix="\n\n"):
     """
-    Outputs a log message before or after running the decorated function
+    Outputs a log message before or after running the decorated function, which is recorded as a span of the tracer.
+    The span is named after the decorated function; stacked log decorators only record a single span.
 
     Args:
         message (str):
@@ -279,17 +815,23 @@ def log(message, type="info", position="before", prefix="\n", suffix="\n\n"):
         print(f"{prefix}{prettified_message}{suffix}", end="")
 
     def decorator(function):
+        traced = not getattr(function, "_traced", False)
+
+        @functools.wraps(function)
         def wrapper(*args, **kwargs):
             if position == "before":
                 print_message()
 
-            result = function(*args, **kwargs)
+            with tracer.span(function.__qualname__) if traced else contextlib.nullcontext():
+                result = function(*args, **kwargs)
 
             if position == "after":
                 print_message()
 
             return result
 
+        wrapper._traced = True
+
         return wrapper
 
     return decorator
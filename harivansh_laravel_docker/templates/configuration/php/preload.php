@@ -0,0 +1,21 @@
+<?php
+
+/*
+ * Preload the classes of the Laravel framework used by most requests in the opcache, when the php service starts.
+ * The files are required through the composer autoloader, so that their parent classes, and interfaces are loaded
+ * (and preloaded) first.
+ */
+
+require '/var/www/html/vendor/autoload.php';
+
+$files = [
+[[PRELOAD_FILES]]
+];
+
+foreach ($files as $file) {
+    try {
+        require_once "/var/www/html/{$file}";
+    } catch (Throwable $exception) {
+        // The classes which cannot be loaded (e.g.: their optional dependencies are missing) are not preloaded.
+    }
+}
@@ -13,6 +13,10 @@ then
     exit 1
 fi
 
-cron -f &
+# The scheduler only runs in the php service (not in the queue workers).
+if [ "${CRON_ENABLED:-1}" = "1" ]
+then
+    cron -f &
+fi
 
 exec docker-php-entrypoint "${@}"
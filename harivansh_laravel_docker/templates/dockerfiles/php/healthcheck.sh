@@ -0,0 +1,14 @@
+#! /bin/sh
+
+# The healthcheck of the php service: php-fpm answers its ping page (over FastCGI), or the Laravel Octane server
+# answers an HTTP request (whatever its status code).
+
+set -e
+
+if [ "${PHP_RUNTIME:-fpm}" = "fpm" ]
+then
+    SCRIPT_NAME=/ping SCRIPT_FILENAME=/ping REQUEST_METHOD=GET \
+        cgi-fcgi -bind -connect [[FASTCGI_CONNECT]] | grep -q pong
+else
+    curl --silent --output /dev/null --max-time 2 http://127.0.0.1:[[OCTANE_PORT]]/
+fi
@@ -0,0 +1,41 @@
+#! /bin/sh
+
+# The server of the php service: php-fpm, or a Laravel Octane server (PHP_RUNTIME: swoole, or roadrunner).
+# Generated for the "[[PROFILE]]" performance profile, on a host with [[HOST_CPUS]] CPUs.
+
+set -e
+
+if [ "${PHP_RUNTIME:-fpm}" = "fpm" ]
+then
+    exec php-fpm
+fi
+
+cd /var/www/html
+
+# The Octane server runs as www-data (php-fpm drops its privileges itself).
+artisan() {
+    HOME=/home/www-data setpriv --reuid=www-data --regid=www-data --init-groups php artisan "${@}"
+}
+
+# Hot reload: the workers are reloaded when a file of the application changes (polled every second, as the
+# --watch option of octane:start requires node, and chokidar in the php image).
+watch() {
+    touch /tmp/octane-watch
+
+    while sleep 1
+    do
+        if [ -n "$(find app bootstrap config database lang resources routes .env -newer /tmp/octane-watch \
+                   -not -path 'bootstrap/cache/*' -print 2> /dev/null | head -n 1)" ]
+        then
+            touch /tmp/octane-watch
+            artisan octane:reload --server="${PHP_RUNTIME}" || true
+        fi
+    done
+}
+
+if [ "[[WATCH]]" = "1" ]
+then
+    watch &
+fi
+
+exec artisan octane:start --server="${PHP_RUNTIME}" [[OPTIONS]]
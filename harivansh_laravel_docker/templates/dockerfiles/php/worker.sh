@@ -0,0 +1,40 @@
+#! /bin/sh
+
+# The queue workers of a replica of the queue service.
+# Generated for the "[[PROFILE]]" performance profile, on a host with [[HOST_CPUS]] CPUs.
+
+set -e
+
+if [ "${QUEUE_RUNNER}" = "horizon" ]
+then
+    # Horizon balances its own worker processes (see the application's config/horizon.php file).
+    exec php artisan horizon
+fi
+
+# Run the worker processes of a queue, one at a time; a worker is started again when it is recycled (after
+# --max-jobs jobs, --max-time seconds, or if it uses more than --memory megabytes).
+work() {
+    trap 'kill -TERM "${pid}" 2> /dev/null; wait "${pid}"; exit 0' TERM INT
+
+    while true
+    do
+        php artisan queue:work redis \
+            --queue="${1}" \
+            --sleep=3 \
+            --tries=3 \
+            --timeout=60 \
+            --max-jobs=[[MAX_JOBS]] \
+            --max-time=[[MAX_TIME]] \
+            --memory=[[MEMORY]] &
+        pid="${!}"
+
+        wait "${pid}" || sleep 1
+    done
+}
+
+# The workers finish their current job when the service is stopped.
+trap 'kill -TERM $(jobs -p) 2> /dev/null; wait; exit 0' TERM INT
+
+[[WORKERS]]
+
+wait
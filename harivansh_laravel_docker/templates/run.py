@@ -1,25 +1,1799 @@
 #! /usr/bin/env python3
 
 import argparse
+import asyncio
+import calendar
+import contextlib
+import datetime
+import http.client
+import json
+import math
 import os
+import random
 import re
+import shlex
+import signal
+import socket
+import ssl
+import statistics
 import sys
-from subprocess import run
+import threading
+import time
+import urllib.parse
+from subprocess import PIPE, Popen, run, STDOUT
+
+
+# The .env engine of the harivansh-laravel-docker package, embedded so that this script has no dependencies.
+[[DOTENV_MODULE]]
 
 
 def project_environment_variables(file_path):
-    key_value_regex = re.compile(r"^(?P<key>\w+)=(?P<value>[\S]*)$")
-    environment = {}
+    return parse(read(file_path))
+
+
+class DockerEngineUnavailable(Exception):
+    """
+    The Docker Engine API cannot be used (e.g.: the socket does not exist, or the container is not running).
+    """
+
+
+class DockerExecInterrupted(Exception):
+    """
+    The connection to an exec was lost once it was started: its command may have run (or may still be running), so it
+    must not be run again (e.g.: through docker-compose).
+    """
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    An HTTP connection over a UNIX socket.
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._socket_path)
+
+
+class DockerEngine:
+    """
+    A minimal Docker Engine API client, used instead of docker-compose to run commands in the project's containers.
+    docker-compose pays for its own startup, configuration parsing, and container lookup on each call; here, the
+    container ID is resolved once (through the compose labels), and cached for the compose project.
+    """
+
+    SOCKET_PATH = "/var/run/docker.sock"
+    CACHE_PATH = ".run-cache.json"
+
+    # The stream types of the multiplexed (non-TTY) exec output.
+    STDOUT = 1
+    STDERR = 2
+
+    def __init__(self, socket_path=SOCKET_PATH, cache_path=CACHE_PATH):
+        self._socket_path = socket_path
+        self._cache_path = cache_path
+
+    @staticmethod
+    def from_environment():
+        """
+        Create a client for the docker daemon of the environment (DOCKER_HOST), if it is reachable through a socket.
+        """
+
+        docker_host = os.environ.get("DOCKER_HOST", f"unix://{DockerEngine.SOCKET_PATH}")
+
+        if not docker_host.startswith("unix://"):
+            raise DockerEngineUnavailable(f"The docker host {docker_host} is not a UNIX socket.")
+
+        return DockerEngine(docker_host[len("unix://"):])
+
+    @staticmethod
+    def compose_project(env):
+        """
+        Get the compose project name, as docker-compose computes it.
+        """
+
+        name = os.environ.get("COMPOSE_PROJECT_NAME") or env.get("COMPOSE_PROJECT_NAME")
+
+        return name or re.sub(r"[^-_a-z0-9]", "", os.path.basename(os.getcwd()).lower())
+
+    def request(self, method, path, body=None):
+        """
+        Send a request to the Engine API, and get its status code and (decoded) JSON body.
+        """
+
+        connection = UnixHTTPConnection(self._socket_path)
+
+        try:
+            connection.request(method, path, body=None if body is None else json.dumps(body),
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            content = response.read()
+        except OSError as exception:
+            raise DockerEngineUnavailable(f"The docker daemon is not reachable: {exception}")
+        finally:
+            connection.close()
+
+        return response.status, json.loads(content) if content else None
+
+    def container(self, project, service, refresh=False):
+        """
+        Get the ID of the (running) container of a compose service; the IDs are cached for the compose project.
+        """
+
+        try:
+            with open(self._cache_path) as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, ValueError):
+            cache = {}
+
+        containers = cache.get(project, {})
+
+        if not refresh and service in containers:
+            return containers[service]
+
+        filters = json.dumps({
+            "label": [f"com.docker.compose.project={project}", f"com.docker.compose.service={service}"],
+            "status": ["running"]
+        })
+        status, listed = self.request("GET", f"/containers/json?filters={urllib.parse.quote(filters)}")
+
+        if status != 200 or not listed:
+            raise DockerEngineUnavailable(f"The {service} container of the {project} project is not running.")
+
+        containers[service] = listed[0]["Id"]
+        cache[project] = containers
+
+        with open(self._cache_path, "w") as cache_file:
+            json.dump(cache, cache_file)
+
+        return containers[service]
+
+    def execute(self, project, service, command, user=None, tty=None, stdin=None, stdout=None, stderr=None):
+        """
+        Run a command in the container of a compose service (like docker-compose exec), and get its exit code.
+
+        The standard streams default to the ones of this process; a TTY is allocated if they are terminals, in which
+        case the terminal is put in raw mode, and its size is forwarded to the exec.
+        """
+
+        stdin = sys.stdin if stdin is None else stdin
+        stdout = sys.stdout.buffer if stdout is None else stdout
+        stderr = sys.stderr.buffer if stderr is None else stderr
+        tty = (stdin.isatty() and sys.stdout.isatty()) if tty is None else tty
+
+        exec_id = self.create(project, service, command, user, tty)
+        connection, received = self.start(exec_id, tty)
+
+        if tty:
+            self._resize(exec_id)
+            signal.signal(signal.SIGWINCH, lambda signum, frame: self._resize(exec_id))
+
+        threading.Thread(target=DockerEngine._forward_stdin, args=(stdin, connection, tty), daemon=True).start()
+
+        with raw_terminal(stdin if tty else None):
+            DockerEngine._copy_output(connection, received, tty, stdout, stderr)
+
+        connection.close()
+
+        try:
+            return self.exit_code(exec_id)
+        except DockerEngineUnavailable as exception:
+            raise DockerExecInterrupted(f"The exit code of the command is unknown: {exception}")
+
+    def create(self, project, service, command, user=None, tty=False):
+        """
+        Create an exec (with its standard streams attached) in the container of a compose service, and get its ID.
+        """
+
+        configuration = {
+            "AttachStdin": True,
+            "AttachStdout": True,
+            "AttachStderr": True,
+            "Tty": tty,
+            "Cmd": command,
+            **({"User": user} if user else {})
+        }
+
+        status, created = self.request("POST", f"/containers/{self.container(project, service)}/exec", configuration)
+
+        # The cached container does not exist anymore (e.g.: the stack was recreated).
+        if status in (404, 409):
+            container = self.container(project, service, refresh=True)
+            status, created = self.request("POST", f"/containers/{container}/exec", configuration)
+
+        if status != 201:
+            raise DockerEngineUnavailable(f"The exec could not be created: {created}")
+
+        return created["Id"]
+
+    def exit_code(self, exec_id):
+        """
+        Get the exit code of a finished exec.
+        """
+
+        # The exit code is set once the exec process is reaped, which is slightly after the end of its output.
+        for delay in (0, 0.01, 0.05, 0.1, 0.25, 0.5):
+            time.sleep(delay)
+            status, inspected = self.request("GET", f"/exec/{exec_id}/json")
+
+            if status == 200 and not inspected["Running"] and inspected["ExitCode"] is not None:
+                return inspected["ExitCode"]
+
+        return 1
+
+    def start(self, exec_id, tty):
+        """
+        Start an exec, and hijack its HTTP connection for the standard streams.
+        The output received along with the response headers is returned with the connection; once the start request
+        is sent, a failure raises DockerExecInterrupted, as the command may have been started.
+        """
+
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        body = json.dumps({"Detach": False, "Tty": tty}).encode()
+
+        try:
+            connection.connect(self._socket_path)
+            connection.sendall(
+                f"POST /exec/{exec_id}/start HTTP/1.1\r\n"
+                "Host: localhost\r\n"
+                "Content-Type: application/json\r\n"
+                "Connection: Upgrade\r\n"
+                "Upgrade: tcp\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "\r\n".encode() + body
+            )
+        except OSError as exception:
+            connection.close()
+
+            raise DockerEngineUnavailable(f"The exec could not be started: {exception}")
+
+        received = b""
+
+        try:
+            while b"\r\n\r\n" not in received:
+                data = connection.recv(4096)
+
+                if not data:
+                    raise OSError("the connection was closed")
+
+                received += data
+        except OSError as exception:
+            connection.close()
+
+            raise DockerExecInterrupted(f"The exec's response was not received: {exception}")
+
+        headers, received = received.split(b"\r\n\r\n", 1)
+
+        if headers.split(b" ", 2)[1] not in (b"101", b"200"):
+            connection.close()
+
+            raise DockerEngineUnavailable(f"The exec could not be started: {headers.decode(errors='replace')}")
+
+        return connection, received
+
+    def _resize(self, exec_id):
+        try:
+            columns, lines = os.get_terminal_size(sys.stdout.fileno())
+            self.request("POST", f"/exec/{exec_id}/resize?h={lines}&w={columns}")
+        except (OSError, DockerEngineUnavailable):
+            pass
+
+    @staticmethod
+    def _forward_stdin(stdin, connection, tty):
+        """
+        Copy the standard input to the exec; the end of the input is forwarded by closing the write side.
+        """
+
+        try:
+            descriptor = stdin.fileno()
+        except (AttributeError, OSError):
+            descriptor = None
+
+        try:
+            while True:
+                data = os.read(descriptor, 4096) if descriptor is not None else stdin.read(4096)
+
+                if not data:
+                    break
+
+                connection.sendall(data if isinstance(data, bytes) else data.encode())
+
+            if not tty:
+                connection.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    @staticmethod
+    def frames(connection, received=b""):
+        """
+        Read the multiplexed (non-TTY) output of an exec, as (stream type, content) frames.
+        Each frame is an 8 bytes header (stream type, and big-endian size), followed by the frame's content.
+        """
+
+        buffer = received
+
+        while True:
+            while len(buffer) >= 8 and len(buffer) >= 8 + int.from_bytes(buffer[4:8], "big"):
+                size = int.from_bytes(buffer[4:8], "big")
+
+                yield buffer[0], buffer[8:8 + size]
+
+                buffer = buffer[8 + size:]
+
+            try:
+                data = connection.recv(65536)
+            except OSError:
+                data = b""
+
+            if not data:
+                return
+
+            buffer += data
+
+    @staticmethod
+    def _copy_output(connection, received, tty, stdout, stderr):
+        """
+        Copy the exec's output to the standard streams (see DockerEngine.frames for the output without a TTY).
+        """
+
+        if not tty:
+            for stream, content in DockerEngine.frames(connection, received):
+                (stderr if stream == DockerEngine.STDERR else stdout).write(content)
+                (stderr if stream == DockerEngine.STDERR else stdout).flush()
+
+            return
+
+        data = received
+
+        while data:
+            stdout.write(data)
+            stdout.flush()
+
+            try:
+                data = connection.recv(65536)
+            except OSError:
+                data = b""
+
+
+class ExecSession:
+    """
+    A long-lived shell in the container of a compose service, through which several commands are run one after the
+    other (see "run batch", and "run shell"); this saves the creation of an exec for each command.
+
+    The end of each command is signalled by a marker line (with its exit status) on the standard output, which is
+    removed from the output. The consecutive artisan commands can be run by a single php process, which boots the
+    Laravel framework only once.
+    """
+
+    # Boot the Laravel framework once, and run each artisan command (with its marker) in the same process.
+    ARTISAN_RUNNER = """
+        require 'vendor/autoload.php';
+        $app = require 'bootstrap/app.php';
+        $kernel = $app->make(Illuminate\\Contracts\\Console\\Kernel::class);
+        $kernel->bootstrap();
+        $output = new Symfony\\Component\\Console\\Output\\ConsoleOutput();
+
+        foreach (json_decode($argv[1], true) as $command) {
+            try {
+                $status = $kernel->call($command, [], $output);
+            } catch (Throwable $exception) {
+                $handler = $app->make(Illuminate\\Contracts\\Debug\\ExceptionHandler::class);
+                $handler->renderForConsole($output, $exception);
+                $status = 1;
+            }
+
+            fwrite(STDOUT, "\\n" . $argv[2] . " " . $status . "\\n");
+
+            if ($status !== 0 && $argv[3] !== "1") {
+                break;
+            }
+        }
+    """
+
+    def __init__(self, engine, project, service, user=None, stdout=None, stderr=None):
+        self._stdout = sys.stdout.buffer if stdout is None else stdout
+        self._stderr = sys.stderr.buffer if stderr is None else stderr
+        self._marker = f"__RUN_{os.urandom(8).hex()}__".encode()
+        self._exec_id = engine.create(project, service, ["sh"], user)
+        self._connection, received = engine.start(self._exec_id, False)
+        self._frames = DockerEngine.frames(self._connection, received)
+        self._output = b""
+
+    def run(self, command):
+        """
+        Run a shell command (without standard input), and get its exit status and duration (in seconds).
+        """
+
+        return self._send(f"sh -c {shlex.quote(command)} < /dev/null", 1)[0]
+
+    def run_artisan(self, commands, keep_going=False):
+        """
+        Run artisan commands in a single php process, and get their exit statuses and durations (in seconds).
+        The commands following a failed one are skipped (their status is None), unless keep_going is set; if the
+        process stops early (e.g.: a fatal error), the remaining commands get its exit status.
+        """
+
+        arguments = " ".join(shlex.quote(argument) for argument in (
+            ExecSession.ARTISAN_RUNNER, "--", json.dumps(commands), self._marker.decode(), "1" if keep_going else "0"
+        ))
+
+        return self._send(f"php -r {arguments} < /dev/null", len(commands), group=True)
+
+    def close(self):
+        """
+        End the shell (its standard input is closed), and the connection.
+        """
+
+        try:
+            self._connection.shutdown(socket.SHUT_WR)
+
+            for _ in self._frames:
+                pass
+        except OSError:
+            pass
+
+        self._connection.close()
+
+    def _send(self, command, count, group=False):
+        """
+        Send a command line followed by its (group) marker, and wait for the markers of its commands.
+        """
+
+        marker = f"{self._marker.decode()}{'-group' if group else ''}"
+
+        start = time.monotonic()
+        self._connection.sendall(f"{command}; printf '\\n%s %s\\n' {marker} \"$?\"\n".encode())
+
+        results = []
+
+        for marker_type, status in self._markers():
+            now = time.monotonic()
+
+            if marker_type == b"" and len(results) < count:
+                results.append((status, now - start))
+                start = now
+
+            if not group or marker_type == b"-group":
+                results += [(status or None, 0.0)] * (count - len(results))
+
+                return results
+
+        raise DockerExecInterrupted("The exec session ended unexpectedly.")
+
+    def _markers(self):
+        """
+        Copy the session's output to the standard streams, and yield its markers' type, and exit status.
+        The output which may be the beginning of a marker is held back until it is complete.
+        """
+
+        pattern = re.compile(rb"\n" + re.escape(self._marker) + rb"(-group)? (\d+)\n")
+        prefix = b"\n" + self._marker
+
+        for stream, content in self._frames:
+            if stream == DockerEngine.STDERR:
+                self._stderr.write(content)
+                self._stderr.flush()
+                continue
+
+            self._output += content
+
+            while True:
+                matches = pattern.search(self._output)
+
+                if matches is None:
+                    break
+
+                self._stdout.write(self._output[:matches.start()])
+                self._stdout.flush()
+                self._output = self._output[matches.end():]
+
+                yield matches.group(1) or b"", int(matches.group(2))
+
+            held = self._output.rfind(prefix)
+
+            if held < 0:
+                held = next(
+                    (len(self._output) - length for length in range(min(len(prefix), len(self._output)), 0, -1)
+                     if prefix.startswith(self._output[-length:])),
+                    len(self._output)
+                )
+
+            self._stdout.write(self._output[:held])
+            self._stdout.flush()
+            self._output = self._output[held:]
+
+
+@contextlib.contextmanager
+def raw_terminal(stream):
+    """
+    Put a terminal in raw mode for the duration of the context (if the stream is a terminal).
+    """
+
+    if stream is None or not stream.isatty():
+        yield
+        return
+
+    import termios
+    import tty
+
+    attributes = termios.tcgetattr(stream.fileno())
+    tty.setraw(stream.fileno())
+
+    try:
+        yield
+    finally:
+        termios.tcsetattr(stream.fileno(), termios.TCSADRAIN, attributes)
+
+
+def execute(env, service, command, user=None):
+    """
+    Run a command in a service's container through the Docker Engine API; docker-compose is used if it is unavailable.
+    The command is not run again through docker-compose if the API fails once the exec is started (e.g.: a migration
+    could be run twice).
+
+    Returns:
+        int: The exit code of the command.
+    """
+
+    try:
+        return DockerEngine.from_environment().execute(DockerEngine.compose_project(env), service, command, user)
+    except DockerEngineUnavailable:
+        return run(["docker-compose", "exec", *(["--user", user] if user else []), service, *command]).returncode
+    except DockerExecInterrupted as exception:
+        print(f"{exception} The command is not run again, as it may have run already.", file=sys.stderr)
+
+        return 1
+
+
+def batch_command(line):
+    """
+    Get the type ("artisan", or "shell"), and the command of a line of a batch file (or of the shell).
+    """
+
+    if line == "artisan" or line.startswith(("artisan ", "artisan\t")):
+        return "artisan", line[len("artisan"):].strip()
+
+    return "shell", line
+
+
+def batch_name(kind, command):
+    return f"artisan {command}" if kind == "artisan" else command
+
+
+def results_table(results):
+    """
+    Create a table of the commands' exit statuses, and durations.
+    """
+
+    rows = [("Command", "Status", "Duration")] + [
+        (command, "skipped" if status is None else str(status), f"{duration:.2f}s")
+        for command, (status, duration) in results
+    ]
+    widths = [max(len(row[column]) for row in rows) for column in range(3)]
+
+    return "\n".join("    ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+
+
+def run_batch(env, arguments):
+    """
+    Run the commands of a file through a single exec session in the php container.
+    The consecutive artisan commands are run by a single php process (booting the Laravel framework once).
+    """
+
+    parser = argparse.ArgumentParser("run batch", description="Run the commands of a file in the php service.")
+    parser.add_argument("file", help="The file of commands, one per line (- for the standard input); e.g.: "
+                                     "'artisan migrate --force', or 'composer dump-autoload'.")
+    parser.add_argument("--keep-going", action="store_true", help="Run the remaining commands after a failure.")
+    parser.add_argument("--no-group", action="store_true",
+                        help="Run each artisan command in its own php process (e.g.: after config:cache).")
+    parsed = parser.parse_args(arguments)
+
+    with (sys.stdin if parsed.file == "-" else open(parsed.file)) as file:
+        lines = [line.strip() for line in file]
+
+    commands = [batch_command(line) for line in lines if line and not line.startswith("#")]
+    groups = []
+
+    for kind, command in commands:
+        if kind == "artisan" and not parsed.no_group and groups and groups[-1][0] == "artisan":
+            groups[-1][1].append(command)
+        else:
+            groups.append((kind, [command]))
+
+    results = []
+
+    try:
+        session = ExecSession(DockerEngine.from_environment(), DockerEngine.compose_project(env), "php", "www-data")
+    except DockerEngineUnavailable:
+        session = None
+
+    try:
+        for kind, group in groups:
+            if session is None:
+                statuses = []
+
+                for command in group:
+                    start = time.monotonic()
+                    status = execute(env, "php", (
+                        ["php", "artisan", *shlex.split(command)] if kind == "artisan" else ["sh", "-c", command]
+                    ), user="www-data")
+                    statuses.append((status, time.monotonic() - start))
+
+                    if status and not parsed.keep_going:
+                        break
+
+                statuses += [(None, 0.0)] * (len(group) - len(statuses))
+            elif kind == "artisan":
+                statuses = session.run_artisan(group, parsed.keep_going)
+            else:
+                statuses = [session.run(group[0])]
+
+            results += zip([batch_name(kind, command) for command in group], statuses)
+
+            if not parsed.keep_going and any(status for status, duration in statuses):
+                break
+    finally:
+        if session is not None:
+            session.close()
+
+    results += [(batch_name(kind, command), (None, 0.0)) for kind, command in commands][len(results):]
+
+    print(results_table(results), file=sys.stderr)
+
+    return next((status for command, (status, duration) in results if status), 0)
+
+
+def run_shell(env, arguments):
+    """
+    Run commands interactively through a single exec session in the php container.
+    """
+
+    parser = argparse.ArgumentParser("run shell", description="Run commands interactively in the php service.")
+    parser.parse_args(arguments)
+
+    try:
+        import readline
+    except ImportError:
+        pass
+
+    session = ExecSession(DockerEngine.from_environment(), DockerEngine.compose_project(env), "php", "www-data")
+
+    try:
+        while True:
+            try:
+                line = input(f"{env['PROJECT_NAME']}> ").strip()
+            except EOFError:
+                print()
+                break
+
+            if line in ("exit", "quit"):
+                break
+
+            if not line or line.startswith("#"):
+                continue
+
+            kind, command = batch_command(line)
+            status, duration = session.run_artisan([command])[0] if kind == "artisan" else session.run(command)
+
+            print(f"[exit status: {status}, duration: {duration:.2f}s]", file=sys.stderr)
+    finally:
+        session.close()
+
+
+def watch_assets(env, arguments):
+    """
+    Run the asset compiler's watch script in the (long-lived) node service, so that it stays warm between edits.
+    """
+
+    parser = argparse.ArgumentParser("run yarn:watch", description="Recompile the assets when they are changed.")
+    parser.add_argument("script", nargs="?",
+                        help="The package.json script to run (defaults to the first of: watch, dev).")
+    parsed = parser.parse_args(arguments)
+
+    script = parsed.script
+
+    if script is None:
+        with open(os.path.join("application", env["PROJECT_NAME"], "package.json")) as package:
+            scripts = json.load(package).get("scripts", {})
+
+        script = next((name for name in ("watch", "dev") if name in scripts), None)
+
+        if script is None:
+            print("The package.json file has neither a watch, nor a dev script.")
+            return 1
+
+    return execute(env, "node", ["yarn", "run", script], user=f"{env['USER_ID']}:{env['GROUP_ID']}")
+
+
+def renew_certificate(env, arguments):
+    """
+    Re-issue the project's TLS/SSL certificate (for the same key) if it is close to its expiry date.
+    The certificate is signed by the local certificate authority created by the harivansh-laravel-docker package when
+    the project was installed; only the cryptography package is needed here.
+
+    Returns:
+        int: The exit code.
+    """
+
+    parser = argparse.ArgumentParser("run ssl:renew", description="Renew the project's TLS/SSL certificate.")
+    parser.add_argument("--days", type=int, default=30,
+                        help="Renew the certificate if it expires within this number of days.")
+    parser.add_argument("--validity", type=int, default=90,
+                        help="The number of days for which the renewed certificate is valid.")
+    parser.add_argument("--force", action="store_true", help="Renew the certificate regardless of its expiry date.")
+    parsed = parser.parse_args(arguments)
+
+    try:
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes, serialization
+    except ImportError:
+        print("The cryptography package is required to renew the certificate.")
+        return 1
+
+    authority_directory = os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+        "harivansh-laravel-docker",
+        "authority"
+    )
+    authority_key_path = os.path.join(authority_directory, "key.pem")
+    authority_certificate_path = os.path.join(authority_directory, "certificate.pem")
+
+    if not os.path.isfile(authority_key_path) or not os.path.isfile(authority_certificate_path):
+        print(f"The local certificate authority ({authority_directory}) does not exist; it is created when a project "
+              f"is installed, and must be the one trusted by the browsers.")
+        return 1
+
+    ssl_directory = os.path.join("configuration", "nginx", "ssl")
+    key_path = os.path.join(ssl_directory, env["SSL_KEY_NAME"])
+    certificate_path = os.path.join(ssl_directory, env["SSL_CERTIFICATE_NAME"])
+
+    with open(key_path, "rb") as key_file:
+        key = serialization.load_pem_private_key(key_file.read(), password=None)
+
+    with open(certificate_path, "rb") as certificate_file:
+        certificate = x509.load_pem_x509_certificate(certificate_file.read())
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    if not parsed.force and certificate.not_valid_after_utc > now + datetime.timedelta(days=parsed.days):
+        print(f"The certificate does not expire within {parsed.days} days; it was not renewed.")
+        return 0
+
+    with open(authority_key_path, "rb") as authority_key_file:
+        authority_key = serialization.load_pem_private_key(authority_key_file.read(), password=None)
+
+    with open(authority_certificate_path, "rb") as authority_certificate_file:
+        authority_certificate = x509.load_pem_x509_certificate(authority_certificate_file.read())
+
+    name = x509.Name([x509.NameAttribute(x509.NameOID.COMMON_NAME, env["PROJECT_DOMAIN"])])
+    san = x509.SubjectAlternativeName([
+        x509.DNSName(hostname) for hostname in (env["PROJECT_DOMAIN"], f"pgadmin.{env['PROJECT_DOMAIN']}")
+    ])
+
+    # The same certificate as the installation issues (see Ssl._sign and CertificateAuthority.sign in the package).
+    renewed = (
+        x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(authority_certificate.subject)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(minutes=5))
+            .not_valid_after(now + datetime.timedelta(days=parsed.validity))
+            .add_extension(san, False)
+            .add_extension(x509.BasicConstraints(ca=False, path_length=None), True)
+            .add_extension(x509.ExtendedKeyUsage([x509.ExtendedKeyUsageOID.SERVER_AUTH]), False)
+            .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(authority_key.public_key()), False)
+            .sign(authority_key, hashes.SHA256())
+    )
+
+    with open(certificate_path, "wb") as certificate_file:
+        certificate_file.write(renewed.public_bytes(serialization.Encoding.PEM))
+
+    print("The certificate was renewed.")
+
+    # The nginx service only needs to reload its configuration to use the new certificate, if it is running.
+    services = run(["docker-compose", "ps", "--services", "--filter", "status=running"],
+                   stdout=PIPE, universal_newlines=True)
+
+    if "nginx" not in services.stdout.split():
+        print("The nginx service is not running; it uses the new certificate once it is started.")
+        return 0
+
+    return run(["docker-compose", "exec", "nginx", "nginx", "-s", "reload"]).returncode
+
+
+def build_base_image(env, arguments):
+    """
+    Build the shared php base image (with BuildKit, for its cache mounts), and report the number of cached steps.
+    """
+
+    parser = argparse.ArgumentParser("run build:base", description="Build the php base image shared by the projects.")
+    parser.parse_args(arguments)
+
+    process = Popen([
+        "docker", "build",
+        "--progress", "plain",
+        "--build-arg", f"PHP_FPM_IMAGE_TAG={env['PHP_FPM_IMAGE_TAG']}",
+        "--build-arg", f"PHP_RUNTIME={env.get('PHP_RUNTIME', 'fpm')}",
+        "--tag", env["PHP_BASE_IMAGE"],
+        os.path.join("dockerfiles", "php-base")
+    ], stdout=PIPE, stderr=STDOUT, universal_newlines=True, env={**os.environ, "DOCKER_BUILDKIT": "1"})
+
+    steps, cached = set(), set()
+
+    for line in process.stdout:
+        sys.stdout.write(line)
+        matches = re.match(r"^#(\d+) (?:(CACHED)$|\[[^\]]*\d+/\d+\])", line.rstrip())
+
+        if matches is not None:
+            (cached if matches.group(2) else steps).add(matches.group(1))
+
+    status = process.wait()
+
+    print(f"\n{env['PHP_BASE_IMAGE']}: {len(steps & cached)}/{len(steps)} steps were cached.")
+
+    return status
+
+
+def scale_queue(env, arguments):
+    """
+    Change the number of replicas of the queue service; the new number is saved in the .env file, so that it is kept
+    when the stack is started again.
+    """
+
+    parser = argparse.ArgumentParser("run queue:scale", description="Scale the queue workers up, or down.")
+    parser.add_argument("replicas", type=int, nargs="?",
+                        help="The number of replicas of the queue service (the current one is shown if omitted).")
+    parsed = parser.parse_args(arguments)
+
+    if parsed.replicas is None:
+        print(f"The queue service has {env['QUEUE_WORKER_REPLICAS']} replicas.")
+        return 0
+
+    if parsed.replicas < 0:
+        print("The number of replicas cannot be negative.")
+        return 1
+
+    write(".env", merge(read(".env"), {"QUEUE_WORKER_REPLICAS": parsed.replicas}))
+
+    return run([
+        "docker-compose", "up", "--detach", "--no-deps", "--no-recreate", "--scale", f"queue={parsed.replicas}", "queue"
+    ]).returncode
+
+
+class StackReadiness:
+    """
+    Follow the containers of a compose project while it is started, until each one is ready: healthy, or running for
+    the containers without a healthcheck. Each container is polled by its own thread, so that a slow one (e.g.: the
+    initialization of the database) does not delay the readiness times of the others.
+
+    A stopped (or unhealthy) container is only considered failed once the process starting the stack has exited, as
+    it may still be (re)started by it; the stopped containers which it did not start (e.g.: the services which were
+    not selected) are not followed.
+    """
+
+    INTERVAL = 0.25
+
+    def __init__(self, engine, project, timeout, start=None):
+        self._engine = engine
+        self._project = project
+        self._start = time.monotonic() if start is None else start
+        self._deadline = self._start + timeout
+        self._wall_start = time.time() - (time.monotonic() - self._start)
+        self._lock = threading.Lock()
+        self._threads = {}
+        self._started = threading.Event()
+        # The followed containers (by ID): service, replica number, status, and running, and ready times (in seconds).
+        self.containers = {}
+
+    def elapsed(self):
+        return time.monotonic() - self._start
+
+    def discover(self):
+        """
+        List the containers of the compose project (one-off containers excepted), and follow the new ones.
+        """
+
+        filters = json.dumps({"label": [f"com.docker.compose.project={self._project}"]})
+        status, listed = self._engine.request("GET", f"/containers/json?all=1&filters={urllib.parse.quote(filters)}")
+
+        if status != 200:
+            raise DockerEngineUnavailable(f"The containers of the {self._project} project cannot be listed: {listed}")
+
+        for container in listed:
+            labels = container.get("Labels") or {}
+
+            with self._lock:
+                if container["Id"] in self.containers or labels.get("com.docker.compose.oneoff") == "True":
+                    continue
+
+                self.containers[container["Id"]] = {
+                    "service": labels.get("com.docker.compose.service", container["Id"][:12]),
+                    "number": labels.get("com.docker.compose.container-number", "1"),
+                    "status": "starting",
+                    "running": None,
+                    "ready": None,
+                }
+
+            self._threads[container["Id"]] = threading.Thread(target=self._poll, args=(container["Id"],), daemon=True)
+            self._threads[container["Id"]].start()
+
+    @staticmethod
+    def started_at(state):
+        """
+        Get the (UNIX) time at which a container was last started; its State.StartedAt is in UTC (RFC 3339, with
+        nanoseconds), or 0001-01-01 if it was never started.
+        """
 
-    with open(file_path) as environment_file:
-        for line in environment_file:
-            matches = key_value_regex.match(line)
+        started_at = state.get("StartedAt") or "0001-01-01T00:00:00Z"
 
-            if matches is not None:
-                matches = matches.groupdict()
-                environment[matches["key"]] = matches["value"]
+        return calendar.timegm(time.strptime(started_at[:19], "%Y-%m-%dT%H:%M:%S"))
 
-    return environment
+    def _poll(self, container_id):
+        while time.monotonic() < self._deadline:
+            try:
+                status, inspected = self._engine.request("GET", f"/containers/{container_id}/json")
+            except DockerEngineUnavailable:
+                time.sleep(StackReadiness.INTERVAL)
+                continue
+
+            with self._lock:
+                container = self.containers[container_id]
+
+                # The container was replaced (e.g.: its configuration changed); its successor is followed instead.
+                if status == 404:
+                    del self.containers[container_id]
+                    return
+
+                state = inspected["State"]
+                # A stopped container keeps the health status of its last run.
+                health = (state.get("Health") or {}).get("Status") if state["Running"] else None
+
+                if state["Running"] and container["running"] is None:
+                    container["running"] = self.elapsed()
+
+                if state["Running"] and health in ("healthy", None):
+                    container["status"], container["ready"] = health or "running", self.elapsed()
+                    return
+
+                if health == "unhealthy" or state["Status"] in ("exited", "dead"):
+                    container["status"] = health or f"exited ({state['ExitCode']})"
+
+                    if self._started.is_set():
+                        if not state["Running"] and StackReadiness.started_at(state) < int(self._wall_start) - 1:
+                            del self.containers[container_id]
+
+                        return
+                else:
+                    container["status"] = health or state["Status"]
+
+            time.sleep(StackReadiness.INTERVAL)
+
+    def wait(self, process):
+        """
+        Follow the containers until the process starting them has exited, and each one is either ready, failed, or
+        timed out; get the exit code of the process.
+        """
+
+        while process.poll() is None and time.monotonic() < self._deadline:
+            self.discover()
+            time.sleep(StackReadiness.INTERVAL)
+
+        if process.poll() is not None:
+            self._started.set()
+
+        # The containers created just before the end of the process.
+        self.discover()
+
+        for thread in self._threads.values():
+            thread.join(max(0, self._deadline - time.monotonic()))
+
+        with self._lock:
+            for container_id, container in self.containers.items():
+                if self._threads[container_id].is_alive() and container["ready"] is None \
+                        and not container["status"].startswith(("exited", "unhealthy")):
+                    container["status"] += " (timeout)"
+
+        return process.wait()
+
+    def ready(self):
+        """
+        Get the time (since the start) at which the last container was ready, or None if a container is not ready.
+        """
+
+        with self._lock:
+            times = [container["ready"] for container in self.containers.values()]
+
+        return None if None in times else max(times, default=0)
+
+    def report(self):
+        """
+        Create a table of the containers' statuses, and the times (since the start) at which they were running and
+        ready, in the order they were ready.
+        """
+
+        def seconds(value):
+            return "-" if value is None else f"{value:.2f}s"
+
+        with self._lock:
+            containers = sorted(self.containers.values(), key=lambda container: (
+                container["ready"] is None, container["ready"] or 0, container["service"], container["number"]
+            ))
+
+        rows = [("Service", "Status", "Running", "Ready")] + [(
+            container["service"] + (f" #{container['number']}" if container["number"] != "1" else ""),
+            container["status"],
+            seconds(container["running"]),
+            seconds(container["ready"]),
+        ) for container in containers]
+        widths = [max(len(row[column]) for row in rows) for column in range(4)]
+
+        return "\n".join("    ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+
+
+def compose_version():
+    """
+    Get the version of docker-compose, as a tuple of integers (empty if it is unknown).
+    """
+
+    try:
+        output = run(["docker-compose", "version", "--short"], stdout=PIPE, stderr=PIPE,
+                     universal_newlines=True).stdout
+    except OSError:
+        return ()
+
+    return tuple(int(number) for number in re.findall(r"\d+", output.strip().lstrip("v"))[:3])
+
+
+def start_stack(env, arguments):
+    """
+    Start the stack in the background; with --wait, return once every container is ready, and show the time each
+    service took to be ready. The services are started in the order of their dependencies, each one as soon as the
+    ones it depends on are healthy (see the healthchecks of the docker-compose.yml file).
+    """
+
+    parser = argparse.ArgumentParser("run up", description="Start the application stack.")
+    parser.add_argument("--wait", action="store_true",
+                        help="Wait for the containers to be ready, and show the time each one took.")
+    parser.add_argument("--timeout", type=float, default=300,
+                        help="The time to wait for the containers to be ready, in seconds (default: %(default)s).")
+    parser.add_argument("services", nargs="*", help="The services to start (and their dependencies); all by default.")
+    parsed = parser.parse_args(arguments)
+
+    if not parsed.wait:
+        return run(["docker-compose", "up", "--detach", *parsed.services]).returncode
+
+    start = time.monotonic()
+
+    try:
+        readiness = StackReadiness(DockerEngine.from_environment(), DockerEngine.compose_project(env), parsed.timeout,
+                                   start)
+        readiness.discover()
+    except DockerEngineUnavailable:
+        # docker-compose (v2) waits for the healthchecks itself, without the breakdown.
+        if compose_version() >= (2,):
+            return run([
+                "docker-compose", "up", "--detach", "--wait", "--wait-timeout", str(int(parsed.timeout)),
+                *parsed.services
+            ]).returncode
+
+        print("The Docker Engine API is unavailable, and docker-compose cannot wait for the containers to be ready; "
+              "the stack is started without waiting.", file=sys.stderr)
+
+        return run(["docker-compose", "up", "--detach", *parsed.services]).returncode
+
+    status = readiness.wait(Popen(["docker-compose", "up", "--detach", *parsed.services]))
+
+    print(f"\n{readiness.report()}\n")
+
+    ready = readiness.ready()
+
+    if status != 0 or ready is None:
+        print("The stack is not ready.")
+        return status or 1
+
+    print(f"The stack was ready in {ready:.2f}s.")
+
+    return 0
+
+
+def tls_handshake(host, port, server_name, context, session=None):
+    """
+    Open a TLS connection (resuming a previous session if one is provided), and time its handshake.
+    A request is sent on the connection, as the TLS 1.3 sessions are only received after the handshake.
+
+    Returns:
+        (float, bool, ssl.SSLSession, str): The duration of the handshake (including the TCP connection), whether the
+                                            session was resumed, the connection's session, and its TLS version.
+    """
+
+    start = time.perf_counter()
+
+    with socket.create_connection((host, port), timeout=10) as connection:
+        with context.wrap_socket(connection, server_hostname=server_name, session=session) as tls:
+            duration = time.perf_counter() - start
+
+            tls.sendall(f"HEAD / HTTP/1.1\r\nHost: {server_name}\r\nConnection: close\r\n\r\n".encode())
+
+            while tls.recv(4096):
+                pass
+
+            return duration, tls.session_reused, tls.session, tls.version()
+
+
+def percentiles(durations):
+    durations = sorted(durations)
+
+    if not durations:
+        return "-"
+
+    percentile_95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+
+    return f"median: {statistics.median(durations) * 1000:7.2f}ms    p95: {percentile_95 * 1000:7.2f}ms"
+
+
+def benchmark_tls(env, arguments):
+    """
+    Measure the TLS handshake time of the stack's nginx service, with, and without session resumption.
+    """
+
+    parser = argparse.ArgumentParser("run tls:bench", description="Measure the TLS handshakes of the application.")
+    parser.add_argument("--host", default="127.0.0.1", help="The address of the nginx service.")
+    parser.add_argument("--port", type=int, default=443, help="The https port of the nginx service.")
+    parser.add_argument("--connections", type=int, default=50, help="The number of connections of each kind.")
+    parsed = parser.parse_args(arguments)
+
+    # The handshakes are measured, not the certificate (which is signed by the local certificate authority).
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+
+    alpn_context = ssl.create_default_context()
+    alpn_context.check_hostname = False
+    alpn_context.verify_mode = ssl.CERT_NONE
+    alpn_context.set_alpn_protocols(["h2", "http/1.1"])
+
+    try:
+        with socket.create_connection((parsed.host, parsed.port), timeout=10) as connection:
+            with alpn_context.wrap_socket(connection, server_hostname=env["PROJECT_DOMAIN"]) as tls:
+                protocol = tls.selected_alpn_protocol() or "http/1.1"
+
+        full_handshakes = [
+            tls_handshake(parsed.host, parsed.port, env["PROJECT_DOMAIN"], context)
+            for _ in range(parsed.connections)
+        ]
+
+        session = full_handshakes[-1][2]
+        resumed_handshakes = []
+
+        for _ in range(parsed.connections):
+            handshake = tls_handshake(parsed.host, parsed.port, env["PROJECT_DOMAIN"], context, session)
+            resumed_handshakes.append(handshake)
+            session = handshake[2]
+    except OSError as exception:
+        print(f"The nginx service cannot be reached on {parsed.host}:{parsed.port} ({exception}).")
+        return 1
+
+    resumed = [duration for duration, reused, _, _ in resumed_handshakes if reused]
+
+    print(f"TLS version:          {full_handshakes[-1][3]}")
+    print(f"Application protocol: {protocol}")
+    print(f"Full handshakes:      {percentiles([handshake[0] for handshake in full_handshakes])}")
+    print(f"Resumed handshakes:   {percentiles(resumed)}")
+    print(f"Resumption rate:      {len(resumed) / parsed.connections:.0%}")
+
+    return 0
+
+
+class Histogram:
+    """
+    A latency histogram with a bounded relative error, in the manner of HdrHistogram: the values (in microseconds) are
+    counted in buckets which keep their 8 most significant bits, so that a bucket is within 1/128 (under 1%) of its
+    values.
+    """
+
+    SIGNIFICANT_BITS = 8
+
+    def __init__(self, counts=None):
+        self.counts = {int(bucket): count for bucket, count in (counts or {}).items()}
+
+    def record(self, seconds):
+        value = max(1, int(seconds * 1000000))
+        shift = max(0, value.bit_length() - Histogram.SIGNIFICANT_BITS)
+        bucket = value >> shift << shift
+
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def percentile(self, percentile):
+        """
+        Get the value (in seconds) under which a percentile of the recorded values are; the highest value of its
+        bucket is returned, as HdrHistogram does. None is returned if nothing was recorded.
+        """
+
+        rank = max(1, math.ceil(self.total() * percentile / 100))
+        seen = 0
+
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+
+            if seen >= rank:
+                shift = max(0, bucket.bit_length() - Histogram.SIGNIFICANT_BITS)
+
+                return (bucket | ((1 << shift) - 1)) / 1000000
+
+        return None
+
+    def mean(self):
+        total = self.total()
+
+        return sum(bucket * count for bucket, count in self.counts.items()) / total / 1000000 if total else None
+
+
+def parse_request(specification):
+    """
+    Parse a request of the benchmark's mix: "[METHOD] PATH [WEIGHT]" (e.g.: "/", "POST /login 2").
+    """
+
+    tokens = specification.split()
+    method = tokens.pop(0).upper() if tokens and not tokens[0].startswith("/") else "GET"
+    weight = tokens.pop() if len(tokens) == 2 else "1"
+
+    if len(tokens) != 1 or not tokens[0].startswith("/") or not weight.isdigit():
+        raise argparse.ArgumentTypeError(f"'{specification}' is not a [METHOD] PATH [WEIGHT] request.")
+
+    return method, tokens[0], int(weight)
+
+
+class Http1Client:
+    """
+    A persistent HTTP/1.1 connection to the nginx service, used by a single worker of the benchmark; the connection
+    is opened again whenever the server closes it (e.g.: after its keepalive_requests).
+    """
+
+    protocol = "http/1.1"
+
+    def __init__(self, port, server_name, context):
+        self._port = port
+        self._server_name = server_name
+        self._context = context
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path):
+        """
+        Send a request, and read its response.
+
+        Returns:
+            (int, int): The status of the response, and the size of its body.
+        """
+
+        try:
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.open_connection(
+                    "127.0.0.1", self._port, ssl=self._context,
+                    server_hostname=self._server_name if self._context is not None else None
+                )
+
+            self._writer.write((
+                f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {self._server_name}\r\n"
+                "User-Agent: run-bench\r\n"
+                "Accept: */*\r\n"
+                "\r\n"
+            ).encode())
+
+            status, size, keep_alive = await self._response(method)
+        except BaseException:
+            self._abort()
+            raise
+
+        if not keep_alive:
+            self._abort()
+
+        return status, size
+
+    def _abort(self):
+        if self._writer is not None:
+            self._writer.close()
+
+        self._reader = self._writer = None
+
+    async def _response(self, method):
+        status_line = await self._reader.readline()
+
+        if not status_line:
+            raise ConnectionError("The connection was closed by the server.")
+
+        version, status = status_line.split()[:2]
+        status = int(status)
+        headers = {}
+
+        while True:
+            line = await self._reader.readline()
+
+            if line in (b"\r\n", b"\n", b""):
+                break
+
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == b"HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+        if method == "HEAD" or status in (204, 304) or status < 200:
+            return status, 0, keep_alive
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            size = 0
+
+            while True:
+                chunk_size = int((await self._reader.readline()).split(b";")[0], 16)
+
+                if chunk_size == 0:
+                    break
+
+                await self._reader.readexactly(chunk_size + 2)
+                size += chunk_size
+
+            # The (optional) trailer section.
+            while await self._reader.readline() not in (b"\r\n", b"\n", b""):
+                pass
+
+            return status, size, keep_alive
+
+        if "content-length" in headers:
+            size = int(headers["content-length"])
+            await self._reader.readexactly(size)
+
+            return status, size, keep_alive
+
+        return status, len(await self._reader.read()), False
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+            with contextlib.suppress(OSError, asyncio.TimeoutError):
+                await asyncio.wait_for(self._writer.wait_closed(), 5)
+
+        self._reader = self._writer = None
+
+
+def hpack_integer(value, prefix, flags=0):
+    """
+    Encode an HPACK integer with an N-bit prefix (RFC 7541, section 5.1).
+    """
+
+    mask = (1 << prefix) - 1
+
+    if value < mask:
+        return bytes((flags | value,))
+
+    encoded = [flags | mask]
+    value -= mask
+
+    while value >= 0x80:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+
+    return bytes(encoded + [value])
+
+
+def hpack_decode_integer(block, position, prefix):
+    """
+    Decode an HPACK integer with an N-bit prefix, and return it with the position following it.
+    """
+
+    mask = (1 << prefix) - 1
+    value = block[position] & mask
+    position += 1
+
+    if value < mask:
+        return value, position
+
+    shift = 0
+
+    while True:
+        byte = block[position]
+        position += 1
+        value += (byte & 0x7F) << shift
+        shift += 7
+
+        if not byte & 0x80:
+            return value, position
+
+
+def hpack_string(value):
+    data = value.encode()
+
+    return hpack_integer(len(data), 7) + data
+
+
+class Http2Client:
+    """
+    An HTTP/2 connection to the nginx service, on which the requests of several workers of the benchmark are
+    multiplexed (a stream per request). Only what the benchmark needs is implemented: the request headers are sent as
+    HPACK literals (without Huffman coding, or indexing), and only the :status of the responses is decoded, which
+    nginx sends first, as a static table entry, or as a raw literal. The connection is opened again after a GOAWAY
+    frame (e.g.: after its keepalive_requests).
+    """
+
+    protocol = "h2"
+
+    PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+    DATA, HEADERS, PRIORITY, RST_STREAM, SETTINGS, PUSH_PROMISE, PING, GOAWAY, WINDOW_UPDATE = range(9)
+
+    END_STREAM, ACK, END_HEADERS, PADDED, PRIORITY_FLAG = 0x1, 0x1, 0x4, 0x8, 0x20
+
+    MAX_WINDOW = 2 ** 31 - 1
+
+    # The indices of the HPACK static table (RFC 7541, appendix A) of the request headers, and of the statuses.
+    NAME_INDICES = {":authority": 1, ":method": 2, ":path": 4, ":scheme": 6, "accept": 19, "user-agent": 58}
+    STATUS_INDICES = {8: 200, 9: 204, 10: 206, 11: 304, 12: 400, 13: 404, 14: 500}
+
+    def __init__(self, port, server_name, context):
+        self._port = port
+        self._server_name = server_name
+        self._context = context
+        self._lock = asyncio.Lock()
+        self._writer = None
+        self._streams = None
+        self._next_stream = 1
+
+    @staticmethod
+    def frame(kind, flags, stream, payload=b""):
+        return len(payload).to_bytes(3, "big") + bytes((kind, flags)) + stream.to_bytes(4, "big") + payload
+
+    @staticmethod
+    def status(block, flags):
+        """
+        Decode the :status of a response from the first field of its header block (None if it cannot be decoded).
+        """
+
+        if flags & Http2Client.PADDED:
+            block = block[1:len(block) - block[0]]
+
+        if flags & Http2Client.PRIORITY_FLAG:
+            block = block[5:]
+
+        position = 0
+
+        # The dynamic table size updates precede the fields.
+        while position < len(block) and block[position] & 0xE0 == 0x20:
+            _, position = hpack_decode_integer(block, position, 5)
+
+        if position >= len(block):
+            return None
+
+        if block[position] & 0x80:
+            return Http2Client.STATUS_INDICES.get(hpack_decode_integer(block, position, 7)[0])
+
+        name_index, position = hpack_decode_integer(block, position, 6 if block[position] & 0x40 else 4)
+
+        # A literal :status value (a Huffman-coded one is not decoded).
+        if name_index not in Http2Client.STATUS_INDICES or position >= len(block) or block[position] & 0x80:
+            return None
+
+        length, position = hpack_decode_integer(block, position, 7)
+
+        try:
+            return int(block[position:position + length])
+        except ValueError:
+            return None
+
+    async def request(self, method, path):
+        """
+        Send a request on a new stream, and wait for its response.
+
+        Returns:
+            (int, int): The status of the response, and the size of its body.
+        """
+
+        async with self._lock:
+            if self._writer is None:
+                await self._connect()
+
+        stream, streams = self._next_stream, self._streams
+        self._next_stream += 2
+        streams[stream] = [asyncio.get_running_loop().create_future(), None, 0]
+
+        block = b"".join(
+            (hpack_integer(Http2Client.NAME_INDICES[name], 4) if name in Http2Client.NAME_INDICES
+             else b"\x00" + hpack_string(name)) + hpack_string(value)
+            for name, value in ((":method", method), (":scheme", "https"), (":authority", self._server_name),
+                                (":path", path), ("user-agent", "run-bench"), ("accept", "*/*"))
+        )
+
+        self._writer.write(Http2Client.frame(
+            Http2Client.HEADERS, Http2Client.END_STREAM | Http2Client.END_HEADERS, stream, block
+        ))
+
+        try:
+            return await streams[stream][0]
+        finally:
+            streams.pop(stream, None)
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(
+            "127.0.0.1", self._port, ssl=self._context, server_hostname=self._server_name
+        )
+
+        if writer.get_extra_info("ssl_object").selected_alpn_protocol() != "h2":
+            writer.close()
+            raise ConnectionError("The server did not negotiate HTTP/2.")
+
+        # No server push, and the largest flow control windows (the received data is acknowledged as it arrives).
+        writer.write(
+            Http2Client.PREFACE
+            + Http2Client.frame(Http2Client.SETTINGS, 0, 0, (2).to_bytes(2, "big") + (0).to_bytes(4, "big")
+                                + (4).to_bytes(2, "big") + Http2Client.MAX_WINDOW.to_bytes(4, "big"))
+            + Http2Client.frame(Http2Client.WINDOW_UPDATE, 0, 0, (Http2Client.MAX_WINDOW - 65535).to_bytes(4, "big"))
+        )
+
+        self._writer, self._streams, self._next_stream = writer, {}, 1
+        asyncio.ensure_future(self._read_frames(reader, writer, self._streams))
+
+    def _retire(self, writer):
+        # The following requests are sent on a new connection.
+        if self._writer is writer:
+            self._writer = None
+
+    async def _read_frames(self, reader, writer, streams):
+        error = ConnectionError("The connection was closed by the server.")
+        last_stream = None
+
+        try:
+            while last_stream is None or any(stream <= last_stream for stream in streams):
+                header = await reader.readexactly(9)
+                kind, flags = header[3], header[4]
+                stream = int.from_bytes(header[5:], "big") & 0x7FFFFFFF
+                payload = await reader.readexactly(int.from_bytes(header[:3], "big"))
+                state = streams.get(stream)
+
+                if kind == Http2Client.DATA and payload:
+                    writer.write(Http2Client.frame(Http2Client.WINDOW_UPDATE, 0, 0, len(payload).to_bytes(4, "big")))
+
+                    if state is not None:
+                        state[2] += len(payload)
+                elif kind == Http2Client.HEADERS and state is not None and state[1] is None:
+                    state[1] = Http2Client.status(payload, flags)
+                elif kind == Http2Client.SETTINGS and not flags & Http2Client.ACK:
+                    writer.write(Http2Client.frame(Http2Client.SETTINGS, Http2Client.ACK, 0))
+                elif kind == Http2Client.PING and not flags & Http2Client.ACK:
+                    writer.write(Http2Client.frame(Http2Client.PING, Http2Client.ACK, 0, payload))
+                elif kind == Http2Client.RST_STREAM and state is not None:
+                    streams.pop(stream)
+                    Http2Client._complete(state[0], exception=ConnectionError("The stream was reset by the server."))
+                elif kind == Http2Client.GOAWAY:
+                    # The streams after the last one processed by the server are failed; the others complete.
+                    last_stream = int.from_bytes(payload[:4], "big") & 0x7FFFFFFF
+                    self._retire(writer)
+
+                    for refused in [refused for refused in streams if refused > last_stream]:
+                        Http2Client._complete(streams.pop(refused)[0],
+                                              exception=ConnectionError("The stream was refused (GOAWAY)."))
+
+                if (kind in (Http2Client.DATA, Http2Client.HEADERS) and flags & Http2Client.END_STREAM
+                        and state is not None and stream in streams):
+                    streams.pop(stream)
+                    Http2Client._complete(state[0], result=(state[1], state[2]))
+        except (OSError, EOFError) as exception:
+            error = exception
+        finally:
+            self._retire(writer)
+            writer.close()
+
+            for future, _, _ in list(streams.values()):
+                Http2Client._complete(future, exception=error)
+
+            streams.clear()
+
+    @staticmethod
+    def _complete(future, result=None, exception=None):
+        # The future of a request which timed out is already cancelled.
+        if future.done():
+            return
+
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    async def close(self):
+        writer, self._writer = self._writer, None
+
+        if writer is not None:
+            writer.close()
+
+            with contextlib.suppress(OSError, asyncio.TimeoutError):
+                await asyncio.wait_for(writer.wait_closed(), 5)
+
+
+async def load(clients, mix, workers, duration, warmup, timeout):
+    """
+    Send the requests of the mix from concurrent workers (sharing the clients) for the warmup, and then the measured
+    duration; only the requests started after the warmup are measured.
+
+    Returns:
+        (Histogram, dict, dict, int, float): The latencies, the statuses, the transport errors (by exception type), the
+                                             number of body bytes received, and the measured duration (in seconds).
+    """
+
+    histogram, statuses, errors = Histogram(), {}, {}
+    received = 0
+    measure_start = time.perf_counter() + warmup
+    end = measure_start + duration
+    requests = [(method, path) for method, path, _ in mix]
+    weights = [weight for _, _, weight in mix]
+
+    async def worker(client, generator):
+        nonlocal received
+
+        while time.perf_counter() < end:
+            method, path = generator.choices(requests, weights)[0]
+            start = time.perf_counter()
+
+            try:
+                status, size = await asyncio.wait_for(client.request(method, path), timeout)
+            except (OSError, EOFError, ValueError, asyncio.TimeoutError) as exception:
+                if start >= measure_start:
+                    errors[type(exception).__name__] = errors.get(type(exception).__name__, 0) + 1
+
+                # A refused connection is not retried in a busy loop.
+                await asyncio.sleep(0.05)
+                continue
+
+            if start >= measure_start:
+                histogram.record(time.perf_counter() - start)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                received += size
+
+    await asyncio.gather(*(
+        worker(clients[index % len(clients)], random.Random(index)) for index in range(workers)
+    ))
+
+    await asyncio.gather(*(client.close() for client in clients))
+
+    return histogram, statuses, errors, received, max(time.perf_counter() - measure_start, 1e-9)
+
+
+def benchmark_results(histogram, statuses, errors, received, duration):
+    """
+    Summarize a benchmark run (the latencies are in milliseconds).
+    """
+
+    requests = histogram.total()
+    failed = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 400)
+    transport_errors = sum(errors.values())
+
+    def milliseconds(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "requests": requests,
+        "throughput": requests / duration,
+        "bytes": received,
+        "statuses": statuses,
+        "errors": errors,
+        "error_rate": (failed + transport_errors) / (requests + transport_errors) if requests + transport_errors else 0,
+        "latency": {
+            "mean": milliseconds(histogram.mean()),
+            **{f"p{percentile:g}": milliseconds(histogram.percentile(percentile)) for percentile in (50, 90, 99, 99.9)},
+            "max": milliseconds(histogram.percentile(100)),
+        },
+        "histogram": {str(bucket): count for bucket, count in sorted(histogram.counts.items())},
+    }
+
+
+def benchmark_report(results, baseline=None):
+    """
+    Create the report of a benchmark run, compared with a baseline run if one is provided.
+    """
+
+    rows = [("", "Current") + (("Baseline", "Change") if baseline else ())]
+    metrics = [("Throughput (req/s)", "throughput"), ("Error rate (%)", "error_rate")]
+    metrics += [(f"Latency {name} (ms)", name) for name in results["latency"]]
+
+    for label, name in metrics:
+        current = results["latency"][name] if name in results["latency"] else results[name]
+        previous = None
+
+        if baseline:
+            previous = baseline["latency"].get(name) if name in results["latency"] else baseline.get(name)
+
+        scale = 100 if name == "error_rate" else 1
+        row = (label, f"{current * scale:.2f}" if current is not None else "-")
+
+        if baseline:
+            change = f"{(current - previous) / previous:+.1%}" if current is not None and previous else "-"
+            row += (f"{previous * scale:.2f}" if previous is not None else "-", change)
+
+        rows.append(row)
+
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    table = "\n".join("    ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+    statuses = ", ".join(f"{status}: {count}" for status, count in sorted(results["statuses"].items())) or "-"
+    errors = ", ".join(f"{error}: {count}" for error, count in sorted(results["errors"].items())) or "-"
+
+    return f"{table}\n\nStatuses: {statuses}\nErrors:   {errors}"
+
+
+def benchmark_http(env, arguments):
+    """
+    Load test the application through the stack's nginx service (on the local machine), and report the latency
+    percentiles, the throughput, and the error rate; the results can be saved, and compared with a previous run.
+    """
+
+    parser = argparse.ArgumentParser("run bench", description="Load test the application through the nginx service.")
+    parser.add_argument("--port", type=int, default=443, help="The https port of the nginx service.")
+    parser.add_argument("--protocol", choices=("http/1.1", "h2"), default="http/1.1", help="The HTTP version.")
+    parser.add_argument("--concurrency", type=int, default=16, help="The number of concurrent requests.")
+    parser.add_argument("--connections", type=int, default=1,
+                        help="The number of HTTP/2 connections (HTTP/1.1 uses a connection per concurrent request).")
+    parser.add_argument("--duration", type=float, default=10, help="The measured duration (in seconds).")
+    parser.add_argument("--warmup", type=float, default=2, help="The unmeasured warmup duration (in seconds).")
+    parser.add_argument("--timeout", type=float, default=10, help="The timeout of a request (in seconds).")
+    parser.add_argument("--request", type=parse_request, action="append", dest="mix", metavar="[METHOD] PATH [WEIGHT]",
+                        help="A request of the mix (may be repeated; GET / by default).")
+    parser.add_argument("--save", metavar="FILE", help="Save the results in a JSON file.")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare the results with a previously saved run.")
+    parsed = parser.parse_args(arguments)
+
+    mix = parsed.mix or [("GET", "/", 1)]
+
+    # The stack is measured, not the certificate (which is signed by the local certificate authority).
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.set_alpn_protocols([parsed.protocol])
+
+    # nginx allows 128 concurrent streams per HTTP/2 connection (http2_max_concurrent_streams).
+    if parsed.protocol == "h2":
+        client_class, connections = Http2Client, max(parsed.connections, math.ceil(parsed.concurrency / 128))
+    else:
+        client_class, connections = Http1Client, parsed.concurrency
+
+    async def main():
+        # The clients are created in the event loop of the run (to which their locks belong).
+        clients = [client_class(parsed.port, env["PROJECT_DOMAIN"], context) for _ in range(connections)]
+
+        return await load(clients, mix, parsed.concurrency, parsed.duration, parsed.warmup, parsed.timeout)
+
+    print(f"Load testing https://{env['PROJECT_DOMAIN']}/ on 127.0.0.1:{parsed.port} ({parsed.protocol}, "
+          f"{parsed.concurrency} concurrent requests, {parsed.warmup:g}s warmup, {parsed.duration:g}s measured).\n")
+
+    results = {
+        "url": f"https://{env['PROJECT_DOMAIN']}/",
+        "protocol": parsed.protocol,
+        "concurrency": parsed.concurrency,
+        "connections": connections,
+        "duration": parsed.duration,
+        "warmup": parsed.warmup,
+        "mix": [{"method": method, "path": path, "weight": weight} for method, path, weight in mix],
+        "started_at": time.time(),
+        **benchmark_results(*asyncio.run(main())),
+    }
+
+    baseline = None
+
+    if parsed.baseline is not None:
+        with open(parsed.baseline) as file:
+            baseline = json.load(file)
+
+    print(benchmark_report(results, baseline))
+
+    if parsed.save is not None:
+        with open(parsed.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+    return 0 if results["requests"] else 1
 
 
 if __name__ == "__main__":
@@ -31,27 +1805,48 @@ if __name__ == "__main__":
     )
     parser.add_argument("tool",
                         help="Define a tool to use on the application stack.",
-                        choices=("artisan", "composer", "yarn", "phpunit"))
+                        choices=("artisan", "composer", "yarn", "yarn:watch", "phpunit", "batch", "shell", "ssl:renew",
+                                 "tls:bench", "bench", "build:base", "queue:scale", "up"))
     parser.add_argument("arguments",
                         nargs=argparse.REMAINDER,
                         help="Optional arguments to pass to the specified tool.")
     parsed = parser.parse_args()
 
     if parsed.tool == "artisan":
-        run(["docker-compose", "exec", "--user", "www-data", "php", "php", "artisan"] + parsed.arguments)
+        sys.exit(execute(env, "php", ["php", "artisan"] + parsed.arguments, user="www-data"))
 
     elif parsed.tool == "composer":
-        run(["docker-compose", "exec", "--user", "www-data", "php", "composer"] + parsed.arguments)
+        sys.exit(execute(env, "php", ["composer"] + parsed.arguments, user="www-data"))
 
     elif parsed.tool == "yarn":
-        run(["docker", "run",
-             "--rm",
-             "--interactive",
-             "--tty",
-             "--user", f"{env['USER_ID']}:{env['GROUP_ID']}",
-             "--workdir", "/application",
-             "--mount", f"type=bind,source={os.getcwd()}/application/{env['PROJECT_NAME']},destination=/application",
-             f"node:{env['NODE_IMAGE_TAG']}", "yarn"] + parsed.arguments)
+        sys.exit(execute(env, "node", ["yarn"] + parsed.arguments, user=f"{env['USER_ID']}:{env['GROUP_ID']}"))
+
+    elif parsed.tool == "yarn:watch":
+        sys.exit(watch_assets(env, parsed.arguments))
+
+    elif parsed.tool == "batch":
+        sys.exit(run_batch(env, parsed.arguments))
+
+    elif parsed.tool == "shell":
+        run_shell(env, parsed.arguments)
+
+    elif parsed.tool == "ssl:renew":
+        sys.exit(renew_certificate(env, parsed.arguments))
+
+    elif parsed.tool == "tls:bench":
+        sys.exit(benchmark_tls(env, parsed.arguments))
+
+    elif parsed.tool == "bench":
+        sys.exit(benchmark_http(env, parsed.arguments))
+
+    elif parsed.tool == "build:base":
+        sys.exit(build_base_image(env, parsed.arguments))
+
+    elif parsed.tool == "queue:scale":
+        sys.exit(scale_queue(env, parsed.arguments))
+
+    elif parsed.tool == "up":
+        sys.exit(start_stack(env, parsed.arguments))
 
     else:
         parser.print_help()
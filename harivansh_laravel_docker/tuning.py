@@ -0,0 +1,442 @@
+import math
+import os
+
+
+class Host:
+    """
+    The resources of the host machine, from which the services of the stack are sized.
+
+    Attributes:
+        cpus (int):
+            The number of CPUs of the host.
+
+        memory (int):
+            The memory of the host (in bytes).
+    """
+
+    def __init__(self, cpus=None, memory=None):
+        """
+        Class constructor.
+        The resources which are not provided are detected.
+
+        Args:
+            cpus (int):
+                The number of CPUs of the host.
+
+            memory (int):
+                The memory of the host (in bytes).
+        """
+
+        self.cpus = cpus or os.cpu_count() or 1
+        self.memory = memory or Host._memory()
+
+    @staticmethod
+    def _memory():
+        try:
+            return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        except (ValueError, OSError, AttributeError):
+            return 2 * 1024 ** 3
+
+
+class Profile:
+    """
+    A performance profile of the stack (dev, staging, or production).
+
+    Attributes:
+        Profile.SETTINGS (dict):
+            The settings of each profile.
+
+        Profile.OPCACHE_PRIMES ((int,)):
+            The sizes of the opcache hash table; opcache.max_accelerated_files is rounded up to one of them.
+
+        Profile.REDIS_ROLES (dict):
+            The share of the redis memory, eviction policy, and persistence of each redis instance, by role ("cache",
+            "session", and "queue"; or "shared" if a single instance is used, with a database per role).
+
+        name (str):
+            The name of the profile.
+
+        host (Host):
+            The host machine.
+    """
+
+    SETTINGS = {
+        "dev": {
+            "php_ini": "development",
+            "opcache_memory_consumption": 128,
+            "opcache_interned_strings_buffer": 16,
+            "opcache_validate_timestamps": 1,
+            "opcache_revalidate_freq": 0,
+            "opcache_preload": False,
+            "opcache_jit": "off",
+            "opcache_jit_buffer_size": "0",
+            "realpath_cache_size": "4096K",
+            "realpath_cache_ttl": 120,
+            "fpm_pm": "ondemand",
+            "fpm_children_per_cpu": 2,
+            "fpm_memory_share": 0.25,
+            "fpm_max_requests": 500,
+            "fpm_request_terminate_timeout": "0",
+            "nginx_max_workers": 2,
+            "nginx_worker_connections": 1024,
+            "nginx_gzip": False,
+            "nginx_open_file_cache": False,
+            "nginx_fastcgi_cache": False,
+            "nginx_static_caching": False,
+            "nginx_ssl_session_cache": "2m",
+            "nginx_ssl_session_timeout": "1h",
+            "nginx_hsts_max_age": 0,
+            "redis_memory_share": 0.05,
+            "redis_appendfsync": "no",
+            "postgresql_memory_share": 0.15,
+            "postgresql_max_connections": 50,
+            "postgresql_synchronous_commit": "off",
+            "postgresql_max_wal_size": 1024,
+            "queue_workers_per_cpu": 0.5,
+            "queue_max_replicas": 1,
+            "queue_max_jobs": 100,
+            "queue_max_time": 600,
+            "queue_worker_memory": 128,
+            "octane_workers_per_cpu": 1,
+            "octane_max_requests": 250,
+            "octane_watch": True,
+        },
+        "staging": {
+            "php_ini": "production",
+            "opcache_memory_consumption": 192,
+            "opcache_interned_strings_buffer": 32,
+            "opcache_validate_timestamps": 1,
+            "opcache_revalidate_freq": 2,
+            "opcache_preload": True,
+            "opcache_jit": "tracing",
+            "opcache_jit_buffer_size": "64M",
+            "realpath_cache_size": "4096K",
+            "realpath_cache_ttl": 600,
+            "fpm_pm": "dynamic",
+            "fpm_children_per_cpu": 4,
+            "fpm_memory_share": 0.5,
+            "fpm_max_requests": 1000,
+            "fpm_request_terminate_timeout": "120s",
+            "nginx_max_workers": None,
+            "nginx_worker_connections": 2048,
+            "nginx_gzip": True,
+            "nginx_open_file_cache": True,
+            "nginx_fastcgi_cache": True,
+            "nginx_static_caching": True,
+            "nginx_ssl_session_cache": "10m",
+            "nginx_ssl_session_timeout": "4h",
+            "nginx_hsts_max_age": 86400,
+            "redis_memory_share": 0.1,
+            "redis_appendfsync": "everysec",
+            "postgresql_memory_share": 0.25,
+            "postgresql_max_connections": 100,
+            "postgresql_synchronous_commit": "on",
+            "postgresql_max_wal_size": 2048,
+            "queue_workers_per_cpu": 1,
+            "queue_max_replicas": 2,
+            "queue_max_jobs": 500,
+            "queue_max_time": 1800,
+            "queue_worker_memory": 128,
+            "octane_workers_per_cpu": 2,
+            "octane_max_requests": 500,
+            "octane_watch": False,
+        },
+        "production": {
+            "php_ini": "production",
+            "opcache_memory_consumption": 256,
+            "opcache_interned_strings_buffer": 32,
+            "opcache_validate_timestamps": 0,
+            "opcache_revalidate_freq": 0,
+            "opcache_preload": True,
+            "opcache_jit": "tracing",
+            "opcache_jit_buffer_size": "128M",
+            "realpath_cache_size": "8192K",
+            "realpath_cache_ttl": 3600,
+            "fpm_pm": "static",
+            "fpm_children_per_cpu": 4,
+            "fpm_memory_share": 0.6,
+            "fpm_max_requests": 1000,
+            "fpm_request_terminate_timeout": "60s",
+            "nginx_max_workers": None,
+            "nginx_worker_connections": 4096,
+            "nginx_gzip": True,
+            "nginx_open_file_cache": True,
+            "nginx_fastcgi_cache": True,
+            "nginx_static_caching": True,
+            "nginx_ssl_session_cache": "50m",
+            "nginx_ssl_session_timeout": "1d",
+            "nginx_hsts_max_age": 63072000,
+            "redis_memory_share": 0.15,
+            "redis_appendfsync": "everysec",
+            "postgresql_memory_share": 0.4,
+            "postgresql_max_connections": 200,
+            "postgresql_synchronous_commit": "on",
+            "postgresql_max_wal_size": 4096,
+            "queue_workers_per_cpu": 2,
+            "queue_max_replicas": None,
+            "queue_max_jobs": 1000,
+            "queue_max_time": 3600,
+            "queue_worker_memory": 256,
+            "octane_workers_per_cpu": 2,
+            "octane_max_requests": 1000,
+            "octane_watch": False,
+        },
+    }
+
+    OPCACHE_PRIMES = (223, 463, 983, 1979, 3907, 7963, 16229, 32531, 65407, 130987, 262237, 524521, 1048793)
+
+    REDIS_ROLES = {
+        # Any key may be evicted, and nothing is persisted: the cache can always be rebuilt.
+        "cache": {"memory_share": 0.5, "maxmemory_policy": "allkeys-lru", "appendonly": "no", "save": '""'},
+        # Only the keys with an expiry (i.e.: the sessions) are evicted, and the sessions are snapshotted.
+        "session": {
+            "memory_share": 0.25, "maxmemory_policy": "volatile-lru", "appendonly": "no", "save": "900 1 300 10"
+        },
+        # Nothing is evicted (the writes fail instead of losing jobs), and every write is logged.
+        "queue": {"memory_share": 0.25, "maxmemory_policy": "noeviction", "appendonly": "yes", "save": '""'},
+        "shared": {"memory_share": 1, "maxmemory_policy": "volatile-lru", "appendonly": "yes", "save": '""'},
+    }
+
+    def __init__(self, name, host=None):
+        """
+        Class constructor.
+
+        Args:
+            name (str):
+                The name of the profile (dev, staging, or production).
+
+            host (Host):
+                The host machine (detected if it is not provided).
+
+        Raises:
+            ValueError: If the profile does not exist.
+        """
+
+        if name not in Profile.SETTINGS:
+            raise ValueError(f"The profile should be one of: {', '.join(Profile.SETTINGS)}.")
+
+        self.name = name
+        self.host = host or Host()
+
+    def __getitem__(self, setting):
+        return Profile.SETTINGS[self.name][setting]
+
+    def opcache(self, php_files):
+        """
+        Size the opcache for an application.
+
+        Args:
+            php_files (int):
+                The number of php files of the application (including its vendor files).
+
+        Returns:
+            dict: The opcache.max_accelerated_files, and opcache.memory_consumption (in megabytes) values.
+        """
+
+        # Leave room for the files added to the application (and its dependencies) after its creation.
+        files = int(php_files * 1.5)
+        max_accelerated_files = next(
+            (prime for prime in Profile.OPCACHE_PRIMES if prime >= files), Profile.OPCACHE_PRIMES[-1]
+        )
+
+        # About 16KB of shared memory per cached script, rounded up to 64MB.
+        memory_consumption = max(self["opcache_memory_consumption"], math.ceil(files * 16 / 1024 / 64) * 64)
+
+        return {
+            "max_accelerated_files": max_accelerated_files,
+            "memory_consumption": memory_consumption,
+        }
+
+    def fpm_pool(self, worker_memory):
+        """
+        Size the php-fpm pool from the host's CPUs, and memory.
+        The workers get the profile's share of the host's memory, within the profile's number of workers per CPU.
+
+        Args:
+            worker_memory (int):
+                The (estimated) memory used by a php-fpm worker (in megabytes).
+
+        Returns:
+            dict: The pm, pm.max_children, pm.start_servers, pm.min_spare_servers, pm.max_spare_servers,
+                  pm.max_requests, and request_terminate_timeout values.
+        """
+
+        memory_budget = self.host.memory / 1024 ** 2 * self["fpm_memory_share"]
+        max_children = max(2, min(self.host.cpus * self["fpm_children_per_cpu"], int(memory_budget // worker_memory)))
+        min_spare_servers = max(1, max_children // 4)
+        max_spare_servers = max(min_spare_servers, max_children // 2)
+
+        return {
+            "pm": self["fpm_pm"],
+            "max_children": max_children,
+            "start_servers": min_spare_servers + (max_spare_servers - min_spare_servers) // 2,
+            "min_spare_servers": min_spare_servers,
+            "max_spare_servers": max_spare_servers,
+            "max_requests": self["fpm_max_requests"],
+            "request_terminate_timeout": self["fpm_request_terminate_timeout"],
+        }
+
+    def nginx(self, fpm_max_children):
+        """
+        Size, and configure nginx for the host.
+        The values of the features which are disabled by the profile are "off".
+
+        Args:
+            fpm_max_children (int):
+                The maximum number of php-fpm workers; the keepalive connections to php-fpm (each of which holds a
+                worker) are kept well below it.
+
+        Returns:
+            dict: The nginx configuration values.
+        """
+
+        worker_processes = min(self.host.cpus, self["nginx_max_workers"] or self.host.cpus)
+        static_caching = self["nginx_static_caching"]
+
+        return {
+            "worker_processes": worker_processes,
+            "worker_connections": self["nginx_worker_connections"],
+            "worker_rlimit_nofile": 2 * self["nginx_worker_connections"],
+            "gzip": "on" if self["nginx_gzip"] else "off",
+            "open_file_cache": "max=10000 inactive=60s" if self["nginx_open_file_cache"] else "off",
+            # FastCGI micro-caching: the (anonymous) responses are cached for a second.
+            "fastcgi_cache": "laravel" if self["nginx_fastcgi_cache"] else "off",
+            "fastcgi_cache_valid": "1s",
+            "upstream_keepalive": max(1, fpm_max_children // (2 * worker_processes)),
+            # The assets built by vite (or mix) have a content hash in their name (or in their query string).
+            "hashed_assets_expires": "max" if static_caching else "off",
+            "static_assets_expires": "7d" if static_caching else "off",
+            "storage_expires": "1d" if static_caching else "off",
+            # About 4000 TLS sessions per megabyte of the shared session cache.
+            "ssl_session_cache": self["nginx_ssl_session_cache"],
+            "ssl_session_timeout": self["nginx_ssl_session_timeout"],
+            # A max-age of 0 tells the browsers to forget the HSTS policy (e.g.: the dev profile's local domains).
+            "hsts_max_age": self["nginx_hsts_max_age"],
+        }
+
+    def octane(self, worker_memory):
+        """
+        Size the Laravel Octane server (which replaces php-fpm) from the host's CPUs, and memory.
+        The workers get the memory share of the php-fpm workers; the task workers (Swoole only) run the concurrent
+        tasks of the application.
+
+        Args:
+            worker_memory (int):
+                The (estimated) memory used by a worker (in megabytes).
+
+        Returns:
+            dict: The --workers, --task-workers, and --max-requests values, whether the workers are reloaded when the
+                  application's files change, and the number of keepalive connections of each nginx worker.
+        """
+
+        memory_budget = self.host.memory / 1024 ** 2 * self["fpm_memory_share"]
+        workers = max(2, min(self.host.cpus * self["octane_workers_per_cpu"], int(memory_budget // worker_memory)))
+
+        return {
+            "workers": workers,
+            "task_workers": max(1, self.host.cpus // 2),
+            "max_requests": self["octane_max_requests"],
+            "watch": self["octane_watch"],
+            # The workers do not hold the connections (as the php-fpm workers do), so a few more of them are kept.
+            "upstream_keepalive": 2 * workers,
+        }
+
+    def redis(self, role):
+        """
+        Size, and configure a redis instance from the host's memory, the profile, and the instance's role.
+
+        Args:
+            role (str):
+                The role of the redis instance (see Profile.REDIS_ROLES).
+
+        Raises:
+            ValueError: If the role does not exist.
+
+        Returns:
+            dict: The redis configuration values (maxmemory in megabytes).
+        """
+
+        if role not in Profile.REDIS_ROLES:
+            raise ValueError(f"The redis role should be one of: {', '.join(Profile.REDIS_ROLES)}.")
+
+        settings = Profile.REDIS_ROLES[role]
+        memory = self.host.memory / 1024 ** 2 * self["redis_memory_share"] * settings["memory_share"]
+
+        return {
+            "maxmemory": max(32, int(memory)),
+            "maxmemory_policy": settings["maxmemory_policy"],
+            "appendonly": settings["appendonly"],
+            "appendfsync": self["redis_appendfsync"],
+            "save": settings["save"],
+        }
+
+    def postgresql(self):
+        """
+        Size PostgreSQL (and its PgBouncer connection pooler) from the host's CPUs, and memory, and the profile.
+        The memory values are in megabytes.
+
+        Returns:
+            dict: The PostgreSQL, and PgBouncer configuration values.
+        """
+
+        memory = self.host.memory / 1024 ** 2 * self["postgresql_memory_share"]
+        max_connections = self["postgresql_max_connections"]
+        shared_buffers = max(128, int(memory / 4))
+        parallel_workers_per_gather = max(1, min(4, self.host.cpus // 2))
+
+        return {
+            "max_connections": max_connections,
+            "shared_buffers": shared_buffers,
+            "effective_cache_size": max(256, int(memory * 3 / 4)),
+            "maintenance_work_mem": max(64, min(2048, int(memory / 16))),
+            # Each connection may use several work_mem buffers (one per sort, or hash of a query, and worker).
+            "work_mem": max(4, int((memory - shared_buffers) / (max_connections * 3) / parallel_workers_per_gather)),
+            # The WAL buffers are sized automatically (1/32 of shared_buffers, up to 16MB) with -1.
+            "wal_buffers": "16MB" if shared_buffers >= 512 else "-1",
+            "min_wal_size": self["postgresql_max_wal_size"] // 4,
+            "max_wal_size": self["postgresql_max_wal_size"],
+            "synchronous_commit": self["postgresql_synchronous_commit"],
+            "max_worker_processes": max(8, self.host.cpus),
+            "max_parallel_workers": self.host.cpus,
+            "max_parallel_workers_per_gather": parallel_workers_per_gather,
+            "max_parallel_maintenance_workers": parallel_workers_per_gather,
+            # The pooler's server connections are kept well below max_connections (for the other clients).
+            "pgbouncer_default_pool_size": max(10, min(self.host.cpus * 4, max_connections // 2)),
+            "pgbouncer_max_client_conn": max_connections * 10,
+        }
+
+    def queue_workers(self, queues):
+        """
+        Size the queue workers from the host's CPUs, and the profile.
+        The worker processes of each replica are shared between the queues according to their weights (with at least
+        one process per queue), and are recycled after a number of jobs, or an amount of time.
+
+        Args:
+            queues (dict):
+                The weights of the queues, keyed by their names (e.g.: {"default": 2, "emails": 1}).
+
+        Returns:
+            dict: The number of replicas, the number of worker processes of each queue (in each replica), the
+                  --max-jobs, --max-time (in seconds), and --memory (in megabytes) values of the workers, and the
+                  memory limit of a replica (in megabytes).
+        """
+
+        total = max(len(queues), int(self.host.cpus * self["queue_workers_per_cpu"]))
+        replicas = max(1, min(self["queue_max_replicas"] or self.host.cpus, self.host.cpus // 2, total))
+        processes_per_replica = math.ceil(total / replicas)
+        processes = {queue: 1 for queue in queues}
+
+        # Each additional process goes to the queue with the fewest processes for its weight.
+        for _ in range(processes_per_replica - len(queues)):
+            queue = min(queues, key=lambda name: processes[name] / queues[name])
+            processes[queue] += 1
+
+        return {
+            "replicas": replicas,
+            "processes": processes,
+            "max_jobs": self["queue_max_jobs"],
+            "max_time": self["queue_max_time"],
+            "memory": self["queue_worker_memory"],
+            # The workers are restarted when they exceed --memory; the limit leaves room for the php runtime.
+            "memory_limit": sum(processes.values()) * (self["queue_worker_memory"] + 32),
+        }
@@ -26,12 +26,16 @@ setup(
         "harivansh_laravel_docker": [
             "templates/*",
             "templates/configuration/nginx/*",
-            "templates/dockerfiles/php/*"
+            "templates/configuration/php/*",
+            "templates/configuration/postgresql/*",
+            "templates/configuration/redis/*",
+            "templates/dockerfiles/php/*",
+            "templates/dockerfiles/php-base/*"
         ]
     },
     python_requires='>=3.8',
     install_requires=[
-        "cryptography",
+        "cryptography>=42",
         "harivansh-scripting-utilities"
     ]
 )
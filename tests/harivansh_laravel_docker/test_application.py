@@ -1,10 +1,18 @@
 import copy
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import run
 from unittest import TestCase
 
 from harivansh_scripting_utilities.helpers import capturestdout, injectstdin, tmpdir
 
-from harivansh_laravel_docker.application import Application
+from harivansh_laravel_docker import application as application_module
+from harivansh_laravel_docker.application import Application, BulkApplication
 from harivansh_laravel_docker.core import ProjectConfiguration, ProjectEnvironment
+from harivansh_laravel_docker.helpers import Renderer
 
 
 class TestProjectConfiguration(TestCase):
@@ -25,3 +33,259 @@ class TestProjectConfiguration(TestCase):
             project_configuration = ProjectConfiguration(copy.deepcopy(configuration))
 
             self.assertEqual(project_configuration._configuration, configuration)
+
+    def test_the_configuration_files_of_the_manifest_are_created(self):
+        project_name = "One"
+        domain_name = "application.one.com"
+
+        with capturestdout(), injectstdin(f"{project_name}\n{domain_name}\n"):
+            configuration = ProjectEnvironment().initialize().get()
+
+        with tmpdir():
+            with capturestdout():
+                application = Application()
+                application._configuration = configuration
+                application._structure()
+
+            project_configuration = ProjectConfiguration(configuration)
+            project_configuration.setup()
+
+            for file in project_configuration.manifest():
+                self.assertTrue(os.path.isfile(file["destination"]))
+
+            self.assertTrue(os.access(os.path.join(project_name, "run"), os.X_OK))
+            self.assertTrue(os.access(os.path.join(project_name, "dockerfiles", "php", "entrypoint.sh"), os.X_OK))
+
+    def test_the_nginx_configuration_files_are_rendered_from_the_profile(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"},
+            "tuning": {"profile": "production"}
+        }).initialize(interactive=False).get()
+
+        variables = {
+            os.path.basename(file["destination"]): file.get("variables", {})
+            for file in ProjectConfiguration(configuration).manifest()
+        }
+
+        self.assertEqual(variables["default.conf"]["FASTCGI_CACHE"], "laravel")
+        self.assertEqual(variables["default.conf"]["HASHED_ASSETS_EXPIRES"], "max")
+        self.assertEqual(variables["nginx.conf"]["GZIP"], "on")
+        self.assertEqual(variables["nginx.conf"]["PROFILE"], "production")
+        self.assertEqual(variables["nginx.conf"]["SSL_SESSION_CACHE"], "50m")
+        self.assertEqual(variables["default.conf"]["HSTS_MAX_AGE"], 63072000)
+        self.assertEqual(variables["default.conf"]["ALT_SVC"], "")
+
+    def test_a_worker_process_is_started_for_each_queue(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"},
+            "services": {"queue": {"queues": ["default:2", "emails"]}}
+        }).initialize(interactive=False).get()
+
+        with tmpdir():
+            os.makedirs(os.path.join("One", "dockerfiles", "php"))
+
+            manifest = ProjectConfiguration(configuration).manifest()
+
+            Renderer().render([file for file in manifest if file["template"] == "dockerfiles/php/worker.sh"]).write()
+
+            worker_path = os.path.join("One", "dockerfiles", "php", "worker.sh")
+
+            with open(worker_path) as worker:
+                content = worker.read()
+
+            self.assertEqual(run(["sh", "-n", worker_path]).returncode, 0)
+
+        self.assertIn("work default &\n", content)
+        self.assertIn("work emails &\n", content)
+
+        with self.assertRaisesRegex(ValueError, r"^\[One\] The queue runner should be one of"):
+            ProjectEnvironment().merge({
+                "project": {"name": "One", "domain": "one.local"},
+                "services": {"queue": {"runner": "supervisor"}}
+            }).initialize(interactive=False)
+
+    def test_a_queue_weight_below_one_is_rejected(self):
+        def initialize(queues):
+            ProjectEnvironment().merge({
+                "project": {"name": "One", "domain": "one.local"},
+                "services": {"queue": {"queues": queues}}
+            }).initialize(interactive=False)
+
+        with self.assertRaisesRegex(ValueError, r"^\[One\] The weight of the default queue should be a positive"):
+            initialize(["default:0"])
+
+        with self.assertRaisesRegex(ValueError, r"^\[One\] The queues should have a name"):
+            initialize([":2"])
+
+        for queues in (["default:-1"], ["default:two"], []):
+            self.assertRaises(ValueError, initialize, queues)
+
+        self.assertEqual(ProjectConfiguration.queue_weights(["default:2", "emails"]), {"default": 2, "emails": 1})
+
+    def test_nginx_proxies_to_the_octane_server_if_it_is_selected(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"},
+            "tuning": {"runtime": "swoole"}
+        }).initialize(interactive=False).get()
+
+        with tmpdir():
+            os.makedirs(os.path.join("One", "configuration", "nginx", "conf.d"))
+            os.makedirs(os.path.join("One", "dockerfiles", "php"))
+
+            Renderer().render([
+                file for file in ProjectConfiguration(configuration).manifest()
+                if file["template"] in ("configuration/nginx/octane.conf", "dockerfiles/php/server.sh")
+            ]).write()
+
+            with open(os.path.join("One", "configuration", "nginx", "conf.d", "default.conf")) as default:
+                content = default.read()
+
+            server_path = os.path.join("One", "dockerfiles", "php", "server.sh")
+
+            with open(server_path) as server:
+                server_content = server.read()
+
+            self.assertEqual(run(["sh", "-n", server_path]).returncode, 0)
+
+        self.assertIn("server php:8000;", content)
+        self.assertIn("proxy_pass http://octane;", content)
+        self.assertNotIn("fastcgi_pass", content)
+        self.assertIn("--task-workers=", server_content)
+        self.assertIn('if [ "1" = "1" ]', server_content)
+
+    def test_every_service_has_a_healthcheck_and_waits_for_its_dependencies_to_be_healthy(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"},
+            "tuning": {"fastcgi": "unix"}
+        }).initialize(interactive=False).get()
+
+        with tmpdir():
+            os.makedirs(os.path.join("One", "dockerfiles", "php"))
+
+            Renderer().render([
+                file for file in ProjectConfiguration(configuration).manifest()
+                if file["template"] in ("docker-compose.yml", "dockerfiles/php/healthcheck.sh")
+            ]).write()
+
+            with open(os.path.join("One", "docker-compose.yml")) as compose:
+                content = compose.read()
+
+            healthcheck_path = os.path.join("One", "dockerfiles", "php", "healthcheck.sh")
+
+            with open(healthcheck_path) as healthcheck:
+                healthcheck_content = healthcheck.read()
+
+            self.assertEqual(run(["sh", "-n", healthcheck_path]).returncode, 0)
+
+        services = re.findall(r"^  (\S+):$", content.split("\nservices:\n")[1].split("\nnetworks:\n")[0], re.M)
+
+        self.assertEqual(content.count("    healthcheck:\n      <<: *healthcheck\n"), len(services))
+        self.assertNotRegex(content, r"depends_on:\n +- ")
+        self.assertEqual(content.count("condition: service_healthy"), 9)
+        self.assertIn("-connect /var/run/php-fpm/php-fpm.sock", healthcheck_content)
+        self.assertIn("http://127.0.0.1:8000/", healthcheck_content)
+
+
+class TestBulkApplication(TestCase):
+
+    def test_the_specifications_are_loaded_with_their_defaults(self):
+        with tmpdir():
+            with open("projects.json", "w") as file:
+                json.dump({
+                    "defaults": {"ssl": {"key_type": "ed25519"}},
+                    "projects": [
+                        {"name": "One", "domain": "one.local"},
+                        {"name": "Two", "ssl": {"validity": 30}}
+                    ]
+                }, file)
+
+            specifications = BulkApplication.load("projects.json", {"composer": {"offline": True}})
+
+        self.assertEqual(specifications, [
+            {
+                "composer": {"offline": True},
+                "ssl": {"key_type": "ed25519"},
+                "project": {"name": "One", "domain": "one.local"}
+            },
+            {
+                "composer": {"offline": True},
+                "ssl": {"key_type": "ed25519", "validity": 30},
+                "project": {"name": "Two", "domain": "two.local"}
+            }
+        ])
+
+    def test_an_ill_formed_specification_file_is_rejected(self):
+        with tmpdir():
+            with open("projects.json", "w") as file:
+                json.dump({"name": "One"}, file)
+
+            with self.assertRaises(ValueError):
+                BulkApplication.load("projects.json")
+
+    def test_every_specification_is_validated_before_any_project_is_set_up(self):
+        with tmpdir():
+            application = BulkApplication([
+                BulkApplication.specification({"name": "One"}),
+                BulkApplication.specification({"name": "two"})
+            ])
+
+            with self.assertRaises(ValueError):
+                application.run()
+
+            self.assertFalse(os.path.exists("scaffolding-logs"))
+            self.assertEqual(application.results, [])
+
+    def test_duplicated_projects_are_rejected(self):
+        with tmpdir():
+            with self.assertRaises(ValueError):
+                BulkApplication([
+                    BulkApplication.specification({"name": "One"}),
+                    BulkApplication.specification({"name": "One", "domain": "another.local"})
+                ]).run()
+
+    def test_the_first_project_is_set_up_on_its_own_without_a_snapshot(self):
+        installed = []
+
+        def install(specification, logs_directory):
+            installed.append((specification["project"]["name"], threading.current_thread() is main_thread))
+
+            return specification["project"]["name"], "installed", 0.0
+
+        main_thread = threading.current_thread()
+        original_install, original_executor = BulkApplication._install, application_module.ProcessPoolExecutor
+        BulkApplication._install = staticmethod(install)
+        application_module.ProcessPoolExecutor = ThreadPoolExecutor
+        cache_home = os.environ.get("XDG_CACHE_HOME")
+
+        try:
+            with tmpdir():
+                os.environ["XDG_CACHE_HOME"] = os.path.join(os.getcwd(), "cache")
+
+                application = BulkApplication([
+                    BulkApplication.specification({"name": name}, {"composer": {"offline": True}})
+                    for name in ("One", "Two", "Three")
+                ]).run()
+        finally:
+            BulkApplication._install, application_module.ProcessPoolExecutor = original_install, original_executor
+
+            if cache_home is None:
+                del os.environ["XDG_CACHE_HOME"]
+            else:
+                os.environ["XDG_CACHE_HOME"] = cache_home
+
+        self.assertEqual(installed[0], ("One", True))
+        self.assertEqual(sorted(installed[1:]), [("Three", False), ("Two", False)])
+        self.assertEqual([name for name, _, _ in application.results], ["One", "Two", "Three"])
+        self.assertTrue(application.succeeded)
+
+    def test_the_report_lists_the_status_of_every_project(self):
+        application = BulkApplication([])
+        application.results = [("One", "installed", 1.5), ("Two", "failed: error", 2)]
+
+        report = application.report().splitlines()
+
+        self.assertEqual(len(report), 3)
+        self.assertIn("One", report[1])
+        self.assertIn("1.50s", report[1])
+        self.assertIn("failed: error", report[2])
+        self.assertFalse(application.succeeded)
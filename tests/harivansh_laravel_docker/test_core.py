@@ -1,9 +1,20 @@
 import os
+import re
+import time
 from unittest import TestCase
 
 from harivansh_scripting_utilities.helpers import cd, capturestdout, injectstdin, tmpdir
 
-from harivansh_laravel_docker.core import CreateSkeleton, Env, ProjectEnvironment, Ssl
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from harivansh_laravel_docker.core import (
+    CertificateAuthority, CreateSkeleton, Env, KeyPool, LaravelInstaller, OctaneConfiguration, PhpBaseImage,
+    PhpConfiguration, Prefetcher, PostgresqlConfiguration, ProjectEnvironment, RedisConfiguration, SnapshotStore, Ssl
+)
+from harivansh_laravel_docker.helpers import Parser
 
 
 class TestProjectEnvironment(TestCase):
@@ -70,6 +81,32 @@ class TestProjectEnvironment(TestCase):
 
         self.assertEqual(captured_domain, domain)
 
+    def test_the_configuration_values_are_overridden(self):
+        project_environment = ProjectEnvironment().merge({"composer": {"offline": True, "cache": "/cache"}})
+
+        self.assertTrue(project_environment.get()["composer"]["offline"])
+        self.assertEqual(project_environment.get()["composer"]["cache"], "/cache")
+        self.assertEqual(project_environment.get()["ssl"]["key_name"], "key.pem")
+
+    def test_an_exception_is_raised_if_an_override_is_not_a_configuration_value(self):
+        project_environment = ProjectEnvironment()
+
+        self.assertRaises(ValueError, project_environment.merge, {"composer": {"unknown": True}})
+
+    def test_the_project_name_and_domain_are_validated_in_non_interactive_mode(self):
+        configuration = ProjectEnvironment().merge(
+            {"project": {"name": "One", "domain": "one.local"}}
+        ).initialize(interactive=False).get()
+
+        self.assertEqual(configuration["application"]["environment"]["APP_NAME"], "One")
+        self.assertEqual(configuration["application"]["environment"]["APP_URL"], "https://one.local")
+
+        with self.assertRaises(ValueError):
+            ProjectEnvironment().merge({"project": {"name": "one"}}).initialize(interactive=False)
+
+        with self.assertRaises(ValueError):
+            ProjectEnvironment().merge({"project": {"name": "One", "domain": "not a domain"}}).initialize(False)
+
 
 class TestCreateSkeleton(TestCase):
 
@@ -187,7 +224,7 @@ APP_URL={replacement['APP_URL']}
 DB_USERNAME={replacement['DB_USERNAME']}    # This is a partial line comment also with an = character.
 DB_PASSWORD=password    # is this le password?
 
-# This is a full line comment with an = character.
+                # This is a full line comment with an = character.
 DB_PORT=5432
 """
 
@@ -198,6 +235,409 @@ DB_PORT=5432
                 # We need to remove it so that the following assertion passes.
                 self.assertEqual(expected_env_file_content, actual_env_file_content[:-1])
 
+    def test_quoted_values_are_replaced_and_missing_values_are_appended(self):
+        with tmpdir():
+            with open(".env", "w") as env:
+                env.write('export APP_NAME="One Two"    # The name.\nAPP_ENV=local\n')
+
+            os.chmod(".env", 0o600)
+
+            Env(".env").replace({"APP_NAME": "Five Six", "REDIS_HOST": "redis"})
+
+            with open(".env") as env:
+                self.assertEqual(
+                    env.read(), 'export APP_NAME="Five Six"    # The name.\nAPP_ENV=local\nREDIS_HOST=redis\n'
+                )
+
+            self.assertEqual(os.stat(".env").st_mode & 0o777, 0o600)
+            self.assertEqual(os.listdir(), [".env"])
+
+
+class TestPrefetcher(TestCase):
+
+    def test_the_images_referenced_by_the_templates_are_resolved_with_their_tags(self):
+        images = Prefetcher.images()
+
+        self.assertTrue("nginx:latest" in images)
+        self.assertTrue("selenium/node-firefox:latest" in images)
+        self.assertTrue("composer" in images)
+        self.assertTrue("node:latest" in images)
+        self.assertEqual(len(images), len(set(images)))
+        self.assertFalse(any("$" in image for image in images))
+
+    def test_only_the_images_of_the_enabled_compose_profiles_are_pulled(self):
+        self.assertFalse(any(image.startswith(("redis:", "edoburu/pgbouncer:")) for image in Prefetcher.images()))
+        self.assertIn("redis:latest", Prefetcher.images(["redis-instances"]))
+        self.assertIn("edoburu/pgbouncer:latest", Prefetcher.images(["redis-databases", "pgbouncer"]))
+
+        configuration = ProjectEnvironment().get()
+        tasks = Prefetcher(configuration).tasks()
+
+        self.assertIn("pull redis:latest", tasks)
+        self.assertNotIn("pull edoburu/pgbouncer:latest", tasks)
+
+        configuration["services"]["pgbouncer"]["enabled"] = True
+
+        self.assertIn("pull edoburu/pgbouncer:latest", Prefetcher(configuration).tasks())
+
+    def test_running_tasks_are_terminated_when_the_prefetcher_is_cancelled(self):
+        class SleepingPrefetcher(Prefetcher):
+            def tasks(self):
+                return {"sleep": ["sleep", "30"]}
+
+        prefetcher = SleepingPrefetcher(ProjectEnvironment().get()).start()
+        start = time.monotonic()
+
+        time.sleep(0.1)
+        prefetcher.cancel().join()
+
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(prefetcher.failures, {})
+
+    def test_failed_tasks_are_recorded(self):
+        class FailingPrefetcher(Prefetcher):
+            def tasks(self):
+                return {"false": ["false"], "missing": ["a-command-which-does-not-exist"]}
+
+        with capturestdout():
+            prefetcher = FailingPrefetcher(ProjectEnvironment().get()).start().join()
+
+        self.assertEqual(set(prefetcher.failures), {"false", "missing"})
+
+    def test_the_failed_tasks_are_reported_once_they_are_joined(self):
+        class FailingPrefetcher(Prefetcher):
+            def tasks(self):
+                return {"pull": ["sh", "-c", "echo 'pull access denied' >&2; exit 1"], "true": ["true"]}
+
+        prefetcher = FailingPrefetcher(ProjectEnvironment().get()).start()
+
+        with capturestdout() as stdout:
+            prefetcher.join("pull").join()
+
+        self.assertEqual(prefetcher.failures, {"pull": "exit code 1: pull access denied"})
+        self.assertEqual(
+            stdout.getvalue(),
+            "The background task 'pull' failed (exit code 1: pull access denied); "
+            "it is done again by the installation.\n"
+        )
+
+    def test_nothing_is_prefetched_in_offline_mode(self):
+        prefetcher = Prefetcher(ProjectEnvironment().merge({"composer": {"offline": True}}).get())
+
+        self.assertEqual(prefetcher.tasks(), {})
+
+
+class TestPhpConfiguration(TestCase):
+
+    def test_the_php_configuration_files_are_generated_from_the_application_and_the_profile(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"},
+            "tuning": {"profile": "production", "fastcgi": "unix", "php_worker_memory": 40}
+        }).initialize(interactive=False).get()
+
+        with tmpdir():
+            framework = os.path.join("One", "application", "One", "vendor", "laravel", "framework", "src", "Illuminate")
+
+            for path in ("Support/Collection.php", "Support/helpers.php", "Http/Request.php",
+                         "Foundation/Testing/TestCase.php", "Broadcasting/Channel.php", "Http/README.md"):
+                os.makedirs(os.path.dirname(os.path.join(framework, path)), exist_ok=True)
+                open(os.path.join(framework, path), "w").close()
+
+            os.makedirs(os.path.join("One", "configuration", "php"))
+
+            PhpConfiguration(configuration).setup()
+
+            with open(os.path.join("One", "configuration", "php", "custom-php.ini")) as ini:
+                ini = ini.read()
+
+            with open(os.path.join("One", "configuration", "php", "preload.php")) as preload:
+                preload = preload.read()
+
+            with open(os.path.join("One", "configuration", "php", "www.conf")) as pool:
+                pool = pool.read()
+
+        self.assertIn("opcache.validate_timestamps = 0", ini)
+        self.assertIn("opcache.max_accelerated_files = 223", ini)
+        self.assertIn("opcache.preload = /home/www-data/preload.php", ini)
+        self.assertIn("'vendor/laravel/framework/src/Illuminate/Http/Request.php',", preload)
+        self.assertIn("'vendor/laravel/framework/src/Illuminate/Support/Collection.php',", preload)
+        self.assertNotIn("helpers.php", preload)
+        self.assertNotIn("Testing", preload)
+        self.assertNotIn("Broadcasting", preload)
+        self.assertIn("listen = /var/run/php-fpm/php-fpm.sock", pool)
+        self.assertIn("pm = static", pool)
+        self.assertIn("Each worker is estimated to use 40MB of memory.", pool)
+
+    def test_the_opcache_is_enabled_for_the_cli_octane_workers(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"}
+        }).initialize(interactive=False).get()
+
+        with tmpdir():
+            self.assertEqual(PhpConfiguration(configuration).manifest()[0]["variables"]["OPCACHE_ENABLE_CLI"], 0)
+
+            configuration["tuning"]["runtime"] = "swoole"
+
+            self.assertEqual(PhpConfiguration(configuration).manifest()[0]["variables"]["OPCACHE_ENABLE_CLI"], 1)
+
+    def test_the_fastcgi_address_depends_on_the_transport(self):
+        configuration = ProjectEnvironment().get()
+
+        self.assertEqual(PhpConfiguration.fastcgi_address(configuration, "php"), "9000")
+        self.assertEqual(PhpConfiguration.fastcgi_address(configuration, "nginx"), "php:9000")
+        self.assertEqual(PhpConfiguration.fastcgi_address(configuration, "healthcheck"), "127.0.0.1:9000")
+
+        configuration["tuning"]["fastcgi"] = "unix"
+
+        self.assertEqual(PhpConfiguration.fastcgi_address(configuration, "nginx"), "unix:/var/run/php-fpm/php-fpm.sock")
+        self.assertEqual(PhpConfiguration.fastcgi_address(configuration, "healthcheck"),
+                         "/var/run/php-fpm/php-fpm.sock")
+
+        configuration["tuning"]["fastcgi"] = "udp"
+
+        self.assertRaises(ValueError, PhpConfiguration.fastcgi_address, configuration, "php")
+
+    def test_the_framework_is_not_preloaded_in_the_dev_profile(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"}
+        }).initialize(interactive=False).get()
+
+        with tmpdir():
+            manifest = PhpConfiguration(configuration).manifest()
+
+        self.assertEqual(manifest[0]["variables"]["OPCACHE_PRELOAD"], "")
+        self.assertEqual(manifest[0]["variables"]["PHP_INI_TYPE"], "development")
+
+
+class TestRedisConfiguration(TestCase):
+
+    def test_a_configuration_file_is_generated_for_each_redis_instance(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"}
+        }).initialize(interactive=False).get()
+
+        destinations = [file["destination"] for file in RedisConfiguration(configuration).manifest()]
+
+        self.assertEqual([os.path.basename(destination) for destination in destinations],
+                         ["redis-cache.conf", "redis-session.conf", "redis-queue.conf"])
+        self.assertEqual(configuration["application"]["environment"]["REDIS_CACHE_HOST"], "redis-cache")
+
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"},
+            "services": {"redis": {"mode": "databases"}}
+        }).initialize(interactive=False).get()
+
+        self.assertEqual(len(RedisConfiguration(configuration).manifest()), 1)
+        self.assertEqual(configuration["application"]["environment"]["REDIS_SESSION_DB"], 2)
+
+        configuration["services"]["redis"]["mode"] = "cluster"
+
+        self.assertRaises(ValueError, RedisConfiguration(configuration).manifest)
+
+    def test_the_redis_connections_are_added_to_the_application_once(self):
+        with tmpdir():
+            with open("database.php", "w") as file:
+                file.write("<?php\n\nreturn [\n    'redis' => [\n\n        'client' => 'phpredis',\n    ],\n];\n")
+
+            self.assertTrue(RedisConfiguration.add_connections("database.php"))
+            self.assertTrue(RedisConfiguration.add_connections("database.php"))
+
+            with open("database.php") as file:
+                content = file.read()
+
+            with open("empty.php", "w") as file:
+                file.write("<?php\n\nreturn [];\n")
+
+            self.assertFalse(RedisConfiguration.add_connections("empty.php"))
+            self.assertFalse(RedisConfiguration.add_connections("missing.php"))
+
+        self.assertEqual(content.count("'redis-cache' =>"), 1)
+        self.assertIn("'redis-session' =>", content)
+        self.assertLess(content.index("'redis-cache' =>"), content.index("'client' =>"))
+
+
+class TestPostgresqlConfiguration(TestCase):
+
+    def test_the_application_connects_through_pgbouncer_if_it_is_enabled(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"}
+        }).initialize(interactive=False).get()
+
+        self.assertEqual(len(PostgresqlConfiguration(configuration).manifest()), 1)
+        self.assertEqual(configuration["application"]["environment"]["DB_HOST"], "postgresql")
+
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"},
+            "services": {"pgbouncer": {"enabled": True}},
+            "application": {"environment": {"DB_PASSWORD": "pass\"word"}}
+        }).initialize(interactive=False).get()
+
+        with tmpdir():
+            os.makedirs(os.path.join("One", "configuration", "postgresql"))
+
+            PostgresqlConfiguration(configuration).setup()
+
+            self.assertEqual(sorted(os.listdir(os.path.join("One", "configuration", "postgresql"))),
+                             ["pgbouncer.ini", "postgresql.conf", "userlist.txt"])
+
+            with open(os.path.join("One", "configuration", "postgresql", "userlist.txt")) as userlist:
+                self.assertEqual(userlist.read(), '"username" "pass""word"\n')
+
+        self.assertEqual(configuration["application"]["environment"]["DB_HOST"], "pgbouncer")
+        self.assertEqual(configuration["application"]["environment"]["DB_PORT"], 6432)
+
+
+class TestOctaneConfiguration(TestCase):
+
+    def test_the_octane_packages_of_the_runtime_are_required(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"},
+            "tuning": {"runtime": "roadrunner"},
+            "composer": {"cache": "cache"}
+        }).initialize(interactive=False).get()
+
+        with tmpdir():
+            command = OctaneConfiguration(configuration).command(os.path.join("One", "application", "One"))
+
+        self.assertEqual(command[-3:], ["laravel/octane", "spiral/roadrunner-cli", "spiral/roadrunner-http"])
+        self.assertEqual(configuration["application"]["environment"]["OCTANE_SERVER"], "roadrunner")
+
+    def test_php_fpm_has_no_octane_environment(self):
+        configuration = ProjectEnvironment().merge({
+            "project": {"name": "One", "domain": "one.local"}
+        }).initialize(interactive=False).get()
+
+        self.assertNotIn("OCTANE_SERVER", configuration["application"]["environment"])
+        self.assertRaises(ValueError, OctaneConfiguration.environment, "frankenphp")
+
+
+class TestPhpBaseImage(TestCase):
+
+    def test_the_tag_is_a_content_hash_of_the_inputs(self):
+        self.assertEqual(PhpBaseImage("fpm").tag(), PhpBaseImage().tag())
+        self.assertNotEqual(PhpBaseImage("fpm").tag(), PhpBaseImage("8.2-fpm").tag())
+        self.assertNotEqual(PhpBaseImage("fpm").tag(), PhpBaseImage("fpm", "swoole").tag())
+        self.assertRegex(PhpBaseImage().tag(), r"^harivansh-laravel-docker/php-base:[0-9a-f]{16}$")
+
+    def test_the_roadrunner_image_is_only_used_by_the_roadrunner_runtime(self):
+        with open(Parser.template_path("dockerfiles/php-base/Dockerfile")) as dockerfile:
+            stages = {name: image for image, name in re.findall(r"^FROM (\S+) AS (\S+)$", dockerfile.read(), re.M)}
+
+        def roadrunner_stage_image(runtime):
+            image = stages["roadrunner"].replace("${PHP_RUNTIME}", runtime)
+
+            return stages.get(image, image)
+
+        self.assertTrue(roadrunner_stage_image("roadrunner").startswith("ghcr.io/roadrunner-server/roadrunner:"))
+        self.assertEqual(roadrunner_stage_image("fpm"), "php:${PHP_FPM_IMAGE_TAG}")
+        self.assertEqual(roadrunner_stage_image("swoole"), "php:${PHP_FPM_IMAGE_TAG}")
+
+    def test_the_cached_steps_are_counted_from_the_build_output(self):
+        output = (
+            "#1 [internal] load build definition from Dockerfile\n"
+            "#5 [1/4] FROM docker.io/library/php:fpm\n"
+            "#5 CACHED\n"
+            "#6 [2/4] RUN apt-get update\n"
+            "#6 CACHED\n"
+            "#7 [3/4] RUN docker-php-ext-install bcmath\n"
+            "#7 0.512 Configuring for:\n"
+            "#8 [stage-0 4/4] COPY --from=composer /usr/bin/composer /usr/local/bin/composer\n"
+        )
+
+        self.assertEqual(PhpBaseImage.cache_usage(output), (2, 4))
+
+
+class TestLaravelInstaller(TestCase):
+
+    def test_the_composer_cache_hits_and_misses_are_computed_from_the_cache_snapshots(self):
+        installer = LaravelInstaller(ProjectEnvironment().get())
+
+        installer._compare_cache(
+            {"used.zip": (100, 1), "unused.zip": (1000, 1)},
+            {"used.zip": (100, 2), "unused.zip": (1000, 1), "new.zip": (10, 2)}
+        )
+
+        self.assertEqual(installer.cache_hits, (1, 100))
+        self.assertEqual(installer.cache_misses, (1, 10))
+        self.assertTrue("1 hits" in installer.report())
+
+    def test_the_composer_cache_snapshot_lists_the_cached_files(self):
+        with tmpdir():
+            os.makedirs(os.path.join("files", "laravel", "framework"))
+
+            with open(os.path.join("files", "laravel", "framework", "dist.zip"), "wb") as dist:
+                dist.write(b"0" * 10)
+
+            installer = LaravelInstaller(ProjectEnvironment().merge({"composer": {"cache": "."}}).get())
+            snapshot = installer._cache_snapshot()
+
+            self.assertEqual([size for size, access_time in snapshot.values()], [10])
+
+
+class TestSnapshotStore(TestCase):
+
+    @staticmethod
+    def _create_application(directory):
+        os.makedirs(os.path.join(directory, "vendor", "laravel"))
+        os.makedirs(os.path.join(directory, "app"))
+
+        with open(os.path.join(directory, "composer.lock"), "w") as lock:
+            lock.write('{"packages": [{"name": "laravel/framework", "version": "v8.0.0"}]}')
+
+        with open(os.path.join(directory, "vendor", "laravel", "framework.php"), "w") as framework:
+            framework.write("<?php // framework")
+
+        with open(os.path.join(directory, "app", "User.php"), "w") as user:
+            user.write("<?php // user")
+
+        os.symlink("app", os.path.join(directory, "link"))
+
+    def test_the_snapshot_key_contains_the_framework_version_and_the_lock_hash(self):
+        with tmpdir():
+            self._create_application("application")
+
+            self.assertRegex(SnapshotStore.key("application"), r"^v8\.0\.0-[0-9a-f]{12}$")
+
+    def test_a_captured_application_is_materialized_with_the_same_files(self):
+        with tmpdir():
+            self._create_application("application")
+
+            store = SnapshotStore("store")
+            os.mkdir("store")
+
+            self.assertIsNone(store.latest())
+
+            key = store.capture("application")
+
+            self.assertEqual(store.latest(), key)
+            self.assertIsNone(store.latest("^7.0"))
+
+            method = store.materialize(key, "materialized")
+
+            self.assertTrue(method in ("reflink", "hardlink", "copy"))
+            self.assertEqual(os.readlink(os.path.join("materialized", "link")), "app")
+
+            for path in (os.path.join("vendor", "laravel", "framework.php"), os.path.join("app", "User.php")):
+                with open(os.path.join("application", path)) as original:
+                    with open(os.path.join("materialized", path)) as materialized:
+                        self.assertEqual(original.read(), materialized.read())
+
+            # The application files are always writable, while the snapshot files are read-only.
+            self.assertTrue(os.access(os.path.join("materialized", "app", "User.php"), os.W_OK) or os.geteuid() == 0)
+            self.assertFalse(os.stat(os.path.join("store", key, "app", "User.php")).st_mode & 0o222)
+
+    def test_the_application_files_are_copied_when_links_are_not_supported(self):
+        with tmpdir():
+            self._create_application("application")
+            os.mkdir("store")
+
+            store = SnapshotStore("store")
+            key = store.capture("application")
+            store._disabled_methods.update(("reflink", "hardlink"))
+
+            self.assertEqual(store.materialize(key, "materialized"), "copy")
+            self.assertEqual(os.stat(os.path.join("materialized", "vendor", "laravel", "framework.php")).st_nlink, 1)
+
 
 class TestSsl(TestCase):
 
@@ -225,3 +665,122 @@ class TestSsl(TestCase):
             self.assertTrue(
                 os.path.isfile(key_path) and os.path.isfile(certificate_path)
             )
+
+    def test_keys_of_every_supported_type_can_be_generated(self):
+        for key_type in Ssl.KEY_TYPES:
+            ssl = Ssl("application.local", key_size=1024, key_type=key_type).generate()
+
+            key = serialization.load_pem_private_key(ssl._key, password=None, backend=default_backend())
+            certificate = x509.load_pem_x509_certificate(ssl._certificate, default_backend())
+
+            self.assertEqual(
+                key.public_key().public_bytes(serialization.Encoding.PEM,
+                                              serialization.PublicFormat.SubjectPublicKeyInfo),
+                certificate.public_key().public_bytes(serialization.Encoding.PEM,
+                                                      serialization.PublicFormat.SubjectPublicKeyInfo)
+            )
+
+    def test_an_exception_is_raised_if_the_key_type_is_not_supported(self):
+        self.assertRaises(ValueError, Ssl, "application.local", key_type="dsa")
+
+    def test_the_rsa_key_is_taken_from_the_key_pool_if_one_is_provided(self):
+        with tmpdir():
+            KeyPool._generate(".", 1024)
+
+            ssl = Ssl("application.local", key_size=1024, key_pool=KeyPool(".", 1024)).generate()
+
+            self.assertTrue(bool(ssl._key))
+            self.assertEqual(os.listdir(), [])
+
+    def test_the_certificate_is_signed_by_the_certificate_authority_if_one_is_provided(self):
+        with tmpdir():
+            authority = CertificateAuthority("authority").load()
+            ssl = Ssl("application.local", key_type="ecdsa-p256", authority=authority,
+                      alternative_names=("pgadmin.application.local",)).generate()
+
+            with open(authority.certificate_path, "rb") as authority_certificate:
+                authority_certificate = x509.load_pem_x509_certificate(authority_certificate.read(),
+                                                                       default_backend())
+
+            certificate = x509.load_pem_x509_certificate(ssl._certificate, default_backend())
+            alternative_names = certificate.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+
+            authority_certificate.public_key().verify(certificate.signature, certificate.tbs_certificate_bytes,
+                                                      ec.ECDSA(hashes.SHA256()))
+
+            self.assertEqual(certificate.issuer, authority_certificate.subject)
+            self.assertFalse(certificate.extensions.get_extension_for_class(x509.BasicConstraints).value.ca)
+            self.assertEqual(alternative_names.get_values_for_type(x509.DNSName),
+                             ["application.local", "pgadmin.application.local"])
+
+    def test_the_certificate_serial_numbers_are_random(self):
+        serial_numbers = {
+            x509.load_pem_x509_certificate(
+                Ssl("application.local", key_type="ecdsa-p256").generate()._certificate, default_backend()
+            ).serial_number
+            for _ in range(3)
+        }
+
+        self.assertEqual(len(serial_numbers), 3)
+
+    def test_a_certificate_close_to_its_expiry_date_is_renewed_for_the_same_key(self):
+        with tmpdir():
+            Ssl("application.local", key_type="ecdsa-p256", validity=10).generate().write()
+
+            ssl = Ssl("application.local", validity=90).read()
+
+            self.assertTrue(ssl.expires_within(30))
+
+            ssl.renew().write()
+
+            renewed = Ssl("application.local").read()
+
+            self.assertFalse(renewed.expires_within(30))
+            self.assertEqual(renewed._key, ssl._key)
+
+
+class TestCertificateAuthority(TestCase):
+
+    def test_the_authority_is_created_once_and_then_reused(self):
+        with tmpdir():
+            CertificateAuthority("authority").load()
+
+            with open(os.path.join("authority", CertificateAuthority.CERTIFICATE_NAME), "rb") as certificate:
+                certificate = certificate.read()
+
+            CertificateAuthority("authority").load()
+
+            with open(os.path.join("authority", CertificateAuthority.CERTIFICATE_NAME), "rb") as reused_certificate:
+                self.assertEqual(reused_certificate.read(), certificate)
+
+            self.assertEqual(os.listdir(), ["authority"])
+
+
+class TestKeyPool(TestCase):
+
+    def test_the_pool_is_refilled_in_the_background(self):
+        with tmpdir():
+            KeyPool(".", 1024, 2).refill().join()
+
+            self.assertEqual(len([name for name in os.listdir() if name.endswith(".pem")]), 2)
+
+    def test_the_keys_being_generated_are_not_generated_again(self):
+        with tmpdir():
+            open(".generating.tmp", "w").close()
+            open(".abandoned.tmp", "w").close()
+            os.utime(".abandoned.tmp", (0, 0))
+
+            pool = KeyPool(".", 1024, 2).refill()
+
+            self.assertEqual(len(pool._processes), 1)
+            self.assertFalse(os.path.exists(".abandoned.tmp"))
+
+            pool.join()
+
+            self.assertEqual(sorted(name for name in os.listdir() if not name.endswith(".pem")), [".generating.tmp"])
+
+    def test_a_key_is_generated_if_the_pool_is_empty(self):
+        with tmpdir():
+            key = KeyPool(".", 1024).pop()
+
+            self.assertEqual(key.key_size, 1024)
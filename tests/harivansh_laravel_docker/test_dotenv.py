@@ -0,0 +1,85 @@
+import os
+import runpy
+from unittest import TestCase
+
+from harivansh_scripting_utilities.helpers import tmpdir
+
+from harivansh_laravel_docker import dotenv
+from harivansh_laravel_docker.core import ProjectConfiguration
+from harivansh_laravel_docker.helpers import Renderer
+
+
+class TestDotenv(TestCase):
+    content = (
+        "# The application.\n"
+        "export APP_NAME=\"One Two\"    # With a space.\n"
+        "APP_KEY='base64:a#b'\n"
+        "\n"
+        "DB_PASSWORD=\"a \\\"quoted\\\" password\"\n"
+        "MAIL_SIGNATURE=\"multi\n"
+        "line\"\n"
+        "REDIS_PORT=6379 # The port.\n"
+        "EMPTY=\n"
+    )
+
+    def test_the_values_are_parsed_without_their_quotes_and_comments(self):
+        self.assertEqual(dotenv.parse(self.content), {
+            "APP_NAME": "One Two",
+            "APP_KEY": "base64:a#b",
+            "DB_PASSWORD": "a \"quoted\" password",
+            "MAIL_SIGNATURE": "multi\nline",
+            "REDIS_PORT": "6379",
+            "EMPTY": ""
+        })
+
+    def test_an_unchanged_file_is_rendered_as_it_is_read(self):
+        content = self.content.replace("6379 # The port.", "6379    # The port.")
+
+        self.assertEqual(dotenv.render(dotenv.tokenize(content)), content)
+
+    def test_the_replaced_values_are_quoted_only_if_needed(self):
+        merged = dotenv.parse(dotenv.merge(self.content, {"APP_NAME": "Three", "DB_PASSWORD": "# \"x\" \\ y"}))
+
+        self.assertEqual(merged["APP_NAME"], "Three")
+        self.assertEqual(merged["DB_PASSWORD"], "# \"x\" \\ y")
+        self.assertIn("export APP_NAME=Three    # With a space.\n", dotenv.merge(self.content, {"APP_NAME": "Three"}))
+
+    def test_the_unknown_lines_are_kept(self):
+        content = "not a variable\nAPP_NAME=\"unterminated\nAPP_ENV=local\n"
+
+        self.assertEqual(dotenv.merge(content, {"APP_ENV": "production"}), content.replace("local", "production"))
+
+    def test_the_comments_and_the_unknown_lines_keep_their_indentation(self):
+        content = "    # An indented comment.\n\tnot a variable\n  APP_ENV=local\n"
+
+        self.assertEqual(dotenv.merge(content, {"APP_ENV": "production"}),
+                         "    # An indented comment.\n\tnot a variable\nAPP_ENV=production\n")
+
+    def test_a_multi_line_value_ends_at_the_first_line_closing_its_quote(self):
+        content = "A=\"one\ntwo \\\" three\nfour\" # Closed.\nB=\"x\" y\nC=\"five\nD=6\n"
+
+        self.assertEqual(dotenv.parse(content), {"A": "one\ntwo \" three\nfour", "D": "6"})
+        self.assertEqual([entry.kind for entry in dotenv.tokenize(content)], ["variable", "raw", "raw", "variable"])
+
+    def test_the_differences_between_two_environments_are_listed(self):
+        self.assertEqual(dotenv.diff({"A": "1", "B": "2"}, {"B": "3", "C": "4"}), {
+            "added": {"C": "4"},
+            "removed": {"A": "1"},
+            "changed": {"B": ("2", "3")}
+        })
+
+    def test_the_generated_run_script_uses_the_embedded_parser(self):
+        with tmpdir():
+            Renderer().render([{
+                "template": "run.py",
+                "destination": "run",
+                "variables": {"DOTENV_MODULE": ProjectConfiguration.dotenv_module()}
+            }]).write()
+
+            with open(".env", "w") as env:
+                env.write(self.content)
+
+            run = runpy.run_path("run", run_name="run")
+
+            self.assertEqual(run["project_environment_variables"](".env"), dotenv.parse(self.content))
+            self.assertEqual(sorted(os.listdir()), [".env", "run"])
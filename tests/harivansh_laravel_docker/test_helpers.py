@@ -1,10 +1,15 @@
+import json
 import os
+import threading
 from pathlib import Path
+from subprocess import CalledProcessError
 from unittest import TestCase
 
 from harivansh_scripting_utilities.helpers import injectstdin, capturestdout, tmpdir
 
-from harivansh_laravel_docker.helpers import log, Parser, Question, Validation
+from harivansh_laravel_docker.helpers import (
+    log, Parser, Question, Renderer, run_traced, Scheduler, tracer, Validation
+)
 from tests.utils import raise_
 
 
@@ -171,6 +176,51 @@ class TestParser(TestCase):
 
             self.assertRaises(ValueError, parser.parse, {}, delimiters_creator)
 
+    def test_all_the_missing_variables_are_listed_in_the_exception_message(self):
+        parser = Parser().add_template_string("[[ONE]] [[TWO]] [[THREE]] [[ONE]]")
+
+        with self.assertRaises(ValueError) as context:
+            parser.parse({"TWO": 2})
+
+        self.assertTrue("ONE, THREE." in str(context.exception))
+
+    def test_a_template_is_compiled_into_alternating_literals_and_variable_names(self):
+        tokens = Parser.compile("Hello [[NAME]], [[GREETING]]!", Parser.token_pattern(lambda d: f"[[{d}]]"))
+
+        self.assertEqual(tokens, ("Hello ", "NAME", ", ", "GREETING", "!"))
+
+    def test_the_provided_variables_are_parsed_whatever_their_names(self):
+        parser = Parser().add_template_string("[[APP-NAME]] ([[APP.VERSION]]) [[*]]")
+
+        parser.parse({"APP-NAME": "application", "APP.VERSION": "1.0", "*": "all"})
+
+        self.assertEqual(parser.parsed_template_string, "application (1.0) all")
+
+    def test_the_delimiters_are_matched_literally(self):
+        parser = Parser().add_template_string("(NAME) ((NAME)) (.NAME.)")
+
+        parser.parse({"NAME": "value"}, lambda d: f"(.{d}.)")
+
+        self.assertEqual(parser.parsed_template_string, "(NAME) ((NAME)) value")
+
+    def test_a_template_file_is_only_read_again_if_it_was_modified(self):
+        with tmpdir():
+            template_name = "template.txt"
+
+            with open(template_name, "w") as template:
+                template.write("first")
+
+            first_template_string = Parser().read_template(template_name)._raw_template_string
+
+            self.assertIs(Parser().read_template(template_name)._raw_template_string, first_template_string)
+
+            with open(template_name, "w") as template:
+                template.write("second")
+
+            os.utime(template_name, ns=(0, os.stat(template_name).st_mtime_ns + 1))
+
+            self.assertEqual(Parser().read_template(template_name)._raw_template_string, "second")
+
     def test_a_template_is_successfully_parsed_if_the_correct_variables_mapping_is_provided(self):
         template_string = "The user's name is [[NAME]] and his email is [[EMAIL]]."
         variables = {
@@ -235,6 +285,109 @@ class TestParser(TestCase):
             self.assertEqual(output_file_contents, expected_parsed_template_string)
 
 
+class TestRenderer(TestCase):
+
+    def test_the_templates_of_the_manifest_are_written_with_their_modes(self):
+        with tmpdir():
+            (Renderer()
+             .render([
+                {"template": "project.gitignore", "destination": "gitignore"},
+                {"template": "run.py", "destination": "run", "mode": 0o755,
+                 "variables": {"DOTENV_MODULE": ""}},
+                {"template": "configuration/nginx/utils.conf", "destination": "utils.conf",
+                 "variables": {"PROJECT_DOMAIN": "application.local"}}
+             ])
+             .write())
+
+            self.assertTrue(os.access("run", os.X_OK))
+            self.assertFalse(os.stat("gitignore").st_mode & 0o111)
+
+            with open("utils.conf") as utils:
+                self.assertTrue("pgadmin.application.local" in utils.read())
+
+    def test_nothing_is_written_if_one_of_the_templates_cannot_be_rendered(self):
+        with tmpdir():
+            renderer = Renderer()
+
+            self.assertRaises(ValueError, renderer.render, [
+                {"template": "project.gitignore", "destination": "gitignore"},
+                {"template": "configuration/nginx/utils.conf", "destination": "utils.conf"}
+            ])
+            self.assertEqual(os.listdir(), [])
+
+    def test_an_exception_is_raised_if_a_file_already_exists(self):
+        with tmpdir():
+            Path("gitignore").touch()
+
+            renderer = Renderer(max_workers=1).render([{"template": "project.gitignore", "destination": "gitignore"}])
+
+            self.assertRaises(ValueError, renderer.write)
+
+
+class TestScheduler(TestCase):
+
+    def test_steps_are_run_after_their_dependencies(self):
+        order = []
+
+        (Scheduler()
+         .add("three", lambda: order.append("three"), ("one", "two"))
+         .add("one", lambda: order.append("one"))
+         .add("two", lambda: order.append("two"), ("one",))
+         .run())
+
+        self.assertEqual(order, ["one", "two", "three"])
+
+    def test_independent_steps_are_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        (Scheduler()
+         .add("one", barrier.wait)
+         .add("two", barrier.wait)
+         .run())
+
+    def test_an_exception_is_raised_if_a_step_depends_on_an_undeclared_step(self):
+        scheduler = Scheduler().add("one", lambda: None, ("two",))
+
+        self.assertRaises(ValueError, scheduler.run)
+
+    def test_an_exception_is_raised_if_the_steps_form_a_cycle(self):
+        scheduler = (Scheduler()
+                     .add("one", lambda: None, ("three",))
+                     .add("two", lambda: None, ("one",))
+                     .add("three", lambda: None, ("two",)))
+
+        self.assertRaises(ValueError, scheduler.run)
+
+    def test_the_exception_raised_by_a_step_is_propagated_and_its_dependents_are_not_run(self):
+        order = []
+        scheduler = (Scheduler()
+                     .add("one", lambda: raise_(RuntimeError("Oops...")))
+                     .add("two", lambda: order.append("two"), ("one",)))
+
+        self.assertRaises(RuntimeError, scheduler.run)
+        self.assertEqual(order, [])
+
+    def test_steps_completed_in_a_previous_run_are_not_run_again(self):
+        order = []
+        scheduler = Scheduler().add("one", lambda: order.append("one")).run()
+
+        scheduler.add("two", lambda: order.append("two"), ("one",)).run()
+
+        self.assertEqual(order, ["one", "two"])
+
+    def test_the_critical_path_of_a_step_includes_its_longest_dependency_chain(self):
+        scheduler = (Scheduler()
+                     .add("one", lambda: None)
+                     .add("two", lambda: None, ("one",))
+                     .run())
+
+        timings = scheduler.timings
+
+        self.assertAlmostEqual(timings["two"]["critical_path"],
+                               timings["one"]["duration"] + timings["two"]["duration"])
+        self.assertTrue("two" in scheduler.report())
+
+
 class TestDecorators(TestCase):
 
     def test_start_decorator_outputs_message_before_calling_the_wrapped_function(self):
@@ -271,8 +424,80 @@ class TestDecorators(TestCase):
         self.assertTrue(function_message in messages[0])
         self.assertTrue(decorator_message in messages[-1])
 
+    def test_the_decorated_calls_are_recorded_as_nested_spans(self):
+        @log("outer")
+        @log("outer again", position="after")
+        def outer():
+            inner()
+
+        @log("inner")
+        def inner():
+            pass
+
+        tracer.reset()
+
+        with capturestdout():
+            outer()
+
+        spans = {span["name"].rsplit(".", 1)[-1]: span for span in tracer.spans}
+
+        self.assertEqual(sorted(spans), ["inner", "outer"])
+        self.assertEqual(spans["inner"]["parent"], spans["outer"]["id"])
+        self.assertEqual((spans["outer"]["depth"], spans["inner"]["depth"]), (0, 1))
+        self.assertLessEqual(spans["outer"]["start"], spans["inner"]["start"])
+        self.assertGreaterEqual(spans["outer"]["end"], spans["inner"]["end"])
+        self.assertEqual(outer.__name__, "outer")
+
     def test_exception_is_raised_when_the_wrong_position_is_provided(self):
         self.assertRaises(ValueError, log, lambda x: x, position="wrong_position")
 
     def test_exception_is_raised_when_the_wrong_type_is_provided(self):
         self.assertRaises(ValueError, log, lambda x: x, type="wrong_type")
+
+
+class TestTracer(TestCase):
+
+    def test_the_commands_are_recorded_with_their_cpu_time(self):
+        tracer.reset()
+
+        with tracer.span("step"):
+            process = run_traced(["sh", "-c", "i=0; while [ $i -lt 20000 ]; do i=$((i + 1)); done; exit 3"])
+
+        command, step = tracer.spans
+
+        self.assertEqual(process.returncode, 3)
+        self.assertEqual((command["kind"], command["parent"]), ("subprocess", step["id"]))
+        self.assertGreater(command["cpu"], 0)
+        self.assertLessEqual(command["wall"], step["wall"])
+        self.assertRaises(CalledProcessError, run_traced, ["false"], check=True)
+
+    def test_the_spans_are_reported_as_a_table_and_as_json_lines(self):
+        tracer.reset()
+
+        with tracer.span("step"):
+            with tracer.span("call"):
+                pass
+
+        lines = [json.loads(line) for line in tracer.json_lines(project="One").splitlines()]
+
+        self.assertEqual([line["name"] for line in lines], ["step", "call"])
+        self.assertEqual({line["project"] for line in lines}, {"One"})
+        self.assertEqual({line["run"] for line in lines}, {tracer.run_id})
+        self.assertIn("\n  call", tracer.report())
+
+    def test_the_outermost_span_of_each_thread_is_profiled(self):
+        with tmpdir():
+            tracer.reset("profiles")
+
+            with tracer.span("step"):
+                with tracer.span("call"):
+                    pass
+
+            with tracer.span("other"):
+                pass
+
+            profiles = sorted(os.listdir("profiles"))
+
+        tracer.reset()
+
+        self.assertEqual(profiles, ["other.3.pstats", "step.1.pstats"])
@@ -0,0 +1,777 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import socketserver
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+from unittest import TestCase
+
+from cryptography import x509
+
+from harivansh_laravel_docker.core import CertificateAuthority, ProjectConfiguration, Ssl
+from harivansh_laravel_docker.helpers import Renderer
+
+
+def load_run_script(directory):
+    """
+    Render the run script in a directory, and import it as a module.
+    """
+
+    path = os.path.join(directory, "run")
+
+    Renderer().render([{
+        "template": "run.py",
+        "destination": path,
+        "variables": {"DOTENV_MODULE": ProjectConfiguration.dotenv_module()}
+    }]).write()
+
+    loader = SourceFileLoader("run", path)
+    module = module_from_spec(spec_from_loader("run", loader))
+    loader.exec_module(module)
+
+    return module
+
+
+class FakeDockerEngine(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    A fake docker daemon, answering the few Engine API requests used by the run script.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, containers):
+        super().__init__(socket_path, FakeDockerEngineHandler)
+        self.containers = containers
+        self.requests = []
+        self.execs = {}
+
+
+class FakeDockerEngineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *arguments):
+        pass
+
+    def respond(self, status, body):
+        content = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        self.server.requests.append(("GET", url.path))
+
+        if url.path == "/containers/json":
+            labels = set(json.loads(urllib.parse.parse_qs(url.query)["filters"][0])["label"])
+
+            self.respond(200, [
+                {"Id": identifier} for identifier, container_labels in self.server.containers.items()
+                if labels <= container_labels
+            ])
+        elif url.path.startswith("/exec/") and url.path.endswith("/json"):
+            exit_code = self.server.execs[url.path.split("/")[2]]["Cmd"][-1]
+
+            self.respond(200, {"Running": False, "ExitCode": int(exit_code)})
+        else:
+            self.respond(404, {"message": "not found"})
+
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+        self.server.requests.append(("POST", url.path))
+        components = url.path.split("/")
+
+        if components[1] == "containers" and components[3] == "exec":
+            if components[2] not in self.server.containers:
+                return self.respond(404, {"message": "No such container"})
+
+            exec_id = f"exec{len(self.server.execs)}"
+            self.server.execs[exec_id] = body
+            self.respond(201, {"Id": exec_id})
+        elif components[1] == "exec" and components[3] == "start":
+            configuration = self.server.execs[components[2]]
+
+            self.send_response(101)
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Upgrade", "tcp")
+            self.end_headers()
+
+            if configuration["Cmd"] == ["sh"]:
+                return self.shell()
+
+            # The command echoes its standard input (on stdout), and its arguments (on stderr).
+            stdin = b""
+
+            while True:
+                data = self.connection.recv(4096)
+
+                if not data:
+                    break
+
+                stdin += data
+
+            for stream, content in ((1, stdin), (2, " ".join(configuration["Cmd"]).encode())):
+                self.wfile.write(bytes([stream, 0, 0, 0]) + len(content).to_bytes(4, "big") + content)
+
+            self.wfile.flush()
+            self.close_connection = True
+        else:
+            self.respond(404, {"message": "not found"})
+
+
+    def shell(self):
+        """
+        Run a local shell as the exec's process, multiplexing its output streams.
+        """
+
+        process = subprocess.Popen(["sh"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        lock = threading.Lock()
+
+        def forward_output(stream_type, stream):
+            for content in iter(lambda: os.read(stream.fileno(), 4096), b""):
+                with lock:
+                    self.wfile.write(bytes([stream_type, 0, 0, 0]) + len(content).to_bytes(4, "big") + content)
+                    self.wfile.flush()
+
+        threads = [
+            threading.Thread(target=forward_output, args=(stream_type, stream))
+            for stream_type, stream in ((1, process.stdout), (2, process.stderr))
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        for data in iter(lambda: self.connection.recv(4096), b""):
+            process.stdin.write(data)
+            process.stdin.flush()
+
+        process.stdin.close()
+
+        for thread in threads:
+            thread.join()
+
+        process.wait()
+        self.close_connection = True
+
+
+class TestDockerEngine(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, "docker.sock")
+        self.server = FakeDockerEngine(self.socket_path, {
+            "php-container": {"com.docker.compose.project=one", "com.docker.compose.service=php"}
+        })
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+
+        self.run_script = load_run_script(self.directory)
+        self.engine = self.run_script.DockerEngine(self.socket_path, os.path.join(self.directory, "cache.json"))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def execute(self, command, stdin=b""):
+        stdout, stderr = io.BytesIO(), io.BytesIO()
+        exit_code = self.engine.execute("one", "php", command, user="www-data", tty=False,
+                                        stdin=io.BytesIO(stdin), stdout=stdout, stderr=stderr)
+
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def test_the_container_is_resolved_once_for_the_compose_project(self):
+        self.assertEqual(self.engine.container("one", "php"), "php-container")
+        self.assertEqual(self.engine.container("one", "php"), "php-container")
+
+        self.assertEqual(self.server.requests.count(("GET", "/containers/json")), 1)
+
+        with self.assertRaises(self.run_script.DockerEngineUnavailable):
+            self.engine.container("two", "php")
+
+    def test_the_output_streams_and_the_exit_code_of_the_command_are_forwarded(self):
+        exit_code, stdout, stderr = self.execute(["php", "artisan", "3"], b"standard input")
+
+        self.assertEqual(exit_code, 3)
+        self.assertEqual(stdout, b"standard input")
+        self.assertEqual(stderr, b"php artisan 3")
+        self.assertEqual(self.server.execs["exec0"]["User"], "www-data")
+        self.assertFalse(self.server.execs["exec0"]["Tty"])
+
+    def test_a_stale_container_is_resolved_again(self):
+        with open(os.path.join(self.directory, "cache.json"), "w") as cache:
+            json.dump({"one": {"php": "removed-container"}}, cache)
+
+        self.assertEqual(self.execute(["composer", "0"])[0], 0)
+        self.assertEqual(self.engine.container("one", "php"), "php-container")
+
+    def test_the_queue_replicas_are_saved_in_the_env_file(self):
+        commands = []
+        working_directory = os.getcwd()
+
+        self.run_script.run = lambda command: commands.append(command) or type("Process", (), {"returncode": 0})
+        os.chdir(self.directory)
+
+        try:
+            with open(".env", "w") as env:
+                env.write("# The queue workers\nQUEUE_WORKER_REPLICAS=1\n")
+
+            self.assertEqual(self.run_script.scale_queue({"QUEUE_WORKER_REPLICAS": "1"}, ["3"]), 0)
+
+            with open(".env") as env:
+                self.assertEqual(env.read(), "# The queue workers\nQUEUE_WORKER_REPLICAS=3\n")
+        finally:
+            os.chdir(working_directory)
+
+        self.assertIn("queue=3", commands[0])
+
+    def test_the_engine_is_unavailable_without_a_socket(self):
+        engine = self.run_script.DockerEngine(os.path.join(self.directory, "missing.sock"))
+
+        with self.assertRaises(self.run_script.DockerEngineUnavailable):
+            engine.container("one", "php")
+
+    def test_docker_compose_is_used_if_the_engine_is_unavailable(self):
+        commands = []
+
+        self.run_script.run = lambda command: commands.append(command) or type("Process", (), {"returncode": 2})
+        os.environ["DOCKER_HOST"] = f"unix://{os.path.join(self.directory, 'missing.sock')}"
+
+        try:
+            exit_code = self.run_script.execute({"COMPOSE_PROJECT_NAME": "one"}, "php", ["composer"], "www-data")
+        finally:
+            del os.environ["DOCKER_HOST"]
+
+        self.assertEqual(exit_code, 2)
+        self.assertEqual(commands, [["docker-compose", "exec", "--user", "www-data", "php", "composer"]])
+
+    def test_a_started_command_is_not_run_again_if_the_engine_fails(self):
+        commands = []
+
+        def exit_code(exec_id):
+            raise self.run_script.DockerEngineUnavailable("The docker daemon is not reachable.")
+
+        self.run_script.run = lambda command: commands.append(command) or type("Process", (), {"returncode": 0})
+        self.run_script.DockerEngine.exit_code = lambda engine, exec_id: exit_code(exec_id)
+        os.environ["DOCKER_HOST"] = f"unix://{self.socket_path}"
+        working_directory = os.getcwd()
+        os.chdir(self.directory)
+
+        try:
+            stderr = io.TextIOWrapper(io.BytesIO())
+
+            with contextlib.redirect_stderr(stderr), open(os.devnull, "rb") as stdin:
+                sys.stdin, original_stdin = stdin, sys.stdin
+
+                try:
+                    exit_code = self.run_script.execute({"COMPOSE_PROJECT_NAME": "one"}, "php", ["php", "artisan", "0"])
+                finally:
+                    sys.stdin = original_stdin
+        finally:
+            os.chdir(working_directory)
+            del os.environ["DOCKER_HOST"]
+
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(commands, [])
+        stderr.flush()
+
+        self.assertIn(b"is not run again", stderr.buffer.getvalue())
+
+
+class TestExecSession(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, "docker.sock")
+        self.server = FakeDockerEngine(self.socket_path, {
+            "php-container": {"com.docker.compose.project=one", "com.docker.compose.service=php"}
+        })
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+
+        self.run_script = load_run_script(self.directory)
+        self.stdout, self.stderr = io.BytesIO(), io.BytesIO()
+        self.session = self.run_script.ExecSession(
+            self.run_script.DockerEngine(self.socket_path, os.path.join(self.directory, "cache.json")),
+            "one", "php", "www-data", self.stdout, self.stderr
+        )
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_the_commands_are_run_in_a_single_exec_with_their_exit_statuses(self):
+        self.assertEqual(self.session.run("printf one")[0], 0)
+        self.assertEqual(self.session.run("echo two; echo error >&2; exit 3")[0], 3)
+        self.assertEqual(self.session.run("echo three")[0], 0)
+
+        self.assertEqual(self.stdout.getvalue(), b"onetwo\nthree\n")
+        self.assertEqual(self.stderr.getvalue(), b"error\n")
+        self.assertEqual(len(self.server.execs), 1)
+
+    def test_the_commands_of_a_group_without_markers_are_skipped(self):
+        marker = self.session._marker.decode()
+
+        results = self.session._send(f"printf '\\n%s 0\\n' {marker}; echo grouped", 3, group=True)
+
+        self.assertEqual([status for status, duration in results], [0, None, None])
+        self.assertEqual(self.stdout.getvalue(), b"grouped\n")
+
+    def test_the_lines_of_a_batch_file_are_parsed(self):
+        self.assertEqual(self.run_script.batch_command("artisan migrate --force"), ("artisan", "migrate --force"))
+        self.assertEqual(self.run_script.batch_command("artisanal"), ("shell", "artisanal"))
+
+    def test_a_batch_stops_at_the_first_failure(self):
+        batch_path = os.path.join(self.directory, "batch")
+
+        with open(batch_path, "w") as batch:
+            batch.write("# Comment\ntrue\n\nexit 4\ntrue\n")
+
+        os.environ["DOCKER_HOST"] = f"unix://{self.socket_path}"
+        working_directory = os.getcwd()
+        os.chdir(self.directory)
+
+        try:
+            env = {"COMPOSE_PROJECT_NAME": "one"}
+
+            self.assertEqual(self.run_script.run_batch(env, [batch_path]), 4)
+            self.assertEqual(self.run_script.run_batch(env, [batch_path, "--keep-going"]), 4)
+        finally:
+            os.chdir(working_directory)
+            del os.environ["DOCKER_HOST"]
+
+        sh_execs = [configuration for configuration in self.server.execs.values() if configuration["Cmd"] == ["sh"]]
+
+        self.assertEqual(len(sh_execs), 3)
+
+
+class FakeStackEngine:
+    """
+    A fake Engine API client, whose containers go through a list of states (one per inspection).
+    """
+
+    def __init__(self, containers):
+        self.containers = containers
+        self.lock = threading.Lock()
+
+    def request(self, method, path, body=None):
+        if path.startswith("/containers/json"):
+            return 200, [{"Id": identifier, "Labels": container["labels"]}
+                         for identifier, container in self.containers.items()]
+
+        with self.lock:
+            states = self.containers[path.split("/")[2]]["states"]
+
+            return 200, {"State": states.pop(0) if len(states) > 1 else states[0]}
+
+
+class FakeProcess:
+    """
+    A process which exits after a number of polls.
+    """
+
+    def __init__(self, polls, returncode=0):
+        self.polls = polls
+        self.returncode = returncode
+
+    def poll(self):
+        self.polls -= 1
+
+        return None if self.polls > 0 else self.returncode
+
+    def wait(self):
+        return self.returncode
+
+
+class TestStackReadiness(TestCase):
+    starting = {"Running": True, "Status": "running", "Health": {"Status": "starting"}}
+    healthy = {"Running": True, "Status": "running", "Health": {"Status": "healthy"}}
+    running = {"Running": True, "Status": "running"}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.run_script = load_run_script(self.directory)
+        self.run_script.StackReadiness.INTERVAL = 0.01
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def now():
+        return time.strftime("%Y-%m-%dT%H:%M:%S.123456789Z", time.gmtime())
+
+    @staticmethod
+    def labels(service, number="1", oneoff="False"):
+        return {
+            "com.docker.compose.service": service,
+            "com.docker.compose.container-number": number,
+            "com.docker.compose.oneoff": oneoff
+        }
+
+    def test_the_containers_are_followed_until_they_are_ready(self):
+        engine = FakeStackEngine({
+            "postgresql": {"labels": self.labels("postgresql"), "states": [self.starting] * 5 + [self.healthy]},
+            "node": {"labels": self.labels("node"), "states": [self.running]},
+            "queue-2": {"labels": self.labels("queue", "2"), "states": [self.starting, self.healthy]},
+            "one-off": {"labels": self.labels("php", oneoff="True"), "states": [self.running]},
+        })
+        readiness = self.run_script.StackReadiness(engine, "one", 10)
+
+        self.assertEqual(readiness.wait(FakeProcess(3)), 0)
+
+        rows = readiness.report().splitlines()
+
+        self.assertEqual(rows[0].split(), ["Service", "Status", "Running", "Ready"])
+        self.assertEqual([row.split()[0] for row in rows[1:]], ["node", "queue", "postgresql"])
+        self.assertEqual(rows[2].split()[:3], ["queue", "#2", "healthy"])
+        self.assertEqual(readiness.ready(), readiness.containers["postgresql"]["ready"])
+        self.assertGreater(readiness.containers["postgresql"]["ready"], readiness.containers["node"]["ready"])
+
+    def test_the_stack_is_not_ready_if_a_container_exits_or_times_out(self):
+        engine = FakeStackEngine({
+            "php": {"labels": self.labels("php"), "states": [self.starting]},
+            "firefox": {"labels": self.labels("firefox"), "states": [
+                {"Running": False, "Status": "exited", "ExitCode": 3, "StartedAt": self.now()}
+            ]},
+        })
+        readiness = self.run_script.StackReadiness(engine, "one", 0.2)
+
+        self.assertEqual(readiness.wait(FakeProcess(1)), 0)
+        self.assertIsNone(readiness.ready())
+        self.assertEqual(readiness.containers["firefox"]["status"], "exited (3)")
+        self.assertEqual(readiness.containers["php"]["status"], "starting (timeout)")
+
+    def test_the_stopped_containers_are_followed_until_the_stack_is_started(self):
+        # The containers were stopped (docker-compose stop); they keep the health status of their last run.
+        stopped = {"Running": False, "Status": "exited", "ExitCode": 0, "StartedAt": "2020-01-01T00:00:00.5Z",
+                   "Health": {"Status": "healthy"}}
+        engine = FakeStackEngine({
+            "postgresql": {
+                "labels": self.labels("postgresql"), "states": [stopped] * 3 + [self.starting, self.healthy]
+            },
+            "selenium": {"labels": self.labels("selenium"), "states": [stopped]},
+        })
+        readiness = self.run_script.StackReadiness(engine, "one", 10)
+
+        readiness.discover()
+
+        self.assertEqual(readiness.wait(FakeProcess(20)), 0)
+        self.assertEqual(readiness.containers["postgresql"]["status"], "healthy")
+        self.assertEqual(engine.containers["postgresql"]["states"], [self.healthy])
+        # The selenium service was not started again (e.g.: only some services were selected).
+        self.assertNotIn("selenium", readiness.containers)
+        self.assertEqual(readiness.ready(), readiness.containers["postgresql"]["ready"])
+
+    def test_docker_compose_v1_starts_the_stack_without_waiting_if_the_engine_is_unavailable(self):
+        commands = []
+
+        def run(command, **options):
+            commands.append(command)
+
+            return type("Process", (), {"returncode": 0, "stdout": "1.29.2\n"})
+
+        self.run_script.run = run
+        os.environ["DOCKER_HOST"] = f"unix://{os.path.join(self.directory, 'missing.sock')}"
+
+        try:
+            with contextlib.redirect_stderr(io.StringIO()) as stderr:
+                self.assertEqual(self.run_script.start_stack({"COMPOSE_PROJECT_NAME": "one"}, ["--wait"]), 0)
+        finally:
+            del os.environ["DOCKER_HOST"]
+
+        self.assertEqual(commands, [["docker-compose", "version", "--short"], ["docker-compose", "up", "--detach"]])
+        self.assertIn("without waiting", stderr.getvalue())
+        self.assertEqual(self.run_script.compose_version(), (1, 29, 2))
+
+
+class TestRenewCertificate(TestCase):
+
+    ENV = {"PROJECT_DOMAIN": "application.local", "SSL_KEY_NAME": "key.pem", "SSL_CERTIFICATE_NAME": "certificate.pem"}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.run_script = load_run_script(self.directory)
+        self.working_directory = os.getcwd()
+        self.cache_home = os.environ.get("XDG_CACHE_HOME")
+
+        os.environ["XDG_CACHE_HOME"] = os.path.join(self.directory, "cache")
+        os.chdir(self.directory)
+        os.makedirs(os.path.join("configuration", "nginx", "ssl"))
+
+        self.key_path = os.path.join("configuration", "nginx", "ssl", "key.pem")
+        self.certificate_path = os.path.join("configuration", "nginx", "ssl", "certificate.pem")
+        Ssl("application.local", key_type="ecdsa-p256", validity=10).generate().write(self.key_path,
+                                                                                     self.certificate_path)
+
+        self.commands = []
+        self.running = ""
+        self.run_script.run = lambda command, **kwargs: (
+            self.commands.append(command) or subprocess.CompletedProcess(command, 0, stdout=self.running)
+        )
+
+    def tearDown(self):
+        os.chdir(self.working_directory)
+
+        if self.cache_home is None:
+            del os.environ["XDG_CACHE_HOME"]
+        else:
+            os.environ["XDG_CACHE_HOME"] = self.cache_home
+
+        shutil.rmtree(self.directory)
+
+    def test_the_certificate_is_not_renewed_without_a_local_authority(self):
+        with open(self.certificate_path, "rb") as certificate:
+            expected = certificate.read()
+
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            self.assertEqual(self.run_script.renew_certificate(self.ENV, []), 1)
+
+        with open(self.certificate_path, "rb") as certificate:
+            self.assertEqual(certificate.read(), expected)
+
+        self.assertIn("certificate authority", stdout.getvalue())
+        self.assertFalse(os.path.exists(os.path.join("cache", "harivansh-laravel-docker", "authority")))
+
+    def test_the_certificate_is_renewed_by_the_local_authority_and_nginx_is_reloaded_if_it_is_running(self):
+        authority = CertificateAuthority(os.path.join("cache", "harivansh-laravel-docker", "authority")).load()
+        self.running = "php\nnginx\n"
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.run_script.renew_certificate(self.ENV, []), 0)
+
+        renewed = Ssl("application.local").read(self.key_path, self.certificate_path)
+
+        self.assertFalse(renewed.expires_within(30))
+        self.assertEqual(x509.load_pem_x509_certificate(renewed._certificate).issuer, authority._certificate.subject)
+        self.assertEqual(self.commands[-1], ["docker-compose", "exec", "nginx", "nginx", "-s", "reload"])
+
+    def test_nginx_is_not_reloaded_if_it_is_not_running(self):
+        CertificateAuthority(os.path.join("cache", "harivansh-laravel-docker", "authority")).load()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.run_script.renew_certificate(self.ENV, []), 0)
+
+        self.assertNotIn(["docker-compose", "exec", "nginx", "nginx", "-s", "reload"], self.commands)
+
+
+class TestTlsBenchmark(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        key_path, certificate_path = os.path.join(self.directory, "key.pem"), os.path.join(self.directory, "cert.pem")
+        Ssl("application.local", key_type="ecdsa-p256").generate().write(key_path, certificate_path)
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certificate_path, key_path)
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                self.rfile.readline()
+                self.wfile.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+
+        class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+            daemon_threads = True
+
+            def get_request(self):
+                connection, address = super().get_request()
+
+                return context.wrap_socket(connection, server_side=True), address
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+
+        self.run_script = load_run_script(self.directory)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_the_sessions_are_resumed(self):
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        host, port = self.server.server_address
+
+        duration, reused, session, version = self.run_script.tls_handshake(host, port, "application.local", context)
+
+        self.assertGreater(duration, 0)
+        self.assertFalse(reused)
+
+        self.assertTrue(self.run_script.tls_handshake(host, port, "application.local", context, session)[1])
+
+
+class TestHttpBenchmark(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        key_path, certificate_path = os.path.join(self.directory, "key.pem"), os.path.join(self.directory, "cert.pem")
+        Ssl("application.local", key_type="ecdsa-p256").generate().write(key_path, certificate_path)
+
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(certificate_path, key_path)
+        self.context.set_alpn_protocols(["h2", "http/1.1"])
+        self.run_script = load_run_script(self.directory)
+        self.server = None
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+        shutil.rmtree(self.directory)
+
+    def serve(self, handler):
+        context = self.context
+
+        class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+            daemon_threads = True
+
+            def get_request(self):
+                connection, address = super().get_request()
+
+                return context.wrap_socket(connection, server_side=True), address
+
+        self.server = Server(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+
+        return self.server.server_address[1]
+
+    def test_the_latency_percentiles_are_within_one_percent(self):
+        histogram = self.run_script.Histogram()
+
+        for milliseconds in range(1, 1001):
+            histogram.record(milliseconds / 1000)
+
+        self.assertEqual(histogram.total(), 1000)
+        self.assertAlmostEqual(histogram.percentile(50), 0.5, delta=0.005)
+        self.assertAlmostEqual(histogram.percentile(99), 0.99, delta=0.01)
+        self.assertAlmostEqual(histogram.percentile(100), 1, delta=0.01)
+        self.assertIsNone(self.run_script.Histogram().percentile(50))
+
+        for microseconds in range(1, 100000, 7):
+            histogram = self.run_script.Histogram()
+            histogram.record(microseconds / 1000000)
+
+            self.assertLess(abs(histogram.percentile(50) * 1000000 - microseconds), microseconds / 100)
+
+    def test_the_requests_of_the_mix_are_parsed(self):
+        self.assertEqual(self.run_script.parse_request("/"), ("GET", "/", 1))
+        self.assertEqual(self.run_script.parse_request("post /login 3"), ("POST", "/login", 3))
+        self.assertEqual(self.run_script.parse_request("/search?q=a 2"), ("GET", "/search?q=a", 2))
+        self.assertRaises(Exception, self.run_script.parse_request, "GET login")
+        self.assertRaises(Exception, self.run_script.parse_request, "GET / heavy")
+
+    def test_http_1_1_responses_are_measured_and_saved(self):
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    request_line = self.rfile.readline()
+
+                    if not request_line:
+                        return
+
+                    while self.rfile.readline() not in (b"\r\n", b""):
+                        pass
+
+                    if b" /chunked " in request_line:
+                        self.wfile.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+                                         b"5\r\nhello\r\n0\r\n\r\n")
+                    else:
+                        self.wfile.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 4\r\n\r\nnope")
+
+        port = self.serve(Handler)
+        results_path = os.path.join(self.directory, "results.json")
+        arguments = ["--port", str(port), "--concurrency", "2", "--duration", "0.3", "--warmup", "0.1",
+                     "--request", "/chunked 3", "--request", "/missing", "--save", results_path]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            status = self.run_script.benchmark_http({"PROJECT_DOMAIN": "application.local"}, arguments)
+
+        with open(results_path) as file:
+            results = json.load(file)
+
+        self.assertEqual(status, 0)
+        self.assertEqual(sorted(results["statuses"]), ["200", "404"])
+        self.assertEqual(results["errors"], {})
+        self.assertAlmostEqual(results["error_rate"], results["statuses"]["404"] / results["requests"])
+        self.assertLessEqual(results["latency"]["p50"], results["latency"]["max"])
+        self.assertIn("Change", self.run_script.benchmark_report(results, results))
+
+    def test_http_2_streams_are_multiplexed_and_the_connection_is_opened_again_after_a_goaway(self):
+        frame = self.run_script.Http2Client.frame
+        connections = []
+
+        class Handler(socketserver.BaseRequestHandler):
+            def read(self, size):
+                data = b""
+
+                while len(data) < size:
+                    chunk = self.request.recv(size - len(data))
+
+                    if not chunk:
+                        return None
+
+                    data += chunk
+
+                return data
+
+            def handle(self):
+                connections.append(self.request.selected_alpn_protocol())
+                self.read(24)
+                self.request.sendall(frame(4, 0, 0))
+                responses = 0
+
+                while responses < 4:
+                    header = self.read(9)
+
+                    if header is None:
+                        return
+
+                    self.read(int.from_bytes(header[:3], "big"))
+
+                    if header[3] == 1:
+                        stream = int.from_bytes(header[5:], "big")
+                        responses += 1
+                        # A status of the static table, or a raw literal one.
+                        block = b"\x88" if responses % 2 else b"\x08\x03201"
+                        self.request.sendall(frame(1, 0x4, stream, block) + frame(0, 0x1, stream, b"hello"))
+
+                self.request.sendall(frame(7, 0, 0, stream.to_bytes(4, "big") + bytes(4)))
+
+        port = self.serve(Handler)
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        context.set_alpn_protocols(["h2"])
+
+        async def main():
+            client = self.run_script.Http2Client(port, "application.local", context)
+            responses = []
+
+            for _ in range(3):
+                responses += await asyncio.gather(*(client.request("GET", "/") for _ in range(2)))
+
+            await client.close()
+
+            return responses
+
+        responses = asyncio.run(main())
+
+        self.assertEqual(sorted(responses), [(200, 5)] * 3 + [(201, 5)] * 3)
+        self.assertEqual(connections, ["h2", "h2"])
@@ -0,0 +1,123 @@
+from unittest import TestCase
+
+from harivansh_laravel_docker.tuning import Host, Profile
+
+
+class TestHost(TestCase):
+
+    def test_the_resources_of_the_host_are_detected(self):
+        host = Host()
+
+        self.assertGreaterEqual(host.cpus, 1)
+        self.assertGreater(host.memory, 0)
+
+    def test_the_provided_resources_are_used(self):
+        host = Host(cpus=3, memory=1024)
+
+        self.assertEqual(host.cpus, 3)
+        self.assertEqual(host.memory, 1024)
+
+
+class TestProfile(TestCase):
+
+    def test_an_exception_is_raised_if_the_profile_does_not_exist(self):
+        self.assertRaises(ValueError, Profile, "fast")
+
+    def test_the_opcache_is_sized_from_the_number_of_php_files(self):
+        profile = Profile("dev", Host(cpus=1, memory=1024 ** 3))
+
+        self.assertEqual(profile.opcache(100), {"max_accelerated_files": 223, "memory_consumption": 128})
+        self.assertEqual(profile.opcache(8000), {"max_accelerated_files": 16229, "memory_consumption": 192})
+        self.assertEqual(profile.opcache(10 ** 7)["max_accelerated_files"], Profile.OPCACHE_PRIMES[-1])
+
+    def test_the_production_profile_does_not_validate_the_timestamps(self):
+        self.assertEqual(Profile("production")["opcache_validate_timestamps"], 0)
+        self.assertEqual(Profile("dev")["opcache_validate_timestamps"], 1)
+
+    def test_the_fpm_pool_is_sized_from_the_cpus_and_the_memory_of_the_host(self):
+        # 8 CPUs, and 16GB of memory: the production profile is limited by the CPUs.
+        pool = Profile("production", Host(cpus=8, memory=16 * 1024 ** 3)).fpm_pool(worker_memory=64)
+
+        self.assertEqual(pool["pm"], "static")
+        self.assertEqual(pool["max_children"], 32)
+        self.assertTrue(pool["min_spare_servers"] <= pool["start_servers"] <= pool["max_spare_servers"])
+
+        # 8 CPUs, and 2GB of memory: the dev profile is limited by the memory (512MB for 64MB workers).
+        pool = Profile("dev", Host(cpus=8, memory=2 * 1024 ** 3)).fpm_pool(worker_memory=64)
+
+        self.assertEqual(pool["max_children"], 8)
+
+        # A pool always has at least 2 workers.
+        self.assertEqual(Profile("dev", Host(cpus=1, memory=1024 ** 3)).fpm_pool(4096)["max_children"], 2)
+
+    def test_nginx_is_sized_from_the_cpus_of_the_host(self):
+        nginx = Profile("production", Host(cpus=4, memory=16 * 1024 ** 3)).nginx(fpm_max_children=16)
+
+        self.assertEqual(nginx["worker_processes"], 4)
+        self.assertEqual(nginx["worker_rlimit_nofile"], 2 * nginx["worker_connections"])
+        self.assertEqual(nginx["upstream_keepalive"], 2)
+        self.assertEqual(nginx["fastcgi_cache"], "laravel")
+        self.assertEqual(nginx["hashed_assets_expires"], "max")
+
+        # The dev profile uses at most 2 workers, and turns the caches off.
+        nginx = Profile("dev", Host(cpus=4, memory=16 * 1024 ** 3)).nginx(fpm_max_children=2)
+
+        self.assertEqual(nginx["worker_processes"], 2)
+        self.assertEqual(nginx["upstream_keepalive"], 1)
+        self.assertEqual((nginx["gzip"], nginx["open_file_cache"], nginx["fastcgi_cache"]), ("off", "off", "off"))
+
+    def test_the_redis_instances_are_tuned_for_their_role(self):
+        profile = Profile("production", Host(cpus=4, memory=16 * 1024 ** 3))
+
+        cache = profile.redis("cache")
+        queue = profile.redis("queue")
+
+        self.assertEqual(cache["maxmemory"], 1228)
+        self.assertEqual((cache["maxmemory_policy"], cache["appendonly"], cache["save"]), ("allkeys-lru", "no", '""'))
+        self.assertEqual((queue["maxmemory_policy"], queue["appendonly"]), ("noeviction", "yes"))
+        self.assertEqual(profile.redis("session")["maxmemory_policy"], "volatile-lru")
+
+        self.assertRaises(ValueError, profile.redis, "locks")
+
+    def test_postgresql_is_sized_from_the_cpus_and_the_memory_of_the_host(self):
+        # 8 CPUs, and 16GB of memory, of which 40% (6553MB) are used by PostgreSQL in the production profile.
+        postgresql = Profile("production", Host(cpus=8, memory=16 * 1024 ** 3)).postgresql()
+
+        self.assertEqual(postgresql["shared_buffers"], 1638)
+        self.assertEqual(postgresql["effective_cache_size"], 4915)
+        self.assertEqual(postgresql["wal_buffers"], "16MB")
+        self.assertEqual(postgresql["max_parallel_workers_per_gather"], 4)
+        self.assertEqual(postgresql["pgbouncer_default_pool_size"], 32)
+        self.assertLess(postgresql["pgbouncer_default_pool_size"], postgresql["max_connections"])
+
+        # The small hosts keep the minimum values.
+        postgresql = Profile("dev", Host(cpus=1, memory=1024 ** 3)).postgresql()
+
+        self.assertEqual((postgresql["shared_buffers"], postgresql["work_mem"]), (128, 4))
+        self.assertEqual(postgresql["wal_buffers"], "-1")
+
+    def test_the_queue_workers_are_shared_between_the_queues(self):
+        # 8 CPUs: 16 worker processes in the production profile, in 4 replicas.
+        workers = Profile("production", Host(cpus=8, memory=16 * 1024 ** 3)).queue_workers({"default": 3, "emails": 1})
+
+        self.assertEqual(workers["replicas"], 4)
+        self.assertEqual(workers["processes"], {"default": 3, "emails": 1})
+        self.assertEqual(workers["memory_limit"], 4 * (256 + 32))
+
+        # The dev profile has a single replica, and each queue has at least one worker process.
+        workers = Profile("dev", Host(cpus=1, memory=1024 ** 3)).queue_workers({"default": 10, "emails": 1})
+
+        self.assertEqual((workers["replicas"], workers["processes"]), (1, {"default": 1, "emails": 1}))
+
+    def test_the_octane_server_is_sized_from_the_host(self):
+        # 8 CPUs, and 16GB: 16 workers in the production profile (the memory would allow many more).
+        octane = Profile("production", Host(cpus=8, memory=16 * 1024 ** 3)).octane(64)
+
+        self.assertEqual((octane["workers"], octane["task_workers"], octane["max_requests"]), (16, 4, 1000))
+        self.assertFalse(octane["watch"])
+
+        # The workers of the small hosts are limited by the memory; the dev profile reloads them on changes.
+        octane = Profile("dev", Host(cpus=4, memory=512 * 1024 ** 2)).octane(64)
+
+        self.assertEqual((octane["workers"], octane["task_workers"]), (2, 2))
+        self.assertTrue(octane["watch"])